@@ -0,0 +1,123 @@
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List
+
+
+class FakeLocalServer:
+    """
+    Minimal OpenAI-compatible chat server for tests and benchmarks.
+
+    Serves POST /v1/chat/completions and, unless `batch_endpoint` is False,
+    the custom POST /v1/batch/chat/completions that LocalClient batches to
+    (set `batch_endpoint=False` to behave like stock vLLM or llama.cpp). Like a GPU server it runs at most
+    `slots` forward passes at once; a single request takes `latency` seconds
+    and a batch of N takes `latency + per_item_latency * N`. Replies echo the
+    last user message.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 per_item_latency: float = 0.002, slots: int = 2, batch_endpoint: bool = True):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.batch_endpoint = batch_endpoint
+        self.stats = {"requests": 0, "batches": 0, "batched_requests": 0}
+        self._slots = threading.Semaphore(slots)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLocalServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLocalServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _forward(self, n: int) -> None:
+        with self._slots:
+            time.sleep(self.latency + (self.per_item_latency * n if n > 1 else 0))
+
+    @staticmethod
+    def completion(params: Dict[str, Any]) -> Dict[str, Any]:
+        last_user = next((m.get("content") for m in reversed(params.get("messages", [])) if m.get("role") == "user"), "")
+        content = f"echo: {last_user}"
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": params.get("model", "local-model"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": len(json.dumps(params.get("messages", []))) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": 0,
+            },
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/v1/chat/completions":
+                    with server._lock:
+                        server.stats["requests"] += 1
+                    server._forward(1)
+                    self._reply(200, server.completion(payload))
+                elif self.path == "/v1/batch/chat/completions" and server.batch_endpoint:
+                    requests: List[Dict[str, Any]] = payload.get("requests", [])
+                    with server._lock:
+                        server.stats["batches"] += 1
+                        server.stats["batched_requests"] += len(requests)
+                    server._forward(len(requests))
+                    self._reply(200, {"responses": [server.completion(r) for r in requests]})
+                else:
+                    self._reply(404, {"error": f"No route for {self.path}"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible local inference server.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slots", type=int, default=2)
+    args = parser.parse_args()
+    with FakeLocalServer(port=args.port, latency=args.latency, slots=args.slots) as fake:
+        print(f"Fake local server on {fake.base_url}")
+        threading.Event().wait()
@@ -0,0 +1,42 @@
+import time
+from typing import Dict, Any, List
+
+from microagent.llm.base import LLMClient
+
+
+class FakeLLMClient(LLMClient):
+    """Offline provider that answers after a fixed delay, standing in for a hosted LLM."""
+
+    def __init__(self, latency: float = 0.05, content: str = "This is a fake completion."):
+        self.latency = latency
+        self.content = content
+
+    def chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        return {"role": "assistant", "content": self.content, "tool_calls": None}
+
+    def stream_chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Any:
+        return self.chat_completion(messages, **kwargs)
+
+    def prepare_messages(self, messages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return messages
+
+    def prepare_tools(self, tools: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return tools
+
+    def parse_response(self, response: Any) -> Dict[str, Any]:
+        return response
+
+    def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
+        return kwargs
+
+    def prepare_system_message(self, instructions: str) -> Dict[str, Any]:
+        return {"role": "system", "content": instructions}
+
+    def prepare_tool_response(self, tool_call_id: str, tool_name: str, content: str) -> Dict[str, Any]:
+        return {"role": "tool", "tool_call_id": tool_call_id, "tool_name": tool_name, "content": content}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
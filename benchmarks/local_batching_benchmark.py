@@ -0,0 +1,50 @@
+"""
+Throughput of LocalClient against the fake local server, with and without batching.
+
+    python benchmarks/local_batching_benchmark.py --requests 200 --clients 32 --latency 0.05 --slots 2
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_provider import percentile
+from benchmarks.fake_local_server import FakeLocalServer
+from microagent.llm.local_client import LocalClient
+
+
+def run(args, batching: bool) -> None:
+    with FakeLocalServer(latency=args.latency, slots=args.slots) as server:
+        client = LocalClient(base_url=server.base_url, batching=batching, batch_window=args.window,
+                             max_batch_size=args.max_batch_size)
+
+        def one(i):
+            start = time.perf_counter()
+            client.chat_completion(messages=[{"role": "user", "content": f"request {i}"}])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            latencies = list(pool.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    label = "batched" if batching else "unbatched"
+    print(f"{label:>10}: {args.requests / elapsed:7.1f} req/s  "
+          f"p50={percentile(latencies, 50) * 1000:6.1f}ms  p99={percentile(latencies, 99) * 1000:6.1f}ms  "
+          f"server={server.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slots", type=int, default=2)
+    parser.add_argument("--window", type=float, default=0.005)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    args = parser.parse_args()
+    run(args, batching=False)
+    run(args, batching=True)
@@ -0,0 +1,66 @@
+"""
+Replays recorded production traffic through Microagent.run() at a multiple of its original rate.
+
+    python benchmarks/replay_load_test.py traffic.jsonl myapp.agents:support \
+        --messages first_messages.jsonl --threads 100 --latency-scale 1.0
+
+Each line of --messages is a JSON list of messages that starts one conversation.
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_provider import percentile
+from microagent import Microagent
+from microagent.llm.replay import ReplayClient
+from microagent.util import load_object
+
+
+def main(args) -> None:
+    replay = ReplayClient(args.recording, match=args.match, latency_scale=args.latency_scale)
+    client = Microagent(client=replay)
+    agent = load_object(args.agent)
+    with open(args.messages) as f:
+        conversations = [json.loads(line) for line in f if line.strip()]
+    conversations = (conversations * args.repeat)
+
+    def run_one(messages):
+        start = time.perf_counter()
+        try:
+            client.run(agent=agent, messages=messages, max_turns=args.max_turns)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, str(e)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(run_one, conversations))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    print(f"conversations={len(results)} threads={args.threads} latency_scale={args.latency_scale}")
+    print(f"throughput: {len(results) / elapsed:.1f} runs/s over {elapsed:.2f}s, errors={len(errors)}")
+    if latencies:
+        print(f"run latency: p50={percentile(latencies, 50) * 1000:.1f}ms p95={percentile(latencies, 95) * 1000:.1f}ms")
+    print(f"replay hits={replay.hits} misses={replay.misses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording")
+    parser.add_argument("agent", help="Starting agent as 'package.module:attribute'")
+    parser.add_argument("--messages", required=True)
+    parser.add_argument("--match", choices=["params", "position"], default="params")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--max-turns", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+"""
+Load test for microagent.serve against a local fake provider.
+
+    python benchmarks/serve_benchmark.py --requests 500 --clients 64 --latency 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_provider import FakeLLMClient, percentile
+from microagent import Agent, Microagent
+from microagent.serve import AgentServer
+
+
+async def post(port: int, path: str, payload: dict) -> int:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    return int(raw.split(b" ", 2)[1])
+
+
+async def main(args) -> None:
+    agent = Agent(name="bench", instructions="You are a benchmark agent.", model="fake")
+    server = AgentServer(
+        {"bench": agent},
+        client=Microagent(client=FakeLLMClient(latency=args.latency)),
+        port=0,
+        concurrency=args.concurrency,
+        max_pending=args.max_pending,
+    )
+    await server.start()
+
+    payload = {"messages": [{"role": "user", "content": "hello"}]}
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+
+    async def client_loop():
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            status = await post(server.port, f"/agents/bench/{args.endpoint}", payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*[client_loop() for _ in range(args.clients)])
+    elapsed = time.perf_counter() - start
+    await server.shutdown()
+
+    print(f"endpoint=/{args.endpoint} requests={args.requests} clients={args.clients} "
+          f"concurrency={args.concurrency} provider_latency={args.latency * 1000:.0f}ms")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s over {elapsed:.2f}s")
+    print(f"latency: p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms")
+    print(f"statuses: {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--endpoint", choices=["run", "stream"], default="run")
+    asyncio.run(main(parser.parse_args()))
@@ -1,4 +1,7 @@
 from .core import Microagent
-from .types import Agent, Response, Result
+from .types import Agent, Attachment, Response, Result, Budget, Usage
+from .instructions import depends_on
+from .cancellation import CancellationToken
+from .batching import batchable
 
-__all__ = ['Microagent', 'Agent', 'Response', 'Result']
\ No newline at end of file
+__all__ = ['Microagent', 'Agent', 'Attachment', 'Response', 'Result', 'Budget', 'Usage', 'depends_on', 'CancellationToken', 'batchable']
@@ -0,0 +1,108 @@
+import base64
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Hashable
+
+from .types import Attachment
+
+
+class EncodingCache:
+    """
+    LRU cache of encoded attachment blocks, keyed by provider and content hash.
+
+    Bounded by the approximate size of the cached blocks in characters, so a
+    few large images don't pin unbounded memory.
+    """
+
+    def __init__(self, max_chars: int = 256 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.stats = {"hits": 0, "misses": 0}
+        self._blocks: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            cached = self._blocks.get(key)
+            if cached is not None:
+                self._blocks.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached[0]
+            self.stats["misses"] += 1
+        block = build()
+        size = len(str(block))
+        with self._lock:
+            if key not in self._blocks:
+                self._blocks[key] = (block, size)
+                self._size += size
+            while self._size > self.max_chars and len(self._blocks) > 1:
+                _, (_, evicted) = self._blocks.popitem(last=False)
+                self._size -= evicted
+        return block
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+            self._size = 0
+            self.stats = {"hits": 0, "misses": 0}
+
+
+ENCODING_CACHE = EncodingCache()
+
+
+def b64encode(attachment: Attachment) -> str:
+    return base64.b64encode(attachment.read()).decode("ascii")
+
+
+def data_url(attachment: Attachment) -> str:
+    return f"data:{attachment.mime_type};base64,{b64encode(attachment)}"
+
+
+def is_text(attachment: Attachment) -> bool:
+    return attachment.mime_type.startswith("text/") or attachment.mime_type in ("application/json", "application/xml")
+
+
+def load_attachments(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validates attachments given as dicts (e.g. decoded from JSON) into
+    Attachment objects, so they are parsed and hashed once rather than on every
+    turn. Returns `messages` itself if there is nothing to convert.
+    """
+    if not any(isinstance(a, dict) for message in messages for a in message.get("attachments") or ()):
+        return messages
+    loaded = []
+    for message in messages:
+        attachments = message.get("attachments")
+        if attachments and any(isinstance(a, dict) for a in attachments):
+            message = dict(message, attachments=[
+                Attachment.model_validate(a) if isinstance(a, dict) else a for a in attachments
+            ])
+        loaded.append(message)
+    return loaded
+
+
+def expand_attachments(
+    messages: List[Dict[str, Any]],
+    prepare_attachment: Callable[[Attachment], Dict[str, Any]],
+    provider: str,
+    cache: EncodingCache = ENCODING_CACHE,
+) -> List[Dict[str, Any]]:
+    """
+    Replaces each message's "attachments" with provider content blocks after
+    its text. Messages without attachments are passed through as they are.
+    """
+    expanded = []
+    for message in messages:
+        attachments = message.get("attachments")
+        if not attachments:
+            expanded.append(message)
+            continue
+        blocks = [{"type": "text", "text": message["content"]}] if message.get("content") else []
+        for attachment in attachments:
+            if isinstance(attachment, dict):
+                attachment = Attachment.model_validate(attachment)
+            blocks.append(cache.get((provider, attachment.digest, attachment.mime_type), lambda: prepare_attachment(attachment)))
+        converted = {k: v for k, v in message.items() if k != "attachments"}
+        converted["content"] = blocks
+        expanded.append(converted)
+    return expanded
@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Callable, Optional, Sequence, Tuple
+
+# Run state a batch function can ask for, as one entry per call
+INJECTED = ("context_variables", "cancel_token")
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into batches.
+
+    A batch is sent once `max_batch_size` requests are waiting or `window`
+    seconds after its first request arrived, whichever comes first.
+    `send_batch` receives a list of items and returns results in the same
+    order; an exception fails every request in that batch.
+    """
+
+    def __init__(self, send_batch: Callable[[List[Any]], List[Any]], window: float = 0.005, max_batch_size: int = 16):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.stats = {"batches": 0, "requests": 0, "max_batch": 0}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch) -> None:
+        try:
+            results = self.send_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class BatchedTool:
+    """
+    The batch implementation of a tool, attached by `@batchable`.
+
+    `batch_fn` takes a list of argument dicts and returns one result per dict,
+    in order; a result that is an Exception fails only that call. If it
+    declares `context_variables` or `cancel_token` parameters it receives a
+    list with one entry per call. With `window` > 0, calls from concurrent
+    runs are gathered for that many seconds into shared batches.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Dict[str, Any]]], List[Any]], window: float = 0.0, max_batch_size: int = 64):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.stats = {"batches": 0, "calls": 0}
+        varnames = getattr(getattr(batch_fn, "__code__", None), "co_varnames", ())
+        self._injected = [name for name in INJECTED if name in varnames]
+        self._lock = threading.Lock()
+        self._batcher = MicroBatcher(self._send, window, max_batch_size) if window > 0 else None
+
+    def _send(self, calls: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Any]:
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["calls"] += len(calls)
+        injected = {name: [extra.get(name) for _, extra in calls] for name in self._injected}
+        results = list(self.batch_fn([arguments for arguments, _ in calls], **injected))
+        if len(results) != len(calls):
+            raise ValueError(f"Batch returned {len(results)} results for {len(calls)} calls")
+        return results
+
+    def call_many(
+        self,
+        arguments: Sequence[Dict[str, Any]],
+        context_variables: Any = None,
+        cancel_token: Any = None,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        """One result or Exception per argument dict; waits at most `timeout` seconds for a windowed batch."""
+        extra = {"context_variables": context_variables, "cancel_token": cancel_token}
+        calls = [(args, extra) for args in arguments]
+        if self._batcher is not None:
+            futures = [self._batcher.submit(call) for call in calls]
+            done, _ = wait(futures, timeout=timeout)
+            return [
+                (future.exception() or future.result()) if future in done
+                else TimeoutError("Batched tool call did not finish before the deadline")
+                for future in futures
+            ]
+        results = []
+        for i in range(0, len(calls), self.max_batch_size):
+            chunk = calls[i:i + self.max_batch_size]
+            try:
+                results.extend(self._send(chunk))
+            except Exception as e:
+                results.extend([e] * len(chunk))
+        return results
+
+
+def batchable(batch_fn: Callable[[List[Dict[str, Any]]], List[Any]], window: float = 0.0, max_batch_size: int = 64) -> Callable:
+    """
+    Declares a batch implementation for a tool function.
+
+    Several calls to the tool in one assistant message are made as a single
+    `batch_fn(list_of_argument_dicts)` call, at the position of the first of
+    them, and the results are handed back to each tool_call_id. The decorated
+    function still provides the tool's schema and handles lone calls when
+    `window` is 0.
+    """
+    def decorator(func: Callable) -> Callable:
+        func.batch = BatchedTool(batch_fn, window, max_batch_size)
+        return func
+    return decorator
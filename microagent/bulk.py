@@ -0,0 +1,166 @@
+import itertools
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Union
+
+from pydantic import BaseModel
+
+from .core import Microagent
+from .llm.base import LLMClient
+from .llm.batch import BatchBackend, BatchError
+from .types import Agent, Attachment, Budget, Response
+from .util import debug_print
+
+
+class BulkJob(BaseModel):
+    agent: Agent
+    messages: List[Dict[str, Any]]
+    context_variables: Dict[str, Any] = {}
+    max_turns: Union[int, float] = float("inf")
+    budget: Optional[Budget] = None
+
+
+class BulkResult(BaseModel):
+    responses: List[Optional[Response]]
+    errors: Dict[int, str] = {}
+    stats: Dict[str, Any] = {}
+
+
+class _BatchCollector(LLMClient):
+    """Parks each chat_completion call until the runner has fetched its batch result."""
+
+    def __init__(self, client: LLMClient):
+        self.client = client
+        self.cond = threading.Condition()
+        self.pending: Dict[str, Any] = {}
+        self.active = 0
+        self._ids = itertools.count()
+
+    def chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        slot = {}
+        with self.cond:
+            self.pending[f"request-{next(self._ids)}"] = (dict(kwargs, messages=messages), slot)
+            self.cond.notify_all()
+            self.cond.wait_for(lambda: "result" in slot)
+        if isinstance(slot["result"], Exception):
+            raise slot["result"]
+        return slot["result"]
+
+    def stream_chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Any:
+        raise ValueError("Bulk runs do not stream")
+
+    def prepare_messages(self, messages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_messages(messages)
+
+    def prepare_tools(self, tools: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_tools(tools)
+
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        return self.client.prepare_attachment(attachment)
+
+    def parse_response(self, response: Any) -> Dict[str, Any]:
+        return response
+
+    def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
+        return self.client.prepare_chat_params(**kwargs)
+
+    def prepare_system_message(self, instructions: str) -> Dict[str, Any]:
+        return self.client.prepare_system_message(instructions)
+
+    def prepare_tool_response(self, tool_call_id: str, tool_name: str, content: str) -> Dict[str, Any]:
+        return self.client.prepare_tool_response(tool_call_id, tool_name, content)
+
+
+class BulkRunner:
+    """
+    Runs many conversations through a provider batch API instead of live requests.
+
+    Every conversation runs the normal `Microagent.run` loop on its own thread.
+    When all running conversations are waiting on a completion, their requests
+    are submitted together as one batch job, which is polled every
+    `poll_interval` seconds. Each conversation then resumes with its result,
+    executes its tools and waits for the next round. At most
+    `max_conversations` conversations are in progress at once.
+    """
+
+    def __init__(self, backend: BatchBackend, poll_interval: float = 30.0, max_conversations: int = 256, debug: bool = False):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.max_conversations = max_conversations
+        self.debug = debug
+
+    def run(self, jobs: List[BulkJob]) -> BulkResult:
+        collector = _BatchCollector(self.backend.client)
+        microagent = Microagent(client=collector)
+        responses: List[Optional[Response]] = [None] * len(jobs)
+        errors: Dict[int, str] = {}
+        queue = deque(range(len(jobs)))
+        rounds = []
+        start = time.monotonic()
+
+        def work(index: int) -> None:
+            job = jobs[index]
+            try:
+                responses[index] = microagent.run(
+                    agent=job.agent,
+                    messages=job.messages,
+                    context_variables=job.context_variables,
+                    max_turns=job.max_turns,
+                    budget=job.budget,
+                    debug=self.debug,
+                )
+            except Exception as e:
+                debug_print(self.debug, f"Bulk job {index} failed: {str(e)}")
+                errors[index] = str(e)
+            finally:
+                with collector.cond:
+                    collector.active -= 1
+                    collector.cond.notify_all()
+
+        def round_ready() -> bool:
+            if queue and collector.active < self.max_conversations:
+                return True
+            return collector.active == 0 or len(collector.pending) == collector.active
+
+        while True:
+            with collector.cond:
+                while queue and collector.active < self.max_conversations:
+                    collector.active += 1
+                    threading.Thread(target=work, args=(queue.popleft(),), daemon=True).start()
+                collector.cond.wait_for(round_ready)
+                if collector.active == 0 and not queue:
+                    break
+                if not collector.pending or len(collector.pending) < collector.active:
+                    continue
+                pending, collector.pending = collector.pending, {}
+
+            rounds.append(self._submit_round(pending))
+            with collector.cond:
+                collector.cond.notify_all()
+
+        return BulkResult(
+            responses=responses,
+            errors=errors,
+            stats={"rounds": rounds, "requests": sum(r["requests"] for r in rounds), "latency": time.monotonic() - start},
+        )
+
+    def _submit_round(self, pending: Dict[str, Any]) -> Dict[str, Any]:
+        round_start = time.monotonic()
+        batch_id = None
+        try:
+            batch_id = self.backend.submit({custom_id: params for custom_id, (params, _) in pending.items()})
+            debug_print(self.debug, f"Submitted batch {batch_id} with {len(pending)} requests")
+            while not self.backend.is_done(batch_id):
+                time.sleep(self.poll_interval)
+            results = self.backend.results(batch_id)
+        except Exception as e:
+            debug_print(self.debug, f"Batch {batch_id} failed: {str(e)}")
+            results = {custom_id: e for custom_id in pending}
+
+        failed = 0
+        for custom_id, (_, slot) in pending.items():
+            result = results.get(custom_id) or BatchError(f"No result for {custom_id} in batch {batch_id}")
+            failed += isinstance(result, Exception)
+            slot["result"] = result
+        return {"batch_id": batch_id, "requests": len(pending), "failed": failed, "latency": time.monotonic() - round_start}
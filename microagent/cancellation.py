@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Optional
+
+CANCELLED = "cancelled"
+DEADLINE = "deadline"
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation for a run, optionally with a wall-clock deadline.
+
+    `timeout` is in seconds from creation. A token with a `parent` is also
+    cancelled when its parent is, and never outlives the parent's deadline.
+    Tools that declare a `cancel_token` parameter receive the run's token and
+    can check `cancelled` between steps of long work.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancellationToken"] = None):
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.parent = parent
+        self._event = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str = CANCELLED) -> None:
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def reason(self) -> Optional[str]:
+        """None while the run may continue, else "cancelled" or "deadline"."""
+        if self._event.is_set():
+            return self._reason
+        if self.parent is not None and self.parent.reason is not None:
+            return self.parent.reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return DEADLINE
+        return None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the nearest deadline, or None without one."""
+        remaining = None if self.deadline is None else max(self.deadline - time.monotonic(), 0.0)
+        parent = self.parent.remaining() if self.parent is not None else None
+        if remaining is None or (parent is not None and parent < remaining):
+            return parent
+        return remaining
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleeps until cancelled, the deadline passes or `timeout` elapses; returns `cancelled`."""
+        end = None if timeout is None else time.monotonic() + timeout
+        while not self.cancelled:
+            step = self.remaining()
+            if end is not None:
+                left = end - time.monotonic()
+                if left <= 0:
+                    break
+                step = left if step is None else min(step, left)
+            if self.parent is not None:
+                # Parent cancellation does not set our event, so poll for it
+                step = 0.05 if step is None else min(step, 0.05)
+            self._event.wait(step)
+        return self.cancelled
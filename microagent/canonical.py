@@ -0,0 +1,119 @@
+import json
+from typing import List, Dict, Any, Optional
+
+from .types import Usage
+
+# Message keys providers read, in the order they are serialized. Framework
+# metadata such as `sender` and `tool_name` is dropped.
+MESSAGE_KEYS = ("role", "name", "tool_call_id", "content", "attachments", "tool_calls")
+# Request fields that make up the cacheable prompt, serialized first; any
+# other field (timeouts, stream options) follows them.
+STABLE_PARAMS = ("model", "tools", "tool_choice", "response_format", "messages")
+
+
+def _sorted_keys(value: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value[key] for key in sorted(value)}
+
+
+def canonical_tool(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The tool with its own keys and its function's keys sorted. The JSON schema
+    under them is left as declared: property order is what the model sees.
+    """
+    tool = _sorted_keys(tool)
+    if isinstance(tool.get("function"), dict):
+        tool["function"] = _sorted_keys(tool["function"])
+    return tool
+
+
+def canonical_tool_call(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+    function = tool_call.get("function") or {}
+    return {
+        "id": tool_call.get("id"),
+        "type": tool_call.get("type") or "function",
+        "function": {"name": function.get("name"), "arguments": function.get("arguments") or ""},
+    }
+
+
+def canonical_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """The message with provider keys only, in a fixed order, and empty tool_calls removed."""
+    canonical = {key: message[key] for key in MESSAGE_KEYS if key in message}
+    if canonical.get("tool_calls"):
+        canonical["tool_calls"] = [canonical_tool_call(tool_call) for tool_call in canonical["tool_calls"]]
+        if canonical.get("content") == "":
+            canonical["content"] = None
+    else:
+        canonical.pop("tool_calls", None)
+    return canonical
+
+
+def canonical_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tools sorted by name, whatever order the agent lists them in."""
+    return sorted(
+        (canonical_tool(tool) for tool in tools),
+        key=lambda tool: (tool.get("function") or tool).get("name", ""),
+    )
+
+
+def canonical_request(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rewrites chat params so two requests that differ only in message history
+    serialize to the same bytes up to the first new message.
+    """
+    canonical = {key: params[key] for key in STABLE_PARAMS if key in params}
+    if canonical.get("tools"):
+        canonical["tools"] = canonical_tools(canonical["tools"])
+    canonical["messages"] = [canonical_message(message) for message in params["messages"]]
+    canonical.update((key, value) for key, value in params.items() if key not in canonical)
+    return canonical
+
+
+def prompt_text(params: Dict[str, Any]) -> str:
+    """The cacheable part of a request as JSON: tools, then messages."""
+    return json.dumps(
+        {"tools": params.get("tools") or [], "messages": params.get("messages") or []},
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix, by bisecting slice comparisons done in C."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class PrefixTracker:
+    """
+    Records how much of each request's prompt repeats the previous request's,
+    the part a provider's automatic prefix cache can serve, next to the cached
+    tokens the provider reported for that turn.
+    """
+
+    def __init__(self):
+        self.turns: List[Dict[str, Any]] = []
+        self._previous: Optional[str] = None
+
+    def observe(self, params: Dict[str, Any], agent: str) -> None:
+        text = prompt_text(params)
+        matched = common_prefix_length(self._previous, text) if self._previous is not None else 0
+        self.turns.append({
+            "turn": len(self.turns),
+            "agent": agent,
+            "chars": len(text),
+            "matched_chars": matched,
+            "match_ratio": matched / len(text) if text else 0.0,
+        })
+        self._previous = text
+
+    def record_usage(self, usage: Usage) -> None:
+        if self.turns:
+            self.turns[-1]["input_tokens"] = usage.input_tokens
+            self.turns[-1]["cache_read_tokens"] = usage.cache_read_tokens
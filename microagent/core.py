@@ -1,13 +1,75 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple, Union
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from microagent.llm.factory import LLMFactory
-from .types import Agent, Response, Result
-from .util import function_to_json, debug_print
+from microagent.llm.base import LLMClient
+from .attachments import load_attachments
+from .canonical import PrefixTracker, canonical_request
+from .cancellation import CancellationToken
+from .instructions import InstructionsCache
+from .metrics import MetricsRegistry, RunMetrics, provider_name
+from .persistent import snapshot
+from .results import ResultStore
+from .routing import Router, TurnFeatures
+from .structured import PartialJSONParser, response_format, validate_output
+from .types import Agent, Response, Result, Budget, Usage
+from .util import function_to_json, debug_print, estimate_tokens, merge_chunk
+import copy
 import json
+import time
+import weakref
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, limit: str):
+        super().__init__(f"Run budget exceeded: {limit}")
+        self.limit = limit
 
 
 class Microagent:
-    def __init__(self, llm_type='openai'):
-        self.client = LLMFactory.create(llm_type)
+    def __init__(
+        self,
+        llm_type='openai',
+        client: LLMClient = None,
+        router: Router = None,
+        metrics: MetricsRegistry = None,
+        result_store: ResultStore = None,
+        canonical_requests: bool = False,
+        track_prefix: bool = False,
+    ):
+        self.client = client or LLMFactory.create(llm_type)
+        self.result_store = result_store
+        self.canonical_requests = canonical_requests
+        self.track_prefix = track_prefix
+        self.instructions_cache = InstructionsCache()
+        self.router = router
+        self.metrics = metrics
+        self._run_metrics = RunMetrics(metrics) if metrics is not None else None
+        self._provider = provider_name(self.client)
+        self._tool_schemas = weakref.WeakKeyDictionary()
+
+    def warm(self, agent: Agent, context_variables: Dict[str, Any] = {}) -> None:
+        """Prepares everything the next request for `agent` needs, e.g. while waiting for user input."""
+        self.instructions_cache.render(agent, context_variables, self.client.prepare_system_message)
+        self._prepare_tools(agent, debug=False)
+        if agent.tool_selector is not None:
+            agent.tool_selector.index(agent, self._tool_schema)
+        self.client.warmup()
+
+    def _route_model(self, agent: Agent, history: List[Dict[str, Any]], turn: int, after_handoff: bool, stats: Dict[str, Any]) -> str:
+        router = agent.router or self.router
+        if router is None:
+            return agent.model
+        features = TurnFeatures.from_turn(turn, history, agent.functions, after_handoff)
+        model = router.route(features) or agent.model
+        stats.setdefault("routing", []).append({
+            "turn": turn,
+            "agent": agent.name,
+            "model": model,
+            "routed": model != agent.model,
+            "features": features.model_dump(),
+        })
+        return model
 
     def get_chat_completion(
         self,
@@ -17,85 +79,250 @@ class Microagent:
         model_override: str,
         stream: bool,
         debug: bool,
+        stats: Dict[str, Any] = None,
+        budget: Budget = None,
+        usage: Usage = None,
+        cancel_token: CancellationToken = None,
+        timing: Dict[str, float] = None,
+        prefix_tracker: PrefixTracker = None,
     ) -> Dict[str, Any]:
-        messages = self._prepare_messages(agent, history, context_variables, debug)
-        tools = self._prepare_tools(agent, debug)
-        
+        messages = self._prepare_messages(agent, history, context_variables, debug, stats)
+        tools = self._prepare_tools(agent, debug, history, stats)
+
         params = {
             "model": model_override or agent.model,
             "messages": messages,
             "tools": tools,
             "tool_choice": agent.tool_choice if agent.tool_choice is not None else "auto",
         }
+        if agent.output_schema is not None:
+            params["response_format"] = response_format(agent.output_schema)
+        if cancel_token is not None and cancel_token.remaining() is not None:
+            params["timeout"] = cancel_token.remaining()
 
+        if budget is not None:
+            limit = budget.exceeded_by(usage or Usage(), params["model"], estimate_tokens(messages) + estimate_tokens(tools))
+            if limit:
+                raise BudgetExceeded(limit)
+
+        if self.canonical_requests:
+            params = canonical_request(params)
+        if prefix_tracker is not None:
+            prefix_tracker.observe(params, agent.name)
+        if timing is not None:
+            timing["sent"] = time.perf_counter()
         if stream:
             return self.client.stream_chat_completion(**params)
         else:
             return self.client.chat_completion(**params)
 
-    def _prepare_messages(self, agent: Agent, history: List[Dict[str, Any]], context_variables: Dict[str, Any], debug: bool) -> List[Dict[str, Any]]:
-        instructions = agent.instructions(context_variables) if callable(agent.instructions) else agent.instructions
-        system_message = self.client.prepare_system_message(instructions)
+    def _prepare_messages(self, agent: Agent, history: List[Dict[str, Any]], context_variables: Dict[str, Any], debug: bool, stats: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        system_message, cache_hit = self.instructions_cache.render(
+            agent, context_variables, self.client.prepare_system_message
+        )
+        if stats is not None and cache_hit is not None:
+            cache_stats = stats.setdefault("instructions_cache", {"hits": 0, "misses": 0})
+            cache_stats["hits" if cache_hit else "misses"] += 1
+            cache_stats["hit_rate"] = cache_stats["hits"] / (cache_stats["hits"] + cache_stats["misses"])
         messages = [system_message] + history
-        debug_print(debug, "Using instructions:", instructions)
+        debug_print(debug, "Using instructions:", system_message.get("content"))
         debug_print(debug, "Getting chat completion for:", messages)
 
         return messages
 
-    def _prepare_tools(self, agent: Agent, debug: bool) -> List[Dict[str, Any]]:
-        tools = [function_to_json(f) for f in agent.functions]
+    def _tool_schema(self, func: Callable) -> Dict[str, Any]:
+        try:
+            schema = self._tool_schemas.get(func)
+            if schema is None:
+                schema = self._tool_schemas[func] = function_to_json(func)
+            return schema
+        except TypeError:
+            return function_to_json(func)
+
+    def _prepare_tools(self, agent: Agent, debug: bool, history: List[Dict[str, Any]] = None, stats: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        functions = agent.functions
+        if agent.tool_selector is not None and history is not None:
+            functions = agent.tool_selector.select(agent, history, self._tool_schema)
+            if stats is not None:
+                stats.setdefault("tool_selection", []).append({
+                    "agent": agent.name,
+                    "selected": [f.__name__ for f in functions],
+                    "total": len(agent.functions),
+                })
+        tools = [self._tool_schema(f) for f in self._with_builtin_tools(functions)]
         debug_print(debug, "Tools is set to:", tools)
         return tools
 
+    def _with_builtin_tools(self, functions: List[Callable]) -> List[Callable]:
+        if self.result_store is None or self.result_store.fetch_result in functions:
+            return functions
+        return list(functions) + [self.result_store.fetch_result]
+
     def handle_tool_calls(
         self,
         tool_calls: Any,
         functions: List[Any],
         context_variables: Dict[str, Any],
         debug: bool,
+        concurrent: bool = False,
+        cancel_token: CancellationToken = None,
+        labels: Dict[str, str] = None,
     ) -> Response:
-        function_map = {f.__name__: f for f in functions}
+        """
+        Executes tool calls in order, stopping at the first handoff. With
+        `concurrent=True` every call runs at once on a thread pool; results are
+        still applied in call order and the first handoff wins. Once
+        `cancel_token` is cancelled, remaining calls are answered with a
+        skipped message instead of running. Calls to a `@batchable` tool are
+        made as one batch when the first of them is reached; run sequentially,
+        a batch only takes consecutive calls, so any call that might hand off
+        ends it and nothing after a handoff runs.
+        """
+        function_map = {f.__name__: f for f in self._with_builtin_tools(functions)}
         partial_response = Response(messages=[], agent=None, context_variables={})
+        groups = self._batch_groups(tool_calls, function_map, consecutive=not concurrent)
+        outcomes = {}
 
-        for tool_call in tool_calls:
-            try:
-                name = tool_call['function']['name']
-                arguments = tool_call['function']['arguments']
-                tool_call_id = tool_call['id']
+        def run(i: int) -> Dict[int, Tuple[Dict[str, Any], Optional[Result]]]:
+            if i in groups:
+                return self._execute_batch(tool_calls, groups[i], function_map, context_variables, debug, cancel_token, labels)
+            return {i: self._execute_tool_call(tool_calls[i], function_map, context_variables, debug, cancel_token, labels)}
+
+        if concurrent and len(tool_calls) > 1:
+            grouped = {i for indices in groups.values() for i in indices}
+            units = [i for i in range(len(tool_calls)) if i in groups or i not in grouped]
+            with ThreadPoolExecutor(max_workers=len(units)) as executor:
+                for unit in executor.map(run, units):
+                    outcomes.update(unit)
+
+        for i in range(len(tool_calls)):
+            if i not in outcomes:
+                outcomes.update(run(i))
+            tool_response, result = outcomes[i]
+            partial_response.messages.append(tool_response)
+            if result is None:
+                continue
+            partial_response.context_variables.update(result.context_variables)
+            if result.agent and partial_response.agent is None:
+                partial_response.agent = result.agent
+                if not concurrent:
+                    return partial_response
+
+        return partial_response
+
+    def _batch_groups(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        function_map: Dict[str, Callable],
+        consecutive: bool = False,
+    ) -> Dict[int, List[int]]:
+        """
+        Indices of the calls to each batchable tool, keyed by the index of the
+        first one. With `consecutive`, a call to another tool starts a new group.
+        """
+        by_key = defaultdict(list)
+        segment = 0
+        for i, tool_call in enumerate(tool_calls):
+            name = tool_call["function"]["name"]
+            if consecutive and i and name != tool_calls[i - 1]["function"]["name"]:
+                segment += 1
+            if getattr(function_map.get(name), "batch", None) is not None:
+                by_key[name, segment].append(i)
+        return {
+            indices[0]: indices for (name, _), indices in by_key.items()
+            if len(indices) > 1 or function_map[name].batch.window > 0
+        }
+
+    def _execute_batch(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        indices: List[int],
+        function_map: Dict[str, Callable],
+        context_variables: Dict[str, Any],
+        debug: bool,
+        cancel_token: CancellationToken = None,
+        labels: Dict[str, str] = None,
+    ) -> Dict[int, Tuple[Dict[str, Any], Optional[Result]]]:
+        calls = [tool_calls[i] for i in indices]
+        raw = {}
+        if cancel_token is None or not cancel_token.cancelled:
+            name = calls[0]["function"]["name"]
+            arguments, ids = [], []
+            for tool_call in calls:
+                try:
+                    arguments.append(json.loads(tool_call["function"]["arguments"] or "{}"))
+                    ids.append(tool_call["id"])
+                except ValueError as e:
+                    raw[tool_call["id"]] = e
+            timeout = cancel_token.remaining() if cancel_token is not None else None
+            started = time.perf_counter()
+            raw.update(zip(ids, function_map[name].batch.call_many(arguments, context_variables, cancel_token, timeout)))
+            if labels is not None and self._run_metrics is not None:
+                self._run_metrics.tool.observe(time.perf_counter() - started, tool=name, **labels)
+        return {
+            i: self._execute_tool_call(tool_call, function_map, context_variables, debug, cancel_token, labels, raw)
+            for i, tool_call in zip(indices, calls)
+        }
+
+    def _execute_tool_call(
+        self,
+        tool_call: Dict[str, Any],
+        function_map: Dict[str, Callable],
+        context_variables: Dict[str, Any],
+        debug: bool,
+        cancel_token: CancellationToken = None,
+        labels: Dict[str, str] = None,
+        batched: Dict[str, Any] = None,
+    ) -> Tuple[Dict[str, Any], Optional[Result]]:
+        try:
+            name = tool_call['function']['name']
+            arguments = tool_call['function']['arguments']
+            tool_call_id = tool_call['id']
 
-                if name not in function_map:
-                    raise ValueError(f"Tool {name} not found in function map.")
+            if cancel_token is not None and cancel_token.cancelled:
+                content = f"Tool call skipped: run stopped ({cancel_token.reason})."
+                return self.client.prepare_tool_response(tool_call_id=tool_call_id, tool_name=name, content=content), None
 
-                debug_print(debug, f"Processing tool call: {name} with arguments {arguments}")
+            if name not in function_map:
+                raise ValueError(f"Tool {name} not found in function map.")
 
+            debug_print(debug, f"Processing tool call: {name} with arguments {arguments}")
+
+            if batched and tool_call_id in batched:
+                raw_result = batched[tool_call_id]
+                if isinstance(raw_result, Exception):
+                    raise raw_result
+            else:
                 func = function_map[name]
-                args = json.loads(arguments)
+                args = json.loads(arguments) if arguments else {}
                 if "context_variables" in func.__code__.co_varnames:
                     args["context_variables"] = context_variables
+                if "cancel_token" in func.__code__.co_varnames:
+                    args["cancel_token"] = cancel_token
+                started = time.perf_counter()
                 raw_result = func(**args)
-                result: Result = self._handle_function_result(raw_result, debug)
-                tool_response = self.client.prepare_tool_response(
-                    tool_call_id=tool_call_id,
-                    tool_name=name,
-                    content=result.value
-                )
-                partial_response.messages.append(tool_response)
-                partial_response.context_variables.update(result.context_variables)
-                if result.agent:
-                    partial_response.agent = result.agent
-                    return partial_response
-
-            except Exception as e:
-                error_message = f"Error processing tool call: {str(e)}"
-                debug_print(debug, error_message)
-                partial_response.messages.append({
-                    "role": "tool",  #TODO: OAI lets you use tool, Anthropic needs user
-                    "tool_call_id": tool_call.get('id', 'unknown'),
-                    "tool_name": tool_call['function']['name'],
-                    "content": error_message,
-                })
+                if labels is not None and self._run_metrics is not None:
+                    self._run_metrics.tool.observe(time.perf_counter() - started, tool=name, **labels)
+            result: Result = self._handle_function_result(raw_result, debug)
+            content = result.value
+            if self.result_store is not None and function_map[name] is not self.result_store.fetch_result:
+                content = self.result_store.offload(content)
+            tool_response = self.client.prepare_tool_response(
+                tool_call_id=tool_call_id,
+                tool_name=name,
+                content=content
+            )
+            return tool_response, result
 
-        return partial_response
+        except Exception as e:
+            error_message = f"Error processing tool call: {str(e)}"
+            debug_print(debug, error_message)
+            return {
+                "role": "tool",  #TODO: OAI lets you use tool, Anthropic needs user
+                "tool_call_id": tool_call.get('id', 'unknown'),
+                "tool_name": tool_call['function']['name'],
+                "content": error_message,
+            }, None
 
     def _handle_function_result(self, result: Any, debug: bool) -> Result:
         if isinstance(result, Result):
@@ -120,58 +347,388 @@ class Microagent:
         debug: bool = False,
         max_turns: int = float("inf"),
         execute_tools: bool = True,
-    ) -> Response:
+        on_message: Callable[[Dict[str, Any]], None] = None,
+        budget: Budget = None,
+        concurrent_tools: bool = False,
+        timeout: Optional[float] = None,
+        cancel_token: CancellationToken = None,
+    ) -> Union[Response, Iterator[Dict[str, Any]]]:
+        """
+        Runs the agent loop. With `stream=True` this returns a generator of
+        message deltas tagged with their sender, {"delim": "start"/"end"}
+        markers around each completion and a final {"response": Response}.
+
+        `timeout` is a wall-clock limit in seconds and `cancel_token` lets
+        another thread stop the run. Either one ends the run cleanly between
+        steps, with a partial Response and stop_reason "deadline" or
+        "cancelled"; the remaining time is also passed to each LLM request.
+        """
+        if timeout is not None:
+            cancel_token = CancellationToken(timeout, parent=cancel_token)
+        loop = self._run_loop(
+            agent, messages, context_variables, model_override, stream, debug,
+            max_turns, execute_tools, on_message, budget, concurrent_tools, cancel_token,
+        )
+        if stream:
+            return loop
+        for chunk in loop:
+            if "response" in chunk:
+                return chunk["response"]
+
+    def _stream_completion(
+        self,
+        completion: Any,
+        agent: Agent,
+        cancel_token: CancellationToken = None,
+        started: float = None,
+        labels: Dict[str, str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields sender-tagged deltas, then the assembled message as {"message": ...}.
+        Agents with an output schema also get {"output_fields": ...} chunks as
+        top-level fields of the JSON answer complete. With metrics enabled,
+        `started` is when the request was sent and `labels` label the timings.
+        """
+        message = {
+            "content": "",
+            "sender": agent.name,
+            "role": "assistant",
+            "tool_calls": defaultdict(
+                lambda: {"function": {"arguments": "", "name": ""}, "id": "", "type": ""}
+            ),
+        }
+        usage = {}
+        parser = PartialJSONParser() if agent.output_schema is not None else None
+        metrics = self._run_metrics if labels is not None else None
+        if metrics is not None:
+            ttft, gaps = metrics.ttft.labels(**labels), metrics.inter_token.labels(**labels)
+        first = last = None
+        deltas = 0
+        yield {"delim": "start"}
+        try:
+            for delta in self.client.stream_deltas(completion):
+                if cancel_token is not None and cancel_token.cancelled:
+                    break
+                delta_usage = delta.pop("usage", None)
+                if delta_usage:
+                    usage = {k: max(usage.get(k, 0), v) for k, v in delta_usage.items()}
+                if not delta:
+                    continue
+                if metrics is not None:
+                    now = time.perf_counter()
+                    if last is None:
+                        first = now
+                        ttft.observe(now - started)
+                    else:
+                        gaps.observe(now - last)
+                    last = now
+                    deltas += 1
+                yield dict(delta, sender=agent.name)
+                if parser is not None and delta.get("content"):
+                    try:
+                        completed = parser.feed(delta["content"])
+                    except ValueError:
+                        # not valid JSON; _structured_output re-parses the whole answer and records why
+                        parser, completed = None, None
+                    if completed:
+                        fields = {key: copy.deepcopy(parser.value[key]) for key in completed}
+                        yield {"output_fields": fields, "sender": agent.name}
+                merge_chunk(message, copy.deepcopy(delta))
+        finally:
+            close = getattr(completion, "close", None)
+            if callable(close):
+                close()
+        yield {"delim": "end"}
+
+        if metrics is not None and first is not None and last > first:
+            metrics.tokens_per_second.labels(**labels).observe((usage.get("output_tokens") or deltas) / (last - first))
+        message["tool_calls"] = list(message["tool_calls"].values()) or None
+        message["content"] = message["content"] or None
+        if usage:
+            message["usage"] = usage
+        yield {"message": message, "parser": parser}
+
+    def _run_loop(
+        self,
+        agent: Agent,
+        messages: List[Dict[str, Any]],
+        context_variables: Dict[str, Any],
+        model_override: str,
+        stream: bool,
+        debug: bool,
+        max_turns: int,
+        execute_tools: bool,
+        on_message: Callable[[Dict[str, Any]], None],
+        budget: Budget,
+        concurrent_tools: bool,
+        cancel_token: CancellationToken = None,
+    ) -> Iterator[Dict[str, Any]]:
         active_agent = agent
-        context_variables = context_variables.copy()
-        history = messages.copy()
+        context_variables = snapshot(context_variables)
+        history = snapshot(load_attachments(messages))
         init_len = len(messages)
+        context_delta = {}
         turn_count = 0
+        stats = {}
+        usage = Usage()
+        usage_by_agent = {}
+        turn_usage = []
+        stop_reason = "max_turns"
+        after_handoff = False
+        output = None
+        # After a handoff to an agent with a handoff_filter, the provider sees
+        # view_prefix + history[view_start:] while history itself stays whole
+        view_prefix, view_start = None, None
+        prefix_tracker = None
+        if self.track_prefix:
+            prefix_tracker = PrefixTracker()
+            stats["prefix_match"] = prefix_tracker.turns
 
         while turn_count < max_turns and active_agent:
+            if cancel_token is not None and cancel_token.cancelled:
+                print(f"Ending run. Stopped by {cancel_token.reason}.")
+                stop_reason = cancel_token.reason
+                break
             print(f"Turn {turn_count} - Active agent: {active_agent.name}")
-            
+            turn_started = time.perf_counter()
+            view = history if view_prefix is None else view_prefix + history[view_start:]
+            model = model_override or self._route_model(active_agent, view, turn_count, after_handoff, stats)
+            labels = None
+            if self._run_metrics is not None:
+                labels = {"provider": self._provider, "model": model, "agent": active_agent.name}
+            timing = {}
+
             # Get LLM completion
-            completion = self.get_chat_completion(
-                agent=active_agent,
-                history=history,
-                context_variables=context_variables,
-                model_override=model_override,
-                stream=stream,
-                debug=debug
-            )
-            
-            # Parse response
-            message = self.client.parse_response(completion)
+            try:
+                completion = self.get_chat_completion(
+                    agent=active_agent,
+                    history=view,
+                    context_variables=context_variables,
+                    model_override=model,
+                    stream=stream,
+                    debug=debug,
+                    stats=stats,
+                    budget=budget,
+                    usage=usage,
+                    cancel_token=cancel_token,
+                    timing=timing,
+                    prefix_tracker=prefix_tracker,
+                )
+                # Parse response
+                parser = None
+                if stream:
+                    for chunk in self._stream_completion(completion, active_agent, cancel_token, timing["sent"], labels):
+                        if "message" in chunk:
+                            message, parser = chunk["message"], chunk["parser"]
+                        else:
+                            yield chunk
+                else:
+                    message = self.client.parse_response(completion)
+            except BudgetExceeded as e:
+                print(f"Ending run. Budget limit {e.limit} reached.")
+                stop_reason = f"budget:{e.limit}"
+                break
+            except Exception:
+                # A request timed out or failed because the run was stopped
+                if cancel_token is None or not cancel_token.cancelled:
+                    raise
+                print(f"Ending run. Stopped by {cancel_token.reason}.")
+                stop_reason = cancel_token.reason
+                break
+            llm_seconds = time.perf_counter() - timing["sent"]
+            if labels is not None:
+                self._run_metrics.llm_request.labels(**labels).observe(llm_seconds)
             message['sender'] = active_agent.name
+            interrupted = stream and cancel_token is not None and cancel_token.cancelled
+            if interrupted:
+                # Keep the text already streamed, but not half-received tool calls
+                message['tool_calls'] = None
+
+            # Account token usage
+            turn = Usage(**(message.pop('usage', None) or {}))
+            if budget is not None:
+                turn.cost = budget.cost(model, turn.input_tokens, turn.output_tokens)
+            turn_usage.append(turn)
+            usage.add(turn)
+            if prefix_tracker is not None:
+                prefix_tracker.record_usage(turn)
+            usage_by_agent.setdefault(active_agent.name, Usage()).add(turn)
 
             # Update history
             history.append(message)
+            if on_message:
+                on_message(message)
 
             # Handle tool calls if applicable
             tool_calls = message.get('tool_calls', [])
 
             if not tool_calls or not execute_tools:
                 print("Ending turn. No tool calls or tool execution disabled.")
+                stop_reason = cancel_token.reason if interrupted else "completed"
+                if active_agent.output_schema is not None and not tool_calls and not interrupted:
+                    output = self._structured_output(active_agent, message, parser, stats)
+                self._observe_overhead(labels, turn_started, llm_seconds)
                 break
 
+            tools_started = time.perf_counter()
             partial_response = self.handle_tool_calls(
-                tool_calls, active_agent.functions, context_variables, debug
+                tool_calls, active_agent.functions, context_variables, debug,
+                concurrent=concurrent_tools, cancel_token=cancel_token, labels=labels,
             )
+            tool_seconds = time.perf_counter() - tools_started
 
             # Update history and context variables
             history.extend(partial_response.messages)
             context_variables.update(partial_response.context_variables)
+            context_delta.update(partial_response.context_variables)
+            if on_message:
+                for tool_message in partial_response.messages:
+                    on_message(tool_message)
 
             # Update agent if applicable
+            after_handoff = partial_response.agent is not None
             if partial_response.agent:
                 active_agent = partial_response.agent
                 print("Agent updated to:", active_agent)
+                view_prefix, view_start = None, None
+                if active_agent.handoff_filter is not None:
+                    view_prefix, view_start = active_agent.handoff_filter(list(history), active_agent), len(history)
+                    stats.setdefault("handoff_filter", []).append({
+                        "agent": active_agent.name,
+                        "messages": len(history),
+                        "sent": len(view_prefix),
+                    })
 
+            self._observe_overhead(labels, turn_started, llm_seconds + tool_seconds)
             turn_count += 1
 
         print("Run method complete. Returning response.")
-        return Response(
+        yield {"response": Response(
             messages=history[init_len:],
             agent=active_agent,
             context_variables=context_variables,
-        )
\ No newline at end of file
+            context_delta=context_delta,
+            stats=stats,
+            usage=usage,
+            usage_by_agent=usage_by_agent,
+            turn_usage=turn_usage,
+            stop_reason=stop_reason,
+            output=output,
+        )}
+
+    def _observe_overhead(self, labels: Optional[Dict[str, str]], turn_started: float, accounted: float) -> None:
+        if labels is not None:
+            self._run_metrics.overhead.labels(**labels).observe(max(time.perf_counter() - turn_started - accounted, 0.0))
+
+    def _structured_output(self, agent: Agent, message: Dict[str, Any], parser: Optional[PartialJSONParser], stats: Dict[str, Any]) -> Any:
+        """Validates the final answer, reusing the streaming parser's result when there is one."""
+        try:
+            if parser is None:
+                parser = PartialJSONParser()
+                parser.feed(message.get("content") or "")
+            if not parser.done:
+                raise ValueError("Response did not contain a complete JSON value")
+            return validate_output(agent.output_schema, parser.value)
+        except Exception as e:
+            stats["structured_output"] = {"error": str(e)}
+            return None
+
+    def fan_out(
+        self,
+        agents: List[Agent],
+        messages: List[Dict[str, Any]],
+        merge: Callable[[Dict[int, Response]], Union[str, Dict[str, Any]]] = None,
+        context_variables: Dict[str, Any] = {},
+        model_override: str = None,
+        debug: bool = False,
+        max_turns: int = float("inf"),
+        deadline: Optional[float] = None,
+        first_k: Optional[int] = None,
+    ) -> Response:
+        """
+        Runs each agent on the same messages concurrently and merges their answers.
+
+        Every branch gets its own copy of the history and context variables, and
+        branches are keyed by their index in `agents`, so the same agent can be
+        fanned out several times. `deadline` is a number of seconds to wait and
+        `first_k` returns as soon as that many branches have finished;
+        unfinished branches are cancelled and left out of the merge. The merged
+        answer is returned as a single assistant message the caller can append
+        to the parent conversation.
+        """
+        merge = merge or merge_final_messages
+        first_k = min(first_k or len(agents), len(agents))
+        start = time.monotonic()
+        branch_stats = {i: {"agent": agent.name, "status": "pending"} for i, agent in enumerate(agents)}
+        tokens = [CancellationToken(deadline) for _ in agents]
+
+        def run_branch(i: int) -> Response:
+            branch_start = time.monotonic()
+            response = self.run(
+                agent=agents[i],
+                messages=messages,
+                context_variables=context_variables,
+                model_override=model_override,
+                debug=debug,
+                max_turns=max_turns,
+                cancel_token=tokens[i],
+            )
+            branch_stats[i]["latency"] = time.monotonic() - branch_start
+            return response
+
+        executor = ThreadPoolExecutor(max_workers=max(len(agents), 1))
+        futures = [executor.submit(run_branch, i) for i in range(len(agents))]
+        pending = set(futures)
+        finished = set()
+        try:
+            while pending and len(finished) < first_k:
+                remaining = None if deadline is None else deadline - (time.monotonic() - start)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                finished |= done
+        finally:
+            for i, future in enumerate(futures):
+                if future not in finished:
+                    future.cancel()
+                    tokens[i].cancel()
+                    branch_stats[i]["status"] = "cancelled"
+            executor.shutdown(wait=False)
+
+        responses = {}
+        merged_context = snapshot(context_variables)
+        for i, future in enumerate(futures):
+            if future not in finished:
+                continue
+            try:
+                response = future.result()
+            except Exception as e:
+                debug_print(debug, f"Fan-out branch {i} ({agents[i].name}) failed: {str(e)}")
+                branch_stats[i]["status"] = "error"
+                branch_stats[i]["error"] = str(e)
+                continue
+            branch_stats[i]["status"] = "completed"
+            responses[i] = response
+            merged_context.update(response.context_delta)
+
+        merged = merge(responses)
+        if isinstance(merged, str):
+            senders = dict.fromkeys(agents[i].name for i in responses)
+            merged = {"role": "assistant", "content": merged, "sender": ", ".join(senders)}
+
+        return Response(
+            messages=[merged],
+            agent=None,
+            context_variables=merged_context,
+            stats={"fan_out": {"latency": time.monotonic() - start, "branches": branch_stats}},
+        )
+
+
+def merge_final_messages(responses: Dict[int, Response]) -> str:
+    """Default fan-out merge: each branch's final answer under the name of the agent that wrote it."""
+    sections = []
+    for i, response in responses.items():
+        answers = [m for m in response.messages if m.get("role") == "assistant" and m.get("content")]
+        if answers:
+            sections.append(f"{answers[-1].get('sender') or f'Branch {i}'}:\n{answers[-1]['content']}")
+    return "\n\n".join(sections)
@@ -0,0 +1,193 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Union
+
+from .cancellation import CancellationToken
+from .persistent import ContextVariables, History
+from .types import Agent, Response
+
+
+class Branch:
+    """One continuation in a ConversationTree, sharing its prefix with its siblings."""
+
+    __slots__ = ("name", "history", "context_variables", "response", "score", "error", "cancel_token", "prefix")
+
+    def __init__(self, name: str, history: History, context_variables: ContextVariables, prefix: int):
+        self.name = name
+        self.history = history
+        self.context_variables = context_variables
+        self.prefix = prefix
+        self.response: Optional[Response] = None
+        self.score: Optional[float] = None
+        self.error: Optional[str] = None
+        self.cancel_token = CancellationToken()
+
+    @property
+    def pruned(self) -> bool:
+        return self.history is None
+
+    def __repr__(self) -> str:
+        return f"Branch({self.name!r}, messages={len(self.history) if self.history is not None else None})"
+
+
+class ConversationTree:
+    """
+    Forks a conversation into branches for best-of-N and tree search.
+
+    Every branch is a `History.fork()` of its parent, so the messages before
+    the fork point are stored once however many branches there are. `run()`
+    runs branches concurrently but sends one request per shared prefix first
+    and holds its siblings until that request returns, so provider prefix
+    caches are warm when the rest arrive. `prune()` cancels a branch and drops
+    its messages straight away.
+    """
+
+    def __init__(
+        self,
+        client,
+        messages: Iterable[Dict[str, Any]] = (),
+        context_variables: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = 8,
+    ):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.root = Branch("root", History(messages), ContextVariables(context_variables or {}), 0)
+        self.branches: Dict[str, Branch] = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def fork(self, n: int = 1, at: Optional[int] = None, parent: Optional[Branch] = None) -> List[Branch]:
+        """
+        Creates `n` branches from the first `at` messages of `parent` (the
+        root by default), e.g. `at=k` to retry everything after message k.
+        """
+        parent = parent or self.root
+        if parent.pruned:
+            raise ValueError(f"Branch {parent.name} has been pruned")
+        at = len(parent.history) if at is None else at
+        branches = []
+        with self._lock:
+            for _ in range(n):
+                self._counter += 1
+                branch = Branch(
+                    f"b{self._counter}",
+                    parent.history.fork(at),
+                    parent.context_variables.snapshot(),
+                    at,
+                )
+                self.branches[branch.name] = branch
+                branches.append(branch)
+        return branches
+
+    def run(
+        self,
+        agent: Union[Agent, Sequence[Agent]],
+        branches: Optional[Sequence[Branch]] = None,
+        prime_cache: bool = True,
+        **run_kwargs,
+    ) -> List[Branch]:
+        """
+        Runs `agent` (or one agent per branch) on each branch and appends the
+        new messages to it. Defaults to every live branch that has not run yet.
+        Failures are recorded on `branch.error` rather than raised.
+        """
+        branches = list(branches) if branches is not None else [
+            b for b in self.branches.values() if b.response is None and b.error is None
+        ]
+        agents = list(agent) if isinstance(agent, (list, tuple)) else [agent] * len(branches)
+        if len(agents) != len(branches):
+            raise ValueError("Pass one agent, or one agent per branch")
+
+        primers, gates = set(), {}
+        for branch in branches:
+            key = self._prefix_key(branch)
+            if key not in gates:
+                gates[key] = threading.Event()
+                primers.add(branch.name)
+            if not prime_cache:
+                gates[key].set()
+        # primers are submitted first so waiting siblings never hold every worker
+        order = sorted(range(len(branches)), key=lambda i: branches[i].name not in primers)
+
+        def run_branch(branch: Branch, branch_agent: Agent, gate: threading.Event) -> None:
+            if branch.name not in primers:
+                gate.wait()
+            user_on_message = run_kwargs.get("on_message")
+
+            def on_message(message: Dict[str, Any]) -> None:
+                gate.set()
+                if user_on_message:
+                    user_on_message(message)
+
+            try:
+                if branch.pruned:
+                    return
+                response = self.client.run(
+                    branch_agent,
+                    branch.history,
+                    context_variables=branch.context_variables,
+                    **dict(run_kwargs, on_message=on_message, cancel_token=branch.cancel_token),
+                )
+                if branch.pruned:
+                    return
+                branch.history.extend(response.messages)
+                branch.context_variables = response.context_variables
+                branch.response = response
+            except Exception as e:
+                branch.error = str(e)
+            finally:
+                gate.set()
+
+        with ThreadPoolExecutor(max_workers=max(min(self.max_concurrency, len(branches)), 1)) as executor:
+            for i in order:
+                executor.submit(run_branch, branches[i], agents[i], gates[self._prefix_key(branches[i])])
+        return branches
+
+    def prune(self, *branches: Branch) -> None:
+        """Cancels the branches and releases their messages."""
+        for branch in branches:
+            branch.cancel_token.cancel()
+            with self._lock:
+                self.branches.pop(branch.name, None)
+            branch.history = None
+            branch.context_variables = None
+            branch.response = None
+
+    def keep_best(
+        self,
+        score: Callable[[Branch], float],
+        keep: int = 1,
+        branches: Optional[Sequence[Branch]] = None,
+    ) -> List[Branch]:
+        """Scores the finished branches, keeps the top `keep` and prunes the others and any failed ones."""
+        branches = list(branches) if branches is not None else list(self.branches.values())
+        finished = [b for b in branches if b.response is not None]
+        for branch in finished:
+            branch.score = score(branch)
+        ranked = sorted(finished, key=lambda b: b.score, reverse=True)
+        self.prune(*ranked[keep:], *[b for b in branches if b.error is not None])
+        return ranked[:keep]
+
+    @staticmethod
+    def _prefix_key(branch: Branch) -> tuple:
+        if branch.pruned:
+            return id(branch), branch.prefix
+        store = branch.history._store
+        parent = store.parent if store.parent is not None else store
+        return id(parent), branch.prefix
+
+
+def best_of_n(
+    client,
+    agent: Agent,
+    messages: Iterable[Dict[str, Any]],
+    n: int,
+    score: Callable[[Branch], float],
+    context_variables: Optional[Dict[str, Any]] = None,
+    **run_kwargs,
+) -> Optional[Branch]:
+    """Runs `n` continuations of `messages` and returns the best-scoring branch."""
+    tree = ConversationTree(client, messages, context_variables, max_concurrency=n)
+    tree.run(agent, tree.fork(n), **run_kwargs)
+    best = tree.keep_best(score)
+    return best[0] if best else None
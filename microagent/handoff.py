@@ -0,0 +1,59 @@
+from typing import List, Dict, Any, Callable
+
+from .llm.base import LLMClient
+from .memory import SUMMARY_PREFIX, SUMMARY_PROMPT
+
+HandoffFilter = Callable[[List[Dict[str, Any]], Any], List[Dict[str, Any]]]
+
+
+def drop_tool_messages(messages: List[Dict[str, Any]], agent) -> List[Dict[str, Any]]:
+    """Removes other agents' tool calls and their results, keeping any text they wrote."""
+    dropped_ids = set()
+    filtered = []
+    for message in messages:
+        if message.get("role") == "assistant" and message.get("tool_calls") and message.get("sender") != agent.name:
+            dropped_ids.update(call.get("id") for call in message["tool_calls"])
+            if message.get("content"):
+                filtered.append(dict(message, tool_calls=None))
+            continue
+        if message.get("role") == "tool" and message.get("tool_call_id") in dropped_ids:
+            continue
+        filtered.append(message)
+    return filtered
+
+
+def last_turns(n: int) -> HandoffFilter:
+    """Keeps only the messages from the last `n` user messages onwards."""
+    if n < 1:
+        raise ValueError("last_turns needs n >= 1")
+
+    def handoff_filter(messages: List[Dict[str, Any]], agent) -> List[Dict[str, Any]]:
+        starts = [i for i, message in enumerate(messages) if message.get("role") == "user"]
+        return list(messages[starts[-n]:]) if len(starts) >= n else list(messages)
+
+    return handoff_filter
+
+
+def summarize_previous(client: LLMClient, model: str) -> HandoffFilter:
+    """
+    Replaces the history with a summary written by `model`, followed by the
+    latest user message. Costs one extra request per handoff.
+    """
+
+    def handoff_filter(messages: List[Dict[str, Any]], agent) -> List[Dict[str, Any]]:
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=None)
+        earlier = [m for i, m in enumerate(messages) if i != last_user]
+        transcript = "\n".join(
+            f"{m.get('sender') or m.get('role')}: {m.get('content')}" for m in earlier if m.get("content")
+        )
+        if not transcript:
+            return list(messages)
+        completion = client.chat_completion(
+            messages=[client.prepare_system_message(SUMMARY_PROMPT), {"role": "user", "content": transcript}],
+            model=model,
+        )
+        summary = client.parse_response(completion).get("content") or ""
+        kept = [messages[last_user]] if last_user is not None else []
+        return [{"role": "user", "content": SUMMARY_PREFIX + summary}] + kept
+
+    return handoff_filter
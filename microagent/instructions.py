@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple
+
+_MISSING = object()
+
+
+def depends_on(*keys: str) -> Callable:
+    """
+    Declares the context_variables keys a callable `instructions` reads.
+
+    Instructions decorated this way are rendered once and only re-rendered
+    when one of the declared keys changes value.
+    """
+    def decorator(func: Callable) -> Callable:
+        func.context_keys = tuple(keys)
+        return func
+    return decorator
+
+
+class RecordingContext(Mapping):
+    """Read-only view over context_variables that records which keys were read."""
+
+    def __init__(self, context_variables: Dict[str, Any]):
+        self._data = context_variables
+        self.keys_read = set()
+        self.read_all = False
+
+    def __getitem__(self, key: str) -> Any:
+        self.keys_read.add(key)
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        self.read_all = True
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        self.read_all = True
+        return len(self._data)
+
+
+class _Entry:
+    __slots__ = ("instructions", "keys", "snapshot", "system_message")
+
+    def __init__(self, instructions, keys, snapshot, system_message):
+        self.instructions = instructions
+        self.keys = keys
+        self.snapshot = snapshot
+        self.system_message = system_message
+
+
+class InstructionsCache:
+    """
+    Per-agent cache of rendered system messages for callable instructions.
+
+    An entry is reused while every context key the instructions depend on
+    still compares equal to the value seen when it was rendered. Values
+    mutated in place are not detected; replace the value to invalidate.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Tuple[Any, _Entry]]" = OrderedDict()
+
+    def render(self, agent, context_variables: Dict[str, Any], prepare_system_message: Callable) -> Tuple[Dict[str, Any], Optional[bool]]:
+        """
+        Returns the system message for `agent` and whether it came from the cache.
+        The second value is None when the agent's instructions are not cacheable.
+        """
+        instructions = agent.instructions
+        if not callable(instructions):
+            return prepare_system_message(instructions), None
+
+        declared = getattr(instructions, "context_keys", None)
+        if declared is None and not agent.cache_instructions:
+            return prepare_system_message(instructions(context_variables)), None
+
+        key = id(agent)
+        cached = self._entries.get(key)
+        if cached is not None:
+            cached_agent, entry = cached
+            if cached_agent is agent and entry.instructions is instructions and self._is_fresh(entry, context_variables):
+                self._entries.move_to_end(key)
+                return entry.system_message, True
+
+        if declared is not None:
+            keys = declared
+            rendered = instructions(context_variables)
+        else:
+            recorder = RecordingContext(context_variables)
+            rendered = instructions(recorder)
+            keys = None if recorder.read_all else tuple(recorder.keys_read)
+
+        system_message = prepare_system_message(rendered)
+        entry = _Entry(instructions, keys, self._snapshot(keys, context_variables), system_message)
+        self._entries[key] = (agent, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return system_message, False
+
+    @staticmethod
+    def _snapshot(keys, context_variables: Dict[str, Any]) -> Dict[str, Any]:
+        if keys is None:
+            return dict(context_variables)
+        return {k: context_variables.get(k, _MISSING) for k in keys}
+
+    @staticmethod
+    def _is_fresh(entry: _Entry, context_variables: Dict[str, Any]) -> bool:
+        if entry.keys is None and len(context_variables) != len(entry.snapshot):
+            return False
+        for k, seen in entry.snapshot.items():
+            current = context_variables.get(k, _MISSING)
+            if current is seen:
+                continue
+            try:
+                if current != seen:
+                    return False
+            except Exception:
+                return False
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
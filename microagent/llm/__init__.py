@@ -3,5 +3,8 @@ from .base import LLMClient
 from .openai_client import OpenAIClient
 from .anthropic_client import AnthropicClient
 from .groq_client import GroqClient
+from .local_client import LocalClient
+from .replay import RecordingClient, ReplayClient
+from .single_flight import SingleFlightClient
 
-__all__ = ['LLMFactory', 'LLMClient', 'OpenAIClient', 'AnthropicClient', 'GroqClient']
\ No newline at end of file
+__all__ = ['LLMFactory', 'LLMClient', 'OpenAIClient', 'AnthropicClient', 'GroqClient', 'LocalClient', 'RecordingClient', 'ReplayClient', 'SingleFlightClient']
\ No newline at end of file
@@ -1,6 +1,9 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 from anthropic import Anthropic
 from .base import LLMClient
+from ..attachments import b64encode, is_text
+from ..structured import OUTPUT_TOOL_NAME
+from ..types import Attachment
 import json
 
 class AnthropicClient(LLMClient):
@@ -34,6 +37,20 @@ class AnthropicClient(LLMClient):
         # ]
         return messages
     
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        if attachment.mime_type.startswith("image/"):
+            block_type = "image"
+        elif attachment.mime_type == "application/pdf" or is_text(attachment):
+            block_type = "document"
+        else:
+            raise ValueError(f"Anthropic does not accept {attachment.mime_type} attachments")
+        if attachment.remote:
+            return {"type": block_type, "source": {"type": "url", "url": attachment.url}}
+        if is_text(attachment):
+            text = attachment.read().decode("utf-8", errors="replace")
+            return {"type": "document", "source": {"type": "text", "media_type": "text/plain", "data": text}}
+        return {"type": block_type, "source": {"type": "base64", "media_type": attachment.mime_type, "data": b64encode(attachment)}}
+
     def prepare_tools(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         prepared_tools = []
         for tool in tools:
@@ -70,6 +87,9 @@ class AnthropicClient(LLMClient):
                     if block.type == 'text':
                         # Collect text content from TextBlock
                         content.append(getattr(block, 'text', ''))
+                    elif block.type == 'tool_use' and getattr(block, 'name', '') == OUTPUT_TOOL_NAME:
+                        # Structured output is requested as a forced tool call
+                        content.append(json.dumps(getattr(block, 'input', {})))
                     elif block.type == 'tool_use':
                         # Collect tool usage details from ToolUseBlock
                         tool_calls.append({
@@ -81,12 +101,68 @@ class AnthropicClient(LLMClient):
                         })
 
         # Return the structured response
-        return {
+        parsed = {
             "role": "assistant",
             "content": "\n".join(content) if content else "None",
             "tool_calls": tool_calls if tool_calls else None
         }
+        usage = self.parse_usage(response)
+        if usage:
+            parsed["usage"] = usage
+        return parsed
+
+    def parse_usage(self, response: Any) -> Dict[str, int]:
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            # message_start stream events carry usage on the embedded message
+            usage = getattr(getattr(response, 'message', None), 'usage', None)
+        if usage is None or not isinstance(getattr(usage, 'output_tokens', None), int):
+            return {}
+        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        return {
+            "input_tokens": (getattr(usage, 'input_tokens', 0) or 0) + cache_read + cache_write,
+            "output_tokens": usage.output_tokens,
+            "cache_read_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+        }
     
+    def stream_deltas(self, stream: Any) -> Iterator[Dict[str, Any]]:
+        tool_indexes = {}
+        output_blocks = set()
+        for event in stream:
+            event_type = getattr(event, 'type', None)
+            if event_type in ('message_start', 'message_delta'):
+                usage = self.parse_usage(event)
+                if usage:
+                    yield {"usage": usage}
+            elif event_type == 'content_block_start' and event.content_block.type == 'tool_use' and event.content_block.name == OUTPUT_TOOL_NAME:
+                output_blocks.add(event.index)
+            elif event_type == 'content_block_start' and event.content_block.type == 'tool_use':
+                tool_indexes[event.index] = len(tool_indexes)
+                yield {"tool_calls": [{
+                    "index": tool_indexes[event.index],
+                    "id": event.content_block.id,
+                    "type": "function",
+                    "function": {"name": event.content_block.name, "arguments": ""},
+                }]}
+            elif event_type == 'content_block_delta':
+                if event.delta.type == 'text_delta':
+                    yield {"content": event.delta.text}
+                elif event.delta.type == 'input_json_delta' and event.index in output_blocks:
+                    yield {"content": event.delta.partial_json}
+                elif event.delta.type == 'input_json_delta' and event.index in tool_indexes:
+                    yield {"tool_calls": [{
+                        "index": tool_indexes[event.index],
+                        "function": {"arguments": event.delta.partial_json},
+                    }]}
+
+    def warmup(self) -> None:
+        try:
+            self.client.models.list(limit=1)
+        except Exception:
+            pass
+
     def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
         
         params = {
@@ -94,11 +170,23 @@ class AnthropicClient(LLMClient):
             "max_tokens": kwargs.get('max_tokens', self.default_max_tokens),
             "messages": [
                 {k: v for k, v in message.items() if k != 'tool_calls' and k!= 'sender'}
-                for message in kwargs['messages']
+                for message in self.prepare_attachments(kwargs['messages'])
             ],
         }
         if 'tools' in kwargs and kwargs['tools']:
             params["tools"] = self.prepare_tools(kwargs['tools'])
+        if kwargs.get('response_format'):
+            # No native JSON mode: force a tool whose input schema is the output schema
+            json_schema = kwargs['response_format']['json_schema']
+            params.setdefault("tools", []).append({
+                "name": OUTPUT_TOOL_NAME,
+                "description": f"Respond with the final {json_schema['name']} result.",
+                "input_schema": json_schema['schema'],
+            })
+            forced = {"type": "tool", "name": OUTPUT_TOOL_NAME}
+            params["tool_choice"] = {"type": "any"} if len(params["tools"]) > 1 else forced
+        if kwargs.get('timeout') is not None:
+            params["timeout"] = kwargs['timeout']
         
         # Handle system message
         if params['messages'] and params['messages'][0]['role'] == 'system':
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
+
+from ..attachments import expand_attachments
+from ..types import Attachment
 
 class LLMClient(ABC):
     @abstractmethod
@@ -30,6 +33,40 @@ class LLMClient(ABC):
     def parse_response(self, response: Any) -> Dict[str, Any]:
         pass
 
+    def parse_usage(self, response: Any) -> Dict[str, int]:
+        """
+        Extracts token counts from a provider response or final stream chunk as
+        input_tokens, output_tokens, cache_read_tokens and cache_write_tokens,
+        where input_tokens includes cached tokens. Returns {} when absent.
+        """
+        return {}
+
+    def stream_deltas(self, stream: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Normalizes a stream from stream_chat_completion into OpenAI-style deltas:
+        {"content": str}, {"tool_calls": [{"index": int, "id", "type", "function"}]}
+        and {"usage": {...}}. Clients whose stream_chat_completion returns a
+        complete response get it back as a single delta.
+        """
+        for response in ([stream] if isinstance(stream, dict) else stream):
+            message = self.parse_response(response)
+            delta = {k: message[k] for k in ("content", "usage") if message.get(k)}
+            if message.get("tool_calls"):
+                delta["tool_calls"] = [dict(tool_call, index=i) for i, tool_call in enumerate(message["tool_calls"])]
+            yield delta
+
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        """Converts an Attachment into this provider's content block."""
+        raise ValueError(f"{type(self).__name__} does not support attachments")
+
+    def prepare_attachments(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replaces message "attachments" with content blocks, encoding each attachment once."""
+        return expand_attachments(messages, self.prepare_attachment, type(self).__name__)
+
+    def warmup(self) -> None:
+        """Opens a pooled connection to the provider ahead of the first request."""
+        pass
+
     @abstractmethod
     def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
         pass
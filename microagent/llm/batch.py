@@ -0,0 +1,118 @@
+import io
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Union
+
+from openai.types.chat import ChatCompletion
+
+from .base import LLMClient
+
+BatchResult = Union[Dict[str, Any], Exception]
+
+
+class BatchError(RuntimeError):
+    pass
+
+
+class BatchBackend(ABC):
+    """
+    Submits many chat requests as one asynchronous provider batch job.
+
+    Requests are keyed by a caller-chosen custom id and hold the same params
+    `LLMClient.chat_completion` receives. `results()` maps each custom id to a
+    parsed assistant message, or to an exception for requests that failed.
+    """
+
+    def __init__(self, client: LLMClient):
+        self.client = client
+
+    @abstractmethod
+    def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        pass
+
+    @abstractmethod
+    def is_done(self, batch_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        pass
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: uploads a JSONL file and runs it against /v1/chat/completions."""
+
+    endpoint = "/v1/chat/completions"
+    terminal = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client: LLMClient, completion_window: str = "24h", default_model: str = "gpt-3.5-turbo"):
+        super().__init__(client)
+        self.completion_window = completion_window
+        self.default_model = default_model
+
+    def request_body(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        params = dict(params)
+        if not params.get('tools'):
+            params.pop('tools', None)
+        params.setdefault('model', self.default_model)
+        return self.client.prepare_chat_params(**params)
+
+    def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        lines = [
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": self.endpoint, "body": self.request_body(params)})
+            for custom_id, params in requests.items()
+        ]
+        upload = self.client.client.files.create(
+            file=("batch.jsonl", io.BytesIO("\n".join(lines).encode())),
+            purpose="batch",
+        )
+        batch = self.client.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=self.endpoint,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self.client.client.batches.retrieve(batch_id).status in self.terminal
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch = self.client.client.batches.retrieve(batch_id)
+        results: Dict[str, BatchResult] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code") != 200:
+                    results[record["custom_id"]] = BatchError(str(record.get("error") or response.get("body")))
+                else:
+                    results[record["custom_id"]] = self.client.parse_response(ChatCompletion.model_validate(response["body"]))
+        return results
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API."""
+
+    def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        batch = self.client.client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": self.client.prepare_chat_params(**params)}
+            for custom_id, params in requests.items()
+        ])
+        return batch.id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self.client.client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        results: Dict[str, BatchResult] = {}
+        for entry in self.client.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = self.client.parse_response(entry.result.message)
+            else:
+                error = getattr(entry.result, "error", None)
+                results[entry.custom_id] = BatchError(f"{entry.result.type}: {error}")
+        return results
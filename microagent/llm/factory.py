@@ -1,6 +1,7 @@
 from .openai_client import OpenAIClient
 from .anthropic_client import AnthropicClient
 from .groq_client import GroqClient
+from .local_client import LocalClient
 
 class LLMFactory:
     @staticmethod
@@ -11,5 +12,7 @@ class LLMFactory:
             return AnthropicClient()
         elif llm_type == 'groq':
             return GroqClient()
+        elif llm_type == 'local':
+            return LocalClient()
         else:
             raise ValueError(f"Unsupported LLM type: {llm_type}")
\ No newline at end of file
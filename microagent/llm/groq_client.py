@@ -1,6 +1,8 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 import groq
 from .base import LLMClient
+from ..attachments import data_url, is_text
+from ..types import Attachment
 import json
 
 class GroqClient(LLMClient):
@@ -22,9 +24,17 @@ class GroqClient(LLMClient):
     def prepare_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         return [
             {k: v for k, v in msg.items() if k not in ['sender', 'tool_name']}
-            for msg in messages
+            for msg in self.prepare_attachments(messages)
         ]
 
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        if attachment.mime_type.startswith("image/"):
+            url = attachment.url if attachment.remote else data_url(attachment)
+            return {"type": "image_url", "image_url": {"url": url}}
+        if is_text(attachment):
+            return {"type": "text", "text": attachment.read().decode("utf-8", errors="replace")}
+        raise ValueError(f"Groq does not accept {attachment.mime_type} attachments")
+
     def prepare_tools(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         return tools
 
@@ -55,6 +65,10 @@ class GroqClient(LLMClient):
                         }
                         for tool_call in choice.message.tool_calls
                     ]
+
+                usage = self.parse_usage(response)
+                if usage:
+                    parsed_response["usage"] = usage
                 
                 return parsed_response
             else:
@@ -64,6 +78,52 @@ class GroqClient(LLMClient):
                     "tool_calls": None
                 }
 
+    def parse_usage(self, response: Any) -> Dict[str, int]:
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            # Streaming chunks carry usage on the final chunk's x_groq field
+            usage = getattr(getattr(response, 'x_groq', None), 'usage', None)
+        if usage is None:
+            return {}
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            "input_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+            "output_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+            "cache_read_tokens": getattr(details, 'cached_tokens', 0) or 0,
+            "cache_write_tokens": 0,
+        }
+
+    def stream_deltas(self, stream: Any) -> Iterator[Dict[str, Any]]:
+        for chunk in stream:
+            delta = {}
+            if chunk.choices:
+                choice_delta = chunk.choices[0].delta
+                if choice_delta.content:
+                    delta["content"] = choice_delta.content
+                if choice_delta.tool_calls:
+                    delta["tool_calls"] = [
+                        {
+                            "index": tool_call.index,
+                            "id": tool_call.id or "",
+                            "type": tool_call.type or "",
+                            "function": {
+                                "name": (tool_call.function.name if tool_call.function else None) or "",
+                                "arguments": (tool_call.function.arguments if tool_call.function else None) or "",
+                            },
+                        } for tool_call in choice_delta.tool_calls
+                    ]
+            usage = self.parse_usage(chunk)
+            if usage:
+                delta["usage"] = usage
+            if delta:
+                yield delta
+
+    def warmup(self) -> None:
+        try:
+            self.client.models.list()
+        except Exception:
+            pass
+
     def prepare_chat_params(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         params = {
             "model": kwargs.get('model', 'llama3-groq-70b-8192-tool-use-preview'),  # Default model for Groq
@@ -73,6 +133,10 @@ class GroqClient(LLMClient):
             params["tools"] = kwargs['tools']
         if 'tool_choice' in kwargs:
             params["tool_choice"] = kwargs['tool_choice']
+        if kwargs.get('response_format'):
+            params["response_format"] = kwargs['response_format']
+        if kwargs.get('timeout') is not None:
+            params["timeout"] = kwargs['timeout']
         return params
 
     def prepare_system_message(self, instructions: str) -> Dict[str, Any]:
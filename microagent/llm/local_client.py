@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import httpx
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
+
+from ..batching import MicroBatcher
+from .openai_client import OpenAIClient
+
+DEFAULT_BASE_URL = "http://localhost:8000/v1"
+
+
+class LocalClient(OpenAIClient):
+    """
+    Client for local OpenAI-compatible inference servers such as vLLM or llama.cpp.
+
+    Concurrent chat_completion calls are gathered by a MicroBatcher and sent
+    as one POST to `{base_url}{batch_path}` with {"requests": [...]}, expecting
+    {"responses": [...]} back. That batch endpoint is not part of the OpenAI
+    API and neither vLLM nor llama.cpp serve it; it is for a gateway or proxy
+    in front of them that does. If the server answers 404, 405 or 501 the
+    client falls back to individual concurrent requests for the rest of its
+    lifetime, which vLLM and llama.cpp batch on the GPU themselves.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        default_model: str = "local-model",
+        batching: bool = True,
+        batch_window: float = 0.005,
+        max_batch_size: int = 16,
+        batch_path: str = "/batch/chat/completions",
+        timeout: float = 600.0,
+    ):
+        self.base_url = (base_url or os.environ.get("MICROAGENT_LOCAL_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        api_key = api_key or os.environ.get("MICROAGENT_LOCAL_API_KEY") or "local"
+        self.client = OpenAI(base_url=self.base_url, api_key=api_key, timeout=timeout)
+        self.default_model = default_model
+        self.batch_path = batch_path
+        self._http = httpx.Client(timeout=timeout, headers={"Authorization": f"Bearer {api_key}"})
+        self._batch_supported = batching
+        self._fallback = ThreadPoolExecutor(max_workers=max_batch_size)
+        self.batcher = MicroBatcher(self._send_batch, batch_window, max_batch_size) if batching else None
+
+    def _completion_params(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        if 'tools' in kwargs and not kwargs['tools']:
+            del kwargs['tools']
+        kwargs.setdefault('model', self.default_model)
+        return self.prepare_chat_params(messages=messages, **kwargs)
+
+    def chat_completion(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        params = self._completion_params(messages, **kwargs)
+        if self._batch_supported and self.batcher is not None:
+            timeout = params.pop('timeout', None)
+            return self.batcher.submit(params).result(timeout=timeout)
+        return self.parse_response(self.client.chat.completions.create(**params))
+
+    def _send_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        if len(batch) > 1 and self._batch_supported:
+            response = self._http.post(self.base_url + self.batch_path, json={"requests": batch})
+            if response.status_code in (404, 405, 501):
+                self._batch_supported = False
+            else:
+                response.raise_for_status()
+                return [
+                    RuntimeError(item["error"]) if "error" in item
+                    else self.parse_response(ChatCompletion.model_validate(item))
+                    for item in response.json()["responses"]
+                ]
+        return list(self._fallback.map(self._send_one, batch))
+
+    def _send_one(self, params: Dict[str, Any]) -> Any:
+        try:
+            return self.parse_response(self.client.chat.completions.create(**params))
+        except Exception as e:
+            return e
+
+    def stream_chat_completion(self, messages: List[Dict[str, Any]], **kwargs) -> Any:
+        params = self._completion_params(messages, **kwargs)
+        params['stream_options'] = {"include_usage": True}
+        return self.client.chat.completions.create(stream=True, **params)
@@ -1,7 +1,14 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 from openai import OpenAI
+from .base import LLMClient
+from ..attachments import b64encode, data_url, is_text
+from ..types import Attachment
+
+class OpenAIClient(LLMClient):
+    # Non-image attachments larger than this many bytes are sent once through
+    # the Files API and referenced by file_id afterwards; None inlines them.
+    upload_attachments_over: Optional[int] = None
 
-class OpenAIClient:
     def __init__(self):
         self.client = OpenAI()
 
@@ -19,10 +26,25 @@ class OpenAIClient:
             del kwargs['tools']
         if 'model' not in kwargs:
             kwargs['model'] = 'gpt-3.5-turbo'  # Default model
-        return self.client.chat.completions.create(messages=messages, stream=True, **kwargs)
+        params = self.prepare_chat_params(messages=messages, **kwargs)
+        params['stream'] = True
+        params['stream_options'] = kwargs.get('stream_options') or {"include_usage": True}
+        return self.client.chat.completions.create(**params)
 
     def prepare_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        return messages
+        return self.prepare_attachments(messages)
+
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        if attachment.mime_type.startswith("image/"):
+            url = attachment.url if attachment.remote else data_url(attachment)
+            return {"type": "image_url", "image_url": {"url": url}}
+        if is_text(attachment):
+            return {"type": "text", "text": attachment.read().decode("utf-8", errors="replace")}
+        data = attachment.read()
+        if self.upload_attachments_over is not None and len(data) > self.upload_attachments_over:
+            uploaded = self.client.files.create(file=(attachment.name or "attachment", data, attachment.mime_type), purpose="user_data")
+            return {"type": "file", "file": {"file_id": uploaded.id}}
+        return {"type": "file", "file": {"filename": attachment.name or "attachment", "file_data": f"data:{attachment.mime_type};base64,{b64encode(attachment)}"}}
 
     def prepare_tools(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         return tools
@@ -46,7 +68,7 @@ class OpenAIClient:
                 ]
             }
         message = response.choices[0].message
-        return {
+        parsed = {
             "role": message.role,
             "content": message.content,
             "tool_calls": [
@@ -60,19 +82,70 @@ class OpenAIClient:
                 } for tool_call in (message.tool_calls or [])
             ]
         }
+        usage = self.parse_usage(response)
+        if usage:
+            parsed["usage"] = usage
+        return parsed
+
+    def parse_usage(self, response: Any) -> Dict[str, int]:
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return {}
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            "input_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+            "output_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+            "cache_read_tokens": getattr(details, 'cached_tokens', 0) or 0,
+            "cache_write_tokens": 0,
+        }
     
+    def stream_deltas(self, stream: Any) -> Iterator[Dict[str, Any]]:
+        for chunk in stream:
+            delta = {}
+            if chunk.choices:
+                choice_delta = chunk.choices[0].delta
+                if choice_delta.content:
+                    delta["content"] = choice_delta.content
+                if choice_delta.tool_calls:
+                    delta["tool_calls"] = [
+                        {
+                            "index": tool_call.index,
+                            "id": tool_call.id or "",
+                            "type": tool_call.type or "",
+                            "function": {
+                                "name": (tool_call.function.name if tool_call.function else None) or "",
+                                "arguments": (tool_call.function.arguments if tool_call.function else None) or "",
+                            },
+                        } for tool_call in choice_delta.tool_calls
+                    ]
+            usage = self.parse_usage(chunk)
+            if usage:
+                delta["usage"] = usage
+            if delta:
+                yield delta
+
+    def warmup(self) -> None:
+        try:
+            self.client.models.list()
+        except Exception:
+            pass
+
     def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
         params = {
             "model": kwargs.get('model', 'gpt-3.5-turbo'),
             "messages": [
-                {k: v for k, v in message.items() if k != 'tool_calls' or v}
-                for message in kwargs['messages']
+                {k: v for k, v in message.items() if k not in ('sender', 'tool_name') and (k != 'tool_calls' or v)}
+                for message in self.prepare_messages(kwargs['messages'])
             ],
         }
         if 'tools' in kwargs and kwargs['tools']:  # Check if tools exist and are not empty
             params["tools"] = kwargs['tools']
             if 'tool_choice' in kwargs:  # Only add tool_choice if tools exist
                 params["tool_choice"] = kwargs['tool_choice']
+        if kwargs.get('response_format'):
+            params["response_format"] = kwargs['response_format']
+        if kwargs.get('timeout') is not None:
+            params["timeout"] = kwargs['timeout']
 
         return params
 
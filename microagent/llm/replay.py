@@ -0,0 +1,167 @@
+import hashlib
+import itertools
+import json
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from ..types import Attachment
+from .base import LLMClient
+
+MATCH_PARAMS = "params"
+MATCH_POSITION = "position"
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+def canonical_params(params: Dict[str, Any]) -> str:
+    """Stable JSON encoding of chat params, used as the replay match key. Request timeouts are ignored."""
+    params = {k: v for k, v in params.items() if k != "timeout"}
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(canonical_params(params).encode()).hexdigest()
+
+
+class RecordingClient(LLMClient):
+    """
+    Wraps a real LLMClient and appends every completion to a JSONL file.
+
+    Each line holds the canonical params hash, the parsed assistant message
+    and the request latency. Set `include_params` to also store the params.
+    Streaming calls are passed through without being recorded.
+    """
+
+    def __init__(self, client: LLMClient, path: str, include_params: bool = False):
+        self.client = client
+        self.path = path
+        self.include_params = include_params
+        self._lock = threading.Lock()
+
+    def chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        start = time.monotonic()
+        response = self.client.parse_response(self.client.chat_completion(messages=messages, **kwargs))
+        latency = time.monotonic() - start
+
+        params = dict(kwargs, messages=messages)
+        record = {"key": params_key(params), "latency": round(latency, 4), "response": response}
+        if self.include_params:
+            record["params"] = params
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        return response
+
+    def stream_chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Any:
+        return self.client.stream_chat_completion(messages=messages, **kwargs)
+
+    def prepare_messages(self, messages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_messages(messages)
+
+    def prepare_tools(self, tools: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_tools(tools)
+
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        return self.client.prepare_attachment(attachment)
+
+    def parse_response(self, response: Any) -> Dict[str, Any]:
+        if isinstance(response, dict):
+            return response
+        return self.client.parse_response(response)
+
+    def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
+        return self.client.prepare_chat_params(**kwargs)
+
+    def prepare_system_message(self, instructions: str) -> Dict[str, Any]:
+        return self.client.prepare_system_message(instructions)
+
+    def prepare_tool_response(self, tool_call_id: str, tool_name: str, content: str) -> Dict[str, Any]:
+        return self.client.prepare_tool_response(tool_call_id, tool_name, content)
+
+
+class ReplayClient(LLMClient):
+    """
+    Serves recorded completions without touching the network.
+
+    `match` is "params" to look up each request by its canonical params, or
+    "position" to return recordings in file order, wrapping around. Requests
+    with several recordings for the same params rotate through them. The
+    recorded latency is multiplied by `latency_scale`: 1.0 replays it as
+    recorded, 0 disables it. Message formatting follows the OpenAI layout
+    unless a `client` is given to delegate it to.
+    """
+
+    def __init__(self, path: str, match: str = MATCH_PARAMS, latency_scale: float = 1.0, client: Optional[LLMClient] = None):
+        if match not in (MATCH_PARAMS, MATCH_POSITION):
+            raise ValueError(f"Unsupported replay match mode: {match}")
+        self.match = match
+        self.latency_scale = latency_scale
+        self.client = client
+        self.records = []
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    self.records.append(json.loads(line))
+        if not self.records:
+            raise ValueError(f"No recordings found in {path}")
+
+        by_key: Dict[str, List[Dict[str, Any]]] = {}
+        for record in self.records:
+            by_key.setdefault(record["key"], []).append(record)
+        self._by_key = {key: itertools.cycle(records) for key, records in by_key.items()}
+        self._position = itertools.cycle(self.records)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _next_record(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if self.match == MATCH_POSITION:
+                self.hits += 1
+                return next(self._position)
+            records = self._by_key.get(params_key(params))
+            if records is None:
+                self.misses += 1
+                raise ReplayMissError(f"No recording matches request for model {params.get('model')}")
+            self.hits += 1
+            return next(records)
+
+    def chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        record = self._next_record(dict(kwargs, messages=messages))
+        if self.latency_scale:
+            time.sleep(record["latency"] * self.latency_scale)
+        return json.loads(json.dumps(record["response"]))
+
+    def stream_chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Any:
+        return self.chat_completion(messages=messages, **kwargs)
+
+    def prepare_messages(self, messages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_messages(messages) if self.client else messages
+
+    def prepare_tools(self, tools: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_tools(tools) if self.client else tools
+
+    def parse_response(self, response: Any) -> Dict[str, Any]:
+        return response
+
+    def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
+        return self.client.prepare_chat_params(**kwargs) if self.client else kwargs
+
+    def prepare_system_message(self, instructions: str) -> Dict[str, Any]:
+        if self.client:
+            return self.client.prepare_system_message(instructions)
+        return {"role": "system", "content": instructions}
+
+    def prepare_tool_response(self, tool_call_id: str, tool_name: str, content: str) -> Dict[str, Any]:
+        if self.client:
+            return self.client.prepare_tool_response(tool_call_id, tool_name, content)
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call_id,
+            "tool_name": tool_name,
+            "content": content,
+        }
@@ -0,0 +1,102 @@
+import copy
+import threading
+from typing import Dict, Any, List
+
+from ..types import Attachment
+from .base import LLMClient
+from .replay import params_key
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlightClient(LLMClient):
+    """
+    Wraps an LLMClient so identical concurrent completions share one upstream call.
+
+    Requests are identical when their canonical params match. The first caller
+    makes the request; callers arriving while it is in flight wait for it and
+    each receive their own deep copy of the parsed message. Only the first
+    caller's copy carries `usage`, so token accounting matches what was billed.
+    Waiters give up with TimeoutError after their own `timeout`, if one is set.
+    Nothing is kept once the call finishes; this is not a cache. Streaming
+    calls are passed through.
+    """
+
+    def __init__(self, client: LLMClient):
+        self.client = client
+        self.stats = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _Call] = {}
+
+    def chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        key = params_key(dict(kwargs, messages=messages))
+        with self._lock:
+            self.stats["requests"] += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.stats["upstream_calls"] += 1
+            else:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = self.client.parse_response(self.client.chat_completion(messages=messages, **kwargs))
+            except Exception as e:
+                call.error = e
+            with self._lock:
+                del self._in_flight[key]
+                if call.error is not None:
+                    self.stats["errors"] += 1
+            call.done.set()
+        elif not call.done.wait(kwargs.get("timeout")):
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+
+        if call.error is not None:
+            raise call.error
+        result = copy.deepcopy(call.result)
+        if not leader:
+            result.pop("usage", None)
+        return result
+
+    def stream_chat_completion(self, messages: List[Dict[str, Any]] = None, **kwargs) -> Any:
+        return self.client.stream_chat_completion(messages=messages, **kwargs)
+
+    def stream_deltas(self, stream: Any):
+        return self.client.stream_deltas(stream)
+
+    def warmup(self) -> None:
+        self.client.warmup()
+
+    def prepare_messages(self, messages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_messages(messages)
+
+    def prepare_tools(self, tools: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.client.prepare_tools(tools)
+
+    def prepare_attachment(self, attachment: Attachment) -> Dict[str, Any]:
+        return self.client.prepare_attachment(attachment)
+
+    def parse_response(self, response: Any) -> Dict[str, Any]:
+        if isinstance(response, dict):
+            return response
+        return self.client.parse_response(response)
+
+    def prepare_chat_params(self, **kwargs) -> Dict[str, Any]:
+        return self.client.prepare_chat_params(**kwargs)
+
+    def prepare_system_message(self, instructions: str) -> Dict[str, Any]:
+        return self.client.prepare_system_message(instructions)
+
+    def prepare_tool_response(self, tool_call_id: str, tool_name: str, content: str) -> Dict[str, Any]:
+        return self.client.prepare_tool_response(tool_call_id, tool_name, content)
@@ -0,0 +1,276 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Sequence
+
+from .llm.base import LLMClient
+from .persistent import History
+from .util import debug_print, estimate_tokens
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation so far for an assistant that will continue it. "
+    "Keep names, identifiers, decisions, open questions and any facts the user stated. "
+    "Be concise."
+)
+SUMMARY_PREFIX = "[Summary of earlier conversation]\n"
+
+
+class HistoryCompactor:
+    """
+    Replaces older turns with a summary, produced off the critical path.
+
+    Call `maybe_compact()` once a turn has finished. When the history is longer
+    than `max_messages` or `max_tokens`, everything except the last
+    `keep_recent` messages is summarized by `model` on a background thread.
+    Call `apply()` before the next request: it swaps in the summary if one is
+    ready and returns the history unchanged otherwise, so a user-visible turn
+    never waits for summarization.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        model: str,
+        max_messages: int = 40,
+        max_tokens: Optional[int] = None,
+        keep_recent: int = 10,
+        debug: bool = False,
+    ):
+        self.client = client
+        self.model = model
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.debug = debug
+        self.stats = {"compactions": 0, "messages_removed": 0, "failures": 0, "last_latency": None}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = None
+
+    def _over_threshold(self, history) -> bool:
+        if len(history) > self.max_messages:
+            return True
+        return self.max_tokens is not None and estimate_tokens(list(history)) > self.max_tokens
+
+    def _cut_point(self, history) -> int:
+        """Index of the first kept message: a user message, so tool calls stay with their results."""
+        cut = max(len(history) - self.keep_recent, 0)
+        while cut > 0 and history[cut].get("role") != "user":
+            cut -= 1
+        return cut
+
+    def maybe_compact(self, history) -> bool:
+        """Starts a background summarization if needed; returns whether one was started."""
+        with self._lock:
+            if self._thread is not None or self._ready is not None or not self._over_threshold(history):
+                return False
+            cut = self._cut_point(history)
+            prefix = list(history[:cut])
+            if cut == 0 or len(prefix) < 2:
+                return False
+            self._thread = threading.Thread(target=self._summarize, args=(prefix,), daemon=True)
+            self._thread.start()
+            return True
+
+    def _summarize(self, prefix: List[Dict[str, Any]]) -> None:
+        start = time.monotonic()
+        transcript = "\n".join(
+            f"{m.get('sender') or m.get('role')}: {m.get('content')}" for m in prefix if m.get("content")
+        )
+        try:
+            completion = self.client.chat_completion(
+                messages=[
+                    self.client.prepare_system_message(SUMMARY_PROMPT),
+                    {"role": "user", "content": transcript},
+                ],
+                model=self.model,
+            )
+            summary = self.client.parse_response(completion).get("content") or ""
+        except Exception as e:
+            debug_print(self.debug, f"History summarization failed: {str(e)}")
+            with self._lock:
+                self.stats["failures"] += 1
+                self._thread = None
+            return
+        with self._lock:
+            self._ready = (prefix, summary)
+            self._thread = None
+            self.stats["last_latency"] = time.monotonic() - start
+
+    def apply(self, history):
+        """Returns `history` with a finished summary swapped in for the turns it covers."""
+        with self._lock:
+            if self._ready is None:
+                return history
+            prefix, summary = self._ready
+            self._ready = None
+            if len(history) < len(prefix) or any(a is not b for a, b in zip(prefix, history)):
+                return history
+            compacted = [{"role": "user", "content": SUMMARY_PREFIX + summary}] + list(history[len(prefix):])
+            self.stats["compactions"] += 1
+            self.stats["messages_removed"] += len(prefix) - 1
+        return History(compacted) if isinstance(history, History) else compacted
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+MEMORY_PREFIX = "[Relevant earlier conversation]\n"
+
+
+class VectorMemory:
+    """
+    Long-term memory of past messages, searched by similarity instead of resent in full.
+
+    Message text is embedded with `embed` (a function from a list of strings to
+    a list of vectors) and stored in `path`: normalized vectors in a
+    memory-mapped NumPy file that grows in place, and the messages themselves
+    in a JSONL file read back only for search hits. `context()` builds the
+    messages for a turn: one note with the top matches for the latest user
+    message followed by a short recent window, so the request size stays
+    flat however long the history gets. Requires NumPy.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embed: Callable[[List[str]], Sequence[Sequence[float]]],
+        dtype: str = "float32",
+        roles: Sequence[str] = ("user", "assistant"),
+        chunk_size: int = 65536,
+    ):
+        import numpy as np
+
+        self._np = np
+        self.path = path
+        self.embed = embed
+        self.roles = set(roles)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._vectors_path = os.path.join(path, "vectors.bin")
+        self._records_path = os.path.join(path, "records.jsonl")
+
+        meta = {"dim": None, "count": 0, "capacity": 0, "dtype": dtype}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta.update(json.load(f))
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.capacity = meta["capacity"]
+        self.dtype = np.dtype(meta["dtype"])
+        self._vectors = None
+        self._offsets: List[int] = []
+        if os.path.exists(self._records_path):
+            with open(self._records_path, "rb") as f:
+                offset = 0
+                for line in f:
+                    self._offsets.append(offset)
+                    offset += len(line)
+        del self._offsets[self.count:]
+        if self.capacity:
+            self._map()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _map(self) -> None:
+        self._vectors = self._np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dim))
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(self.capacity, 1024)
+        while capacity < needed:
+            capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * self.dtype.itemsize)
+        self.capacity = capacity
+        self._map()
+
+    def _normalized(self, vectors: Any) -> Any:
+        np = self._np
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def add(self, messages: Sequence[Dict[str, Any]]) -> int:
+        """Embeds and stores messages with text content; returns how many were stored."""
+        records = [
+            {"role": m.get("role"), "sender": m.get("sender"), "content": m["content"]}
+            for m in messages
+            if m.get("role") in self.roles and isinstance(m.get("content"), str) and m["content"].strip()
+        ]
+        if not records:
+            return 0
+        vectors = self._normalized(self.embed([r["content"] for r in records]))
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if self.count + len(records) > self.capacity:
+                self._grow(self.count + len(records))
+            self._vectors[self.count:self.count + len(records)] = vectors
+            self._vectors.flush()
+            with open(self._records_path, "ab") as f:
+                offset = f.tell()
+                for record in records:
+                    line = (json.dumps(record) + "\n").encode()
+                    f.write(line)
+                    self._offsets.append(offset)
+                    offset += len(line)
+            self.count += len(records)
+            with open(self._meta_path, "w") as f:
+                json.dump({"dim": self.dim, "count": self.count, "capacity": self.capacity, "dtype": self.dtype.name}, f)
+        return len(records)
+
+    def search(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Top `k` stored messages for each query, best first, with their scores."""
+        np = self._np
+        with self._lock:
+            count, vectors = self.count, self._vectors
+        if not queries or not count:
+            return [[] for _ in queries]
+        matrix = self._normalized(self.embed(queries)).T
+        k = min(k, count)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, count, self.chunk_size):
+            chunk = np.asarray(vectors[start:min(start + self.chunk_size, count)], dtype=np.float32)
+            scores = np.concatenate([best_scores, (chunk @ matrix).T], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + len(chunk)), (len(queries), len(chunk)))], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_ids = np.take_along_axis(ids, top, axis=1)
+
+        results = []
+        with open(self._records_path, "rb") as f:
+            for scores, ids in zip(best_scores, best_ids):
+                hits = []
+                for i in np.argsort(-scores):
+                    f.seek(self._offsets[ids[i]])
+                    record = json.loads(f.readline())
+                    record.update(id=int(ids[i]), score=float(scores[i]))
+                    hits.append(record)
+                results.append(hits)
+        return results
+
+    def context(self, history: Sequence[Dict[str, Any]], k: int = 5, recent: int = 6) -> List[Dict[str, Any]]:
+        """Messages to send for the next turn: relevant memories, then the last `recent` messages."""
+        cut = max(len(history) - recent, 0)
+        while cut > 0 and history[cut].get("role") != "user":
+            cut -= 1
+        window = list(history[cut:])
+        query = next((m["content"] for m in reversed(window) if m.get("role") == "user" and isinstance(m.get("content"), str)), None)
+        if query is None:
+            return window
+        seen = {m.get("content") for m in window}
+        hits = [hit for hit in self.search([query], k + len(window))[0] if hit["content"] not in seen][:k]
+        if not hits:
+            return window
+        lines = [f"{hit.get('sender') or hit['role']}: {hit['content']}" for hit in hits]
+        return [{"role": "user", "content": MEMORY_PREFIX + "\n".join(lines)}] + window
@@ -0,0 +1,138 @@
+import bisect
+import threading
+from typing import List, Dict, Any, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+GAP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320, 640)
+
+
+class HistogramChild:
+    """One label combination of a histogram; `observe()` is a bisect and three additions."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = {}, 0
+        for bound, n in zip(list(self.buckets) + [float("inf")], counts):
+            running += n
+            cumulative[bound] = running
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], HistogramChild] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: Any) -> HistogramChild:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self.labels(**labels).observe(value)
+
+    def children(self) -> List[Tuple[Dict[str, str], HistogramChild]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class MetricsRegistry:
+    """
+    In-process histograms with a snapshot API and Prometheus text export.
+
+    Pass one to `Microagent(metrics=...)` to record streaming and latency
+    metrics for every run, labeled by provider, model and agent.
+    """
+
+    def __init__(self, prefix: str = "microagent"):
+        self.prefix = prefix
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        full_name = f"{self.prefix}_{name}" if self.prefix else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = Histogram(full_name, help, labelnames, buckets)
+            return metric
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: [dict(child.snapshot(), labels=labels) for labels, child in metric.children()]
+            for metric in metrics
+        }
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} histogram")
+            for labels, child in metric.children():
+                snapshot = child.snapshot()
+                base = [f'{k}="{_escape(v)}"' for k, v in labels.items()]
+                for bound, count in snapshot["buckets"].items():
+                    label_text = ",".join(base + [f'le="{_format_bound(bound)}"'])
+                    lines.append(f"{metric.name}_bucket{{{label_text}}} {count}")
+                suffix = "{" + ",".join(base) + "}" if base else ""
+                lines.append(f"{metric.name}_sum{suffix} {snapshot['sum']}")
+                lines.append(f"{metric.name}_count{suffix} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class RunMetrics:
+    """The histograms the run loop records into, created once per registry."""
+
+    LABELS = ("provider", "model", "agent")
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.ttft = registry.histogram("time_to_first_token_seconds", "Time from sending a streaming request to its first delta.", self.LABELS)
+        self.inter_token = registry.histogram("inter_token_seconds", "Gap between consecutive streamed deltas.", self.LABELS, GAP_BUCKETS)
+        self.tokens_per_second = registry.histogram("output_tokens_per_second", "Output tokens per second after the first token.", self.LABELS, RATE_BUCKETS)
+        self.llm_request = registry.histogram("llm_request_seconds", "LLM request latency, including reading the whole stream.", self.LABELS)
+        self.tool = registry.histogram("tool_seconds", "Tool call latency.", self.LABELS + ("tool",))
+        self.overhead = registry.histogram("turn_overhead_seconds", "Time per turn spent outside LLM requests and tools.", self.LABELS)
+
+
+def provider_name(client: Any) -> str:
+    name = type(client).__name__
+    return (name[:-len("Client")] if name.endswith("Client") else name).lower() or "unknown"
@@ -0,0 +1,237 @@
+import threading
+from collections.abc import Mapping, MutableMapping, Sequence
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+_DELETED = object()
+_MAX_DEPTH = 16
+
+
+class _Store:
+    """
+    One segment of a history tree: messages `base` onwards, on top of the
+    first `base` messages of `parent`.
+    """
+
+    __slots__ = ("items", "lock", "parent", "base", "depth")
+
+    def __init__(self, items: List[Any], parent: Optional["_Store"] = None, base: int = 0):
+        self.items = items
+        self.lock = threading.Lock()
+        self.parent = parent
+        self.base = base
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+
+class History(Sequence):
+    """
+    Append-only message history with O(1) snapshots and forks.
+
+    Snapshots share one underlying segment. Appending extends it in place as
+    long as no other snapshot has already grown past this one; otherwise the
+    branch continues on a new segment that points at the shared prefix, so
+    branches never copy the messages they have in common. A plain list passed
+    in is never modified.
+    """
+
+    __slots__ = ("_store", "_length")
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        self._store = _Store(list(messages))
+        self._length = len(self._store.items)
+
+    @classmethod
+    def _view(cls, store: _Store, length: int) -> "History":
+        view = cls.__new__(cls)
+        view._store = store
+        view._length = length
+        return view
+
+    def snapshot(self) -> "History":
+        return History._view(self._store, self._length)
+
+    def fork(self, at: Optional[int] = None) -> "History":
+        """
+        A branch of the first `at` messages (all by default) on its own
+        segment, so its appends never land in storage shared with siblings.
+        """
+        at = self._length if at is None else at
+        if not 0 <= at <= self._length:
+            raise IndexError("fork point out of range")
+        store = self._store
+        while at < store.base:
+            store = store.parent
+        if store.depth >= _MAX_DEPTH:
+            return History(self.to_list()[:at])
+        return History._view(_Store([], store, at), at)
+
+    def append(self, message: Dict[str, Any]) -> None:
+        store = self._store
+        offset = self._length - store.base
+        with store.lock:
+            if len(store.items) == offset:
+                store.items.append(message)
+                self._length += 1
+                return
+            if store.items[offset] is message:
+                self._length += 1
+                return
+        if store.depth >= _MAX_DEPTH:
+            self._store = _Store(self.to_list() + [message])
+        else:
+            self._store = _Store([message], store, self._length)
+        self._length += 1
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def _segments(self) -> List[List[Any]]:
+        segments, store, end = [], self._store, self._length
+        while store is not None:
+            segments.append(store.items[:end - store.base])
+            end, store = store.base, store.parent
+        return segments[::-1]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        if self._store.parent is None:
+            return self._store.items[:self._length]
+        return [message for segment in self._segments() for message in segment]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        store = self._store
+        while index < store.base:
+            store = store.parent
+        return store.items[index - store.base]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._store.parent is None:
+            items = self._store.items
+            for i in range(self._length):
+                yield items[i]
+            return
+        for segment in self._segments():
+            yield from segment
+
+    def __add__(self, other: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.to_list() + list(other)
+
+    def __radd__(self, other: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return list(other) + self.to_list()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (History, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"History({self.to_list()!r})"
+
+
+class _Layer:
+    __slots__ = ("parent", "values", "depth")
+
+    def __init__(self, parent: Mapping, values: Dict[str, Any], depth: int):
+        self.parent = parent
+        self.values = values
+        self.depth = depth
+
+
+class ContextVariables(MutableMapping):
+    """
+    Context variables with O(1) snapshots and per-branch change tracking.
+
+    Writes go to a private overlay on top of frozen, shared layers, so a
+    snapshot costs nothing until one side writes. `changes()` returns the
+    keys set since this object was created, with deletions as None. The
+    wrapped base mapping is not copied and should not be mutated afterwards.
+    """
+
+    __slots__ = ("_parent", "_delta", "_changed")
+
+    def __init__(self, base: Optional[Mapping] = None):
+        self._parent = _Layer(base if base is not None else {}, {}, 0)
+        self._delta: Dict[str, Any] = {}
+        self._changed = set()
+
+    def snapshot(self) -> "ContextVariables":
+        if self._delta:
+            self._parent = _Layer(self._parent, self._delta, self._parent.depth + 1)
+            self._delta = {}
+            if self._parent.depth > _MAX_DEPTH:
+                self._parent = _Layer(dict(self._flatten()), {}, 0)
+        child = ContextVariables.__new__(ContextVariables)
+        child._parent = self._parent
+        child._delta = {}
+        child._changed = set()
+        return child
+
+    def changes(self) -> Dict[str, Any]:
+        return {key: self.get(key) for key in self._changed}
+
+    def _lookup(self, key: str) -> Any:
+        if key in self._delta:
+            return self._delta[key]
+        layer = self._parent
+        while isinstance(layer, _Layer):
+            if key in layer.values:
+                return layer.values[key]
+            layer = layer.parent
+        return layer.get(key, _DELETED)
+
+    def _flatten(self) -> Dict[str, Any]:
+        layers = [self._delta]
+        layer = self._parent
+        while isinstance(layer, _Layer):
+            layers.append(layer.values)
+            layer = layer.parent
+        merged = dict(layer)
+        for values in reversed(layers):
+            merged.update(values)
+        return {k: v for k, v in merged.items() if v is not _DELETED}
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _DELETED:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._delta[key] = value
+        self._changed.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._delta[key] = _DELETED
+        self._changed.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self._lookup(key) is not _DELETED
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._flatten())
+
+    def __len__(self) -> int:
+        return len(self._flatten())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._flatten()
+
+    def __repr__(self) -> str:
+        return f"ContextVariables({self._flatten()!r})"
+
+
+def snapshot(container: Any) -> Any:
+    """O(1) snapshot of a History or ContextVariables, shallow copy of anything else."""
+    if isinstance(container, (History, ContextVariables)):
+        return container.snapshot()
+    return container.copy()
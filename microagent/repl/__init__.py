@@ -1 +1,2 @@
 from .repl import run_demo_loop
+from .async_repl import run_async_demo_loop
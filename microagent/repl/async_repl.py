@@ -0,0 +1,156 @@
+import asyncio
+import signal
+import time
+from typing import Dict, Any, Optional
+
+from microagent import Microagent, Agent
+from microagent.cancellation import CancellationToken
+from microagent.memory import HistoryCompactor
+from microagent.persistent import History
+from microagent.util import debug_print
+
+
+class TurnPrinter:
+    """Prints streamed chunks as they arrive and times the first token."""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.first_token: Optional[float] = None
+        self.printing_content = False
+
+    def handle(self, chunk: Dict[str, Any]) -> None:
+        if chunk.get("content"):
+            if self.first_token is None:
+                self.first_token = time.monotonic() - self.start
+            if not self.printing_content:
+                print(f"\033[94m{chunk.get('sender', '')}:\033[0m", end=" ", flush=True)
+                self.printing_content = True
+            print(chunk["content"], end="", flush=True)
+
+        for tool_call in chunk.get("tool_calls") or []:
+            name = (tool_call.get("function") or {}).get("name")
+            if name:
+                if self.first_token is None:
+                    self.first_token = time.monotonic() - self.start
+                print(f"\033[94m{chunk.get('sender', '')}: \033[95m{name}\033[0m()")
+
+        if chunk.get("delim") == "end" and self.printing_content:
+            print()
+            self.printing_content = False
+
+
+async def stream_turn(
+    client: Microagent, agent: Agent, messages, context_variables: Dict[str, Any], debug: bool,
+    cancel_token: Optional[CancellationToken] = None,
+):
+    """
+    Streams one run to the terminal. Ctrl-C, or cancelling `cancel_token`,
+    stops the run in progress, including its tools, and returns
+    (None, printer) instead of a Response.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancel_token = cancel_token or CancellationToken()
+
+    def produce() -> None:
+        chunks = client.run(
+            agent=agent,
+            messages=messages,
+            context_variables=context_variables,
+            stream=True,
+            debug=debug,
+            concurrent_tools=True,
+            cancel_token=cancel_token,
+        )
+        try:
+            for chunk in chunks:
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                if cancel_token.cancelled:
+                    break
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, {"error": e})
+        finally:
+            chunks.close()
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def cancel() -> None:
+        cancel_token.cancel()
+        queue.put_nowait({"cancelled": True})
+
+    printer = TurnPrinter(time.monotonic())
+    producer = loop.run_in_executor(None, produce)
+    loop.add_signal_handler(signal.SIGINT, cancel)
+    response = None
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None or "cancelled" in chunk:
+                break
+            if "error" in chunk:
+                print(f"\n\033[91mError: {chunk['error']}\033[0m")
+                break
+            if "response" in chunk:
+                response = chunk["response"]
+                continue
+            printer.handle(chunk)
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+
+    if cancel_token.cancelled:
+        print("\n\033[90m[generation cancelled]\033[0m")
+        response = None
+    else:
+        await producer
+    return response, printer
+
+
+def print_turn_stats(response, printer: TurnPrinter) -> None:
+    elapsed = time.monotonic() - printer.start
+    first = f" · first token {printer.first_token:.2f}s" if printer.first_token is not None else ""
+    usage = response.usage
+    print(f"\033[90m[{elapsed:.2f}s{first} · {usage.input_tokens} in / {usage.output_tokens} out tokens]\033[0m")
+
+
+async def async_demo_loop(
+    starting_agent: Agent, context_variables=None, debug=False, llm_type='openai',
+    compactor: HistoryCompactor = None, client: Microagent = None,
+) -> None:
+    client = client or Microagent(llm_type=llm_type)
+    loop = asyncio.get_running_loop()
+    print(f"Starting Microagent async CLI 🤖 using {llm_type.capitalize()} LLM (Ctrl-C cancels a reply)")
+
+    messages = History()
+    context_variables = context_variables or {}
+    agent = starting_agent
+
+    while True:
+        # Warm the next request while the user is typing
+        warming = loop.run_in_executor(None, client.warm, agent, context_variables)
+        user_input = await loop.run_in_executor(None, input, "\033[90mUser\033[0m: ")
+        try:
+            await warming
+        except Exception as e:
+            debug_print(debug, f"Warm-up failed: {e}")
+        if compactor:
+            messages = compactor.apply(messages)
+
+        turn = messages.snapshot()
+        turn.append({"role": "user", "content": user_input})
+        response, printer = await stream_turn(client, agent, turn, context_variables, debug)
+        if response is None:
+            continue
+
+        messages = turn
+        messages.extend(response.messages)
+        context_variables = response.context_variables
+        agent = response.agent
+        print_turn_stats(response, printer)
+        if compactor:
+            compactor.maybe_compact(messages)
+
+
+def run_async_demo_loop(*args, **kwargs) -> None:
+    try:
+        asyncio.run(async_demo_loop(*args, **kwargs))
+    except (KeyboardInterrupt, EOFError):
+        print()
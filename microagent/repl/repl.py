@@ -1,6 +1,8 @@
 import json
 from typing import Dict, Any, List
 from microagent import Microagent, Agent
+from microagent.memory import HistoryCompactor, VectorMemory
+from microagent.persistent import History
 
 def process_and_print_streaming_response(response):
     content = ""
@@ -52,21 +54,25 @@ def pretty_print_messages(messages: List[Dict[str, Any]]) -> None:
             print(f"\033[95m{name}\033[0m({arg_str[1:-1]})")
 
 def run_demo_loop(
-    starting_agent: Agent, context_variables=None, stream=False, debug=False, llm_type='openai'
+    starting_agent: Agent, context_variables=None, stream=False, debug=False, llm_type='openai',
+    compactor: HistoryCompactor = None,
+    memory: VectorMemory = None,
 ) -> None:
     client = Microagent(llm_type=llm_type)
     print(f"Starting Microagent CLI 🤖 using {llm_type.capitalize()} LLM")
 
-    messages = []
+    messages = History()
     agent = starting_agent
 
     while True:
         user_input = input("\033[90mUser\033[0m: ")
+        if compactor:
+            messages = compactor.apply(messages)
         messages.append({"role": "user", "content": user_input})
 
         response = client.run(
             agent=agent,
-            messages=messages,
+            messages=memory.context(messages) if memory else messages,
             context_variables=context_variables or {},
             stream=stream,
             debug=debug,
@@ -79,3 +85,8 @@ def run_demo_loop(
 
         messages.extend(response.messages)
         agent = response.agent
+        if memory:
+            memory.add([messages[-len(response.messages) - 1]] + response.messages)
+        if compactor:
+            # Summarize older turns while the user types the next message
+            compactor.maybe_compact(messages)
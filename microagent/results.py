@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+
+class ResultStore:
+    """
+    Content-addressed storage for large tool results.
+
+    Pass one to `Microagent(result_store=...)`. Tool results longer than
+    `threshold` characters are stored here and history gets the first
+    `preview` characters plus a reference, so later requests don't resend
+    the whole result. Agents are given a `fetch_result` tool to page through
+    stored results. With `path` results are written to files named by their
+    hash; otherwise they are kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: int = 8000, preview: int = 1000, page_size: int = 4000):
+        self.path = path
+        self.threshold = threshold
+        self.preview = preview
+        self.page_size = min(page_size, threshold)
+        self.stats = {"offloaded": 0, "chars_saved": 0}
+        self._results: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.fetch_result = self._make_fetch_tool()
+
+    def put(self, text: str) -> str:
+        ref = "res_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+        if self.path is None:
+            with self._lock:
+                self._results.setdefault(ref, text)
+            return ref
+        file_path = os.path.join(self.path, ref + ".txt")
+        if not os.path.exists(file_path):
+            tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, file_path)
+        return ref
+
+    def get(self, ref: str) -> str:
+        if self.path is None:
+            with self._lock:
+                if ref not in self._results:
+                    raise KeyError(f"Unknown result reference: {ref}")
+                return self._results[ref]
+        if not ref.startswith("res_") or os.sep in ref:
+            raise KeyError(f"Unknown result reference: {ref}")
+        try:
+            with open(os.path.join(self.path, ref + ".txt"), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(f"Unknown result reference: {ref}") from None
+
+    def offload(self, text: str) -> str:
+        """Returns `text` unchanged if it's short, otherwise a preview and a reference to it."""
+        if len(text) <= self.threshold:
+            return text
+        ref = self.put(text)
+        with self._lock:
+            self.stats["offloaded"] += 1
+            self.stats["chars_saved"] += len(text) - self.preview
+        return (
+            f"{text[:self.preview]}\n\n[Result truncated: showing {self.preview} of {len(text)} characters. "
+            f'Call fetch_result(ref="{ref}", offset={self.preview}) to read more.]'
+        )
+
+    def _make_fetch_tool(self):
+        store = self
+
+        def fetch_result(ref: str, offset: int = 0, length: int = store.page_size) -> str:
+            """Reads part of a truncated tool result by its ref, starting at character `offset`."""
+            text = store.get(ref)
+            offset = max(offset, 0)
+            end = offset + min(max(length, 1), store.page_size)
+            page = text[offset:end]
+            if end < len(text):
+                page += f'\n\n[Characters {offset}-{end} of {len(text)}. Call fetch_result(ref="{ref}", offset={end}) to read more.]'
+            return page
+
+        return fetch_result
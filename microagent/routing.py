@@ -0,0 +1,97 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from .util import estimate_tokens
+
+
+class TurnFeatures(BaseModel):
+    turn: int
+    history_length: int
+    last_role: Optional[str]
+    last_is_tool_result: bool
+    after_handoff: bool
+    num_tools: int
+    estimated_tokens: int
+
+    @classmethod
+    def from_turn(cls, turn: int, history: List[Dict[str, Any]], functions: List[Callable], after_handoff: bool) -> "TurnFeatures":
+        last = history[-1] if history else {}
+        return cls(
+            turn=turn,
+            history_length=len(history),
+            last_role=last.get("role"),
+            last_is_tool_result=last.get("role") == "tool" or "tool_call_id" in last,
+            after_handoff=after_handoff,
+            num_tools=len(functions),
+            estimated_tokens=estimate_tokens(history),
+        )
+
+
+class Router(ABC):
+    """Chooses the model for a turn; returning None keeps the agent's own model."""
+
+    @abstractmethod
+    def route(self, features: TurnFeatures) -> Optional[str]:
+        pass
+
+
+class RuleRouter(Router):
+    """
+    Routes with the first matching rule, e.g.
+
+        RuleRouter([(lambda f: f.last_is_tool_result and f.estimated_tokens < 4000, "gpt-4o-mini")])
+    """
+
+    def __init__(self, rules: Sequence[Tuple[Callable[[TurnFeatures], bool], str]]):
+        self.rules = list(rules)
+
+    def route(self, features: TurnFeatures) -> Optional[str]:
+        for predicate, model in self.rules:
+            if predicate(features):
+                return model
+        return None
+
+
+DEFAULT_WEIGHTS = {
+    "estimated_tokens": 1.0 / 1000,
+    "num_tools": 0.1,
+    "history_length": 0.01,
+    "last_is_tool_result": -1.0,
+    "after_handoff": -0.5,
+}
+
+
+class ThresholdRouter(Router):
+    """
+    Sends turns whose weighted feature score is at or below a threshold to `fast_model`.
+
+    `fit()` learns the threshold from labeled turns, where the label says
+    whether the fast model handled that turn acceptably. It picks the largest
+    threshold whose fast-routed turns stay within `max_error_rate`.
+    """
+
+    def __init__(self, fast_model: str, threshold: float = float("-inf"), weights: Dict[str, float] = None):
+        self.fast_model = fast_model
+        self.threshold = threshold
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+
+    def score(self, features: TurnFeatures) -> float:
+        values = features.model_dump()
+        return sum(weight * float(values[name]) for name, weight in self.weights.items())
+
+    def fit(self, examples: Sequence[Tuple[TurnFeatures, bool]], max_error_rate: float = 0.05) -> float:
+        scored = sorted((self.score(features), fast_ok) for features, fast_ok in examples)
+        best = float("-inf")
+        errors = 0
+        for i, (score, fast_ok) in enumerate(scored):
+            errors += 0 if fast_ok else 1
+            next_score = scored[i + 1][0] if i + 1 < len(scored) else float("inf")
+            if next_score > score and errors / (i + 1) <= max_error_rate:
+                best = score if next_score == float("inf") else (score + next_score) / 2
+        self.threshold = best
+        return best
+
+    def route(self, features: TurnFeatures) -> Optional[str]:
+        return self.fast_model if self.score(features) <= self.threshold else None
@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, Union
+
+from .cancellation import CancellationToken
+from .core import Microagent
+from .metrics import MetricsRegistry
+from .types import Agent
+from .util import load_object, debug_print, response_to_json
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+# Extra time for a run to return its partial response after its own deadline
+DEADLINE_GRACE = 0.25
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _dumps(payload: Any) -> bytes:
+    return json.dumps(payload, default=str).encode()
+
+
+class AgentServer:
+    """
+    Serves agents over HTTP from a single asyncio event loop.
+
+    `POST /agents/<name>/run` returns the run's Response as JSON and
+    `POST /agents/<name>/stream` emits each message as a server-sent event.
+    Runs execute on a bounded thread pool sharing one Microagent (and so one
+    pooled LLM client). Requests beyond `concurrency` wait in line up to
+    `max_pending`, after which the server answers 503 straight away; every
+    request is bounded by `timeout` seconds, queueing included. `GET /metrics`
+    exports Prometheus metrics when the Microagent has a MetricsRegistry.
+    """
+
+    def __init__(
+        self,
+        agents: Dict[str, Agent],
+        client: Microagent = None,
+        llm_type: str = 'openai',
+        host: str = '127.0.0.1',
+        port: int = 8000,
+        concurrency: int = 16,
+        max_pending: int = 64,
+        timeout: float = 60.0,
+        max_body_size: int = 1 << 20,
+        shutdown_timeout: float = 30.0,
+        debug: bool = False,
+    ):
+        self.agents = agents
+        self.client = client or Microagent(llm_type=llm_type)
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_body_size = max_body_size
+        self.shutdown_timeout = shutdown_timeout
+        self.debug = debug
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.active = 0
+        self.waiting = 0
+        self._server = None
+        self._semaphore = None
+        self._draining = False
+        self._tasks = set()
+
+    async def start(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def shutdown(self) -> None:
+        """Stops accepting connections and waits for in-flight requests to finish."""
+        self._draining = True
+        if self._server:
+            self._server.close()
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout)
+        self.executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(self._read_request(reader), timeout=self.timeout)
+                await self._dispatch(method, path, body, writer)
+            except HTTPError as e:
+                await self._write_json(writer, e.status, {"error": e.message})
+            except asyncio.TimeoutError:
+                await self._write_json(writer, 400, {"error": "Timed out reading request"})
+            except Exception as e:
+                debug_print(self.debug, f"Error handling request: {str(e)}")
+                await self._write_json(writer, 500, {"error": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self._tasks.discard(task)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split(' ')
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(400, "Content-Length must be an integer")
+        if length < 0:
+            raise HTTPError(400, "Content-Length must not be negative")
+        if length > self.max_body_size:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return parts[0], parts[1].split('?', 1)[0], body
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if path == '/health':
+            await self._write_json(writer, 200, {
+                "status": "draining" if self._draining else "ok",
+                "active": self.active,
+                "waiting": self.waiting,
+            })
+            return
+        if path == '/agents':
+            await self._write_json(writer, 200, {"agents": sorted(self.agents)})
+            return
+        if path == '/metrics':
+            if self.client.metrics is None:
+                raise HTTPError(404, "Metrics are not enabled")
+            body = self.client.metrics.to_prometheus().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+            return
+
+        segments = path.strip('/').split('/')
+        if len(segments) != 3 or segments[0] != 'agents' or segments[2] not in ('run', 'stream'):
+            raise HTTPError(404, f"No route for {path}")
+        if method != 'POST':
+            raise HTTPError(405, "Use POST")
+        agent = self.agents.get(segments[1])
+        if agent is None:
+            raise HTTPError(404, f"Unknown agent {segments[1]}")
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        if not isinstance(payload.get("messages"), list) or not all(isinstance(m, dict) for m in payload["messages"]):
+            raise HTTPError(400, "'messages' must be a list of objects")
+        if not isinstance(payload.get("context_variables", {}), (dict, type(None))):
+            raise HTTPError(400, "'context_variables' must be an object")
+        max_turns = payload.get("max_turns")
+        if max_turns is not None and (isinstance(max_turns, bool) or not isinstance(max_turns, int) or max_turns < 1):
+            raise HTTPError(400, "'max_turns' must be a positive integer")
+
+        try:
+            timeout = min(float(payload.get("timeout") or self.timeout), self.timeout)
+        except (TypeError, ValueError):
+            raise HTTPError(400, "'timeout' must be a number")
+        deadline = time.monotonic() + timeout
+        if segments[2] == 'run':
+            await self._run(agent, payload, deadline, writer)
+        else:
+            await self._stream(agent, payload, deadline, writer)
+
+    async def _admit(self, deadline: float) -> None:
+        if self._draining:
+            raise HTTPError(503, "Server is shutting down")
+        if self.active + self.waiting >= self.concurrency + self.max_pending:
+            raise HTTPError(503, "Server is overloaded")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "Deadline exceeded while queued")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def _submit(self, agent: Agent, payload: Dict[str, Any], deadline: float, on_message=None) -> Tuple[asyncio.Future, CancellationToken]:
+        # The run stops itself at the deadline; the token also stops runs the server gives up on
+        cancel_token = CancellationToken(max(deadline - time.monotonic(), 0.0))
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            lambda: self.client.run(
+                agent=agent,
+                messages=payload["messages"],
+                context_variables=payload.get("context_variables") or {},
+                max_turns=payload.get("max_turns") or float("inf"),
+                debug=self.debug,
+                on_message=on_message,
+                cancel_token=cancel_token,
+            ),
+        )
+        return future, cancel_token
+
+    async def _run(self, agent: Agent, payload: Dict[str, Any], deadline: float, writer: asyncio.StreamWriter) -> None:
+        await self._admit(deadline)
+        future, cancel_token = self._submit(agent, payload, deadline)
+        try:
+            response = await asyncio.wait_for(future, timeout=deadline - time.monotonic() + DEADLINE_GRACE)
+        except asyncio.TimeoutError:
+            cancel_token.cancel()
+            raise HTTPError(504, "Deadline exceeded")
+        finally:
+            self._release()
+        await self._write_json(writer, 200, response_to_json(response))
+
+    async def _stream(self, agent: Agent, payload: Dict[str, Any], deadline: float, writer: asyncio.StreamWriter) -> None:
+        await self._admit(deadline)
+        try:
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            future, cancel_token = self._submit(agent, payload, deadline, lambda m: loop.call_soon_threadsafe(queue.put_nowait, m))
+            future.add_done_callback(lambda _: queue.put_nowait(None))
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=deadline - time.monotonic() + DEADLINE_GRACE)
+                except asyncio.TimeoutError:
+                    cancel_token.cancel()
+                    await self._write_event(writer, "error", {"error": "Deadline exceeded"})
+                    return
+                if message is None:
+                    break
+                await self._write_event(writer, "message", message)
+
+            try:
+                await self._write_event(writer, "response", response_to_json(future.result()))
+            except ConnectionError:
+                raise
+            except Exception as e:
+                await self._write_event(writer, "error", {"error": str(e)})
+        except ConnectionError:
+            # the client went away; stop the run instead of finishing it for nobody
+            cancel_token.cancel()
+            raise
+        finally:
+            self._release()
+
+    @staticmethod
+    async def _write_event(writer: asyncio.StreamWriter, event: str, data: Any) -> None:
+        writer.write(b"event: " + event.encode() + b"\ndata: " + _dumps(data) + b"\n\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _write_json(writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+        body = _dumps(payload)
+        headers = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n"
+        )
+        if status == 503:
+            headers += "Retry-After: 1\r\n"
+        writer.write(headers.encode() + b"\r\n" + body)
+        await writer.drain()
+
+
+def _agent_registry(registry: Union[Agent, Dict[str, Agent]]) -> Dict[str, Agent]:
+    if isinstance(registry, Agent):
+        return {registry.name: registry}
+    return dict(registry)
+
+
+def serve(registry: Union[Agent, Dict[str, Agent]], **kwargs) -> None:
+    """Runs an AgentServer until SIGINT/SIGTERM, then shuts it down gracefully."""
+
+    async def main() -> None:
+        server = AgentServer(_agent_registry(registry), **kwargs)
+        await server.start()
+        print(f"Serving {', '.join(sorted(server.agents))} on http://{server.host}:{server.port}")
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        await stop.wait()
+        print("Shutting down, waiting for in-flight requests...")
+        await server.shutdown()
+
+    asyncio.run(main())
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve Microagent agents over HTTP.")
+    parser.add_argument("registry", help="Agent or dict of agents to serve, as 'package.module:attribute'")
+    parser.add_argument("--llm-type", default="openai")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0)
+    parser.add_argument("--metrics", action="store_true", help="Record metrics and export them at GET /metrics")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+
+    serve(
+        load_object(args.registry),
+        client=Microagent(llm_type=args.llm_type, metrics=MetricsRegistry()) if args.metrics else None,
+        llm_type=args.llm_type,
+        host=args.host,
+        port=args.port,
+        concurrency=args.concurrency,
+        max_pending=args.max_pending,
+        timeout=args.timeout,
+        shutdown_timeout=args.shutdown_timeout,
+        debug=args.debug,
+    )
+
+
+if __name__ == "__main__":
+    main()
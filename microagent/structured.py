@@ -0,0 +1,174 @@
+import copy
+import json
+from typing import List, Dict, Any, Optional
+
+from pydantic import BaseModel
+
+OUTPUT_TOOL_NAME = "structured_output"
+
+_MISSING = object()
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def output_schema_json(output_schema: Any) -> Dict[str, Any]:
+    """JSON Schema for a pydantic model class or an already-built schema dict."""
+    if isinstance(output_schema, type) and issubclass(output_schema, BaseModel):
+        return output_schema.model_json_schema()
+    return output_schema
+
+
+def response_format(output_schema: Any) -> Dict[str, Any]:
+    """OpenAI-style response_format; other clients translate it to their own mechanism."""
+    schema = output_schema_json(output_schema)
+    name = getattr(output_schema, "__name__", None) or schema.get("title") or "output"
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+
+
+def validate_output(output_schema: Any, value: Any) -> Any:
+    """Validates a parsed value: a model instance for pydantic schemas, the value itself otherwise."""
+    if isinstance(output_schema, type) and issubclass(output_schema, BaseModel):
+        return output_schema.model_validate(value)
+    schema = output_schema_json(output_schema)
+    if schema.get("type") == "object":
+        if not isinstance(value, dict):
+            raise ValueError(f"Expected a JSON object, got {type(value).__name__}")
+        missing = [key for key in schema.get("required", []) if key not in value]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    return value
+
+
+class _Frame:
+    __slots__ = ("container", "key", "filled")
+
+    def __init__(self, container):
+        self.container = container
+        self.key = None
+        self.filled = False
+
+
+class PartialJSONParser:
+    """
+    Parses a JSON document as it streams in, one chunk at a time.
+
+    Each character is consumed once. `value` is the document so far, with
+    unfinished strings included as they stand and unfinished numbers left
+    out. `feed()` returns the top-level object fields that completed in
+    that chunk. Text before the first `{` or `[`, such as a code fence, is
+    skipped.
+    """
+
+    def __init__(self):
+        self._root = _MISSING
+        self._stack: List[_Frame] = []
+        self._string: Optional[List[str]] = None
+        self._string_is_key = False
+        self._escape = None
+        self._high_surrogate: Optional[str] = None
+        self._token: List[str] = []
+        self.done = False
+        self.completed: List[str] = []
+
+    @property
+    def value(self) -> Any:
+        return None if self._root is _MISSING else self._root
+
+    def _put(self, value: Any, final: bool) -> None:
+        if not self._stack:
+            self._root = value
+            self.done = final
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, list):
+            if frame.filled:
+                frame.container[-1] = value
+            else:
+                frame.container.append(value)
+        elif frame.key is not None:
+            frame.container[frame.key] = value
+        frame.filled = True
+        if final and len(self._stack) == 1 and isinstance(frame.container, dict):
+            self.completed.append(frame.key)
+
+    def _finish_token(self) -> None:
+        if not self._token:
+            return
+        token = "".join(self._token)
+        self._token = []
+        value = _LITERALS[token] if token in _LITERALS else json.loads(token)
+        self._put(value, final=True)
+
+    def _finish_string(self) -> None:
+        self._flush_surrogate()
+        text = "".join(self._string)
+        self._string = None
+        if self._string_is_key:
+            self._stack[-1].key = text
+        else:
+            self._put(text, final=True)
+
+    def _flush_surrogate(self) -> None:
+        if self._high_surrogate is not None:
+            self._string.append(json.loads(f'"\\{self._high_surrogate}"'))
+            self._high_surrogate = None
+
+    def _string_char(self, char: str) -> None:
+        if self._escape is not None:
+            self._escape += char
+            if self._escape[0] == "u" and len(self._escape) < 5:
+                return
+            escape, self._escape = self._escape, None
+            if escape[0] == "u" and 0xDC00 <= int(escape[1:], 16) <= 0xDFFF and self._high_surrogate is not None:
+                # Decode the pair together so non-BMP characters survive
+                self._string.append(json.loads(f'"\\{self._high_surrogate}\\{escape}"'))
+                self._high_surrogate = None
+                return
+            self._flush_surrogate()
+            if escape[0] == "u" and 0xD800 <= int(escape[1:], 16) <= 0xDBFF:
+                self._high_surrogate = escape
+                return
+            self._string.append(json.loads(f'"\\{escape}"'))
+        elif char == "\\":
+            self._escape = ""
+        elif char == '"':
+            self._finish_string()
+        else:
+            self._flush_surrogate()
+            self._string.append(char)
+
+    def feed(self, text: str) -> List[str]:
+        start = len(self.completed)
+        for char in text:
+            if self.done:
+                break
+            if self._string is not None:
+                self._string_char(char)
+            elif self._root is _MISSING and char not in "{[":
+                continue
+            elif char in "{[":
+                container = {} if char == "{" else []
+                self._put(container, final=False)
+                self._stack.append(_Frame(container))
+            elif char in "}]":
+                self._finish_token()
+                container = self._stack.pop().container
+                self._put(container, final=True)
+            elif char == '"':
+                frame = self._stack[-1]
+                self._string = []
+                self._string_is_key = isinstance(frame.container, dict) and frame.key is None
+            elif char == ",":
+                self._finish_token()
+                frame = self._stack[-1]
+                frame.filled = False
+                frame.key = None
+            elif char in " \t\r\n:":
+                self._finish_token()
+            else:
+                self._token.append(char)
+        if self._string is not None and not self._string_is_key:
+            self._put("".join(self._string), final=False)
+        return self.completed[start:]
+
+    def snapshot(self) -> Any:
+        return copy.deepcopy(self.value)
@@ -0,0 +1,178 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence
+
+EmbedFunction = Callable[[List[str]], Sequence[Sequence[float]]]
+
+_WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words, with snake_case and camelCase identifiers split apart."""
+    return [word.lower() for word in _WORD.findall(text or "")]
+
+
+def tool_text(schema: Dict[str, Any]) -> str:
+    """Searchable text for a tool: its name, description and parameter names."""
+    function = schema.get("function", schema)
+    parameters = (function.get("parameters") or {}).get("properties") or {}
+    parts = [function.get("name", ""), function.get("description") or ""]
+    for name, spec in parameters.items():
+        parts.append(name)
+        parts.append(spec.get("description", "") if isinstance(spec, dict) else "")
+    return " ".join(parts)
+
+
+def is_handoff(func: Callable) -> bool:
+    """Functions annotated to return an Agent, or named transfer_*, are handoffs."""
+    annotation = getattr(func, "__annotations__", {}).get("return")
+    name = getattr(annotation, "__name__", annotation)
+    return name == "Agent" or getattr(func, "__name__", "").startswith("transfer_")
+
+
+class ToolIndex:
+    """
+    Ranks a set of tools against a query.
+
+    Uses BM25 over each tool's name, description and parameters, or cosine
+    similarity when an `embed` function is given (requires NumPy). `sync()`
+    only tokenizes or embeds tools it has not seen before and drops removed
+    ones, so it is cheap to call on every turn.
+    """
+
+    def __init__(self, embed: Optional[EmbedFunction] = None, k1: float = 1.2, b: float = 0.75):
+        self.embed = embed
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[Callable, Counter] = {}
+        self._lengths: Dict[Callable, int] = {}
+        self._df: Counter = Counter()
+        self._vectors: Dict[Callable, Any] = {}
+        self._matrix = None
+        self._order: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def sync(self, functions: Iterable[Callable], schema: Callable[[Callable], Dict[str, Any]]) -> None:
+        functions = list(functions)
+        with self._lock:
+            if functions == self._order:
+                return
+            current = set(functions)
+            for func in [f for f in self._docs if f not in current]:
+                self._df.subtract(self._docs.pop(func).keys())
+                self._lengths.pop(func)
+                self._vectors.pop(func, None)
+            added = [f for f in functions if f not in self._docs]
+            texts = [tool_text(schema(f)) for f in added]
+            for func, text in zip(added, texts):
+                terms = Counter(tokenize(text))
+                self._docs[func] = terms
+                self._lengths[func] = sum(terms.values())
+                self._df.update(terms.keys())
+            self._df = +self._df
+            if self.embed is not None:
+                self._sync_vectors(added, texts, functions)
+            self._order = functions
+
+    def _sync_vectors(self, added: List[Callable], texts: List[str], functions: List[Callable]) -> None:
+        import numpy as np
+
+        if added:
+            for func, vector in zip(added, self.embed(texts)):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._vectors[func] = vector / (np.linalg.norm(vector) or 1.0)
+        self._matrix = np.stack([self._vectors[f] for f in functions]) if functions else None
+
+    def scores(self, query: str) -> Dict[Callable, float]:
+        with self._lock:
+            if not self._order:
+                return {}
+            if self.embed is not None:
+                return self._dense_scores(query)
+            return self._bm25_scores(query)
+
+    def _bm25_scores(self, query: str) -> Dict[Callable, float]:
+        n = len(self._order)
+        avgdl = (sum(self._lengths.values()) / n) or 1.0
+        terms = set(tokenize(query))
+        scores = {}
+        for func in self._order:
+            doc, length, score = self._docs[func], self._lengths[func], 0.0
+            for term in terms:
+                tf = doc.get(term)
+                if not tf:
+                    continue
+                df = self._df[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+            scores[func] = score
+        return scores
+
+    def _dense_scores(self, query: str) -> Dict[Callable, float]:
+        import numpy as np
+
+        vector = np.asarray(self.embed([query])[0], dtype=np.float32)
+        similarities = self._matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+        return dict(zip(self._order, similarities.tolist()))
+
+    def search(self, query: str, k: int) -> List[Callable]:
+        scores = self.scores(query)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+class ToolSelector:
+    """
+    Sends only the tools relevant to the current turn, for agents with large catalogs.
+
+    Attach to an agent as `Agent(tool_selector=ToolSelector(top_k=8))`. Each
+    turn the last `query_messages` messages are used as the query; the `top_k`
+    best matches are sent along with pinned tools (handoffs, names listed in
+    `pinned`) and tools the model called in its previous message. Tools keep
+    their order from `agent.functions`. Agents with no more than `top_k`
+    unpinned tools are left alone.
+    """
+
+    def __init__(self, top_k: int = 8, pinned: Iterable[str] = (), embed: Optional[EmbedFunction] = None, query_messages: int = 3):
+        self.top_k = top_k
+        self.pinned = set(pinned)
+        self.embed = embed
+        self.query_messages = query_messages
+        self._indexes: Dict[str, ToolIndex] = {}
+        self._lock = threading.Lock()
+
+    def index(self, agent, schema: Callable[[Callable], Dict[str, Any]]) -> ToolIndex:
+        with self._lock:
+            index = self._indexes.get(agent.name)
+            if index is None:
+                index = self._indexes[agent.name] = ToolIndex(self.embed)
+        index.sync(agent.functions, schema)
+        return index
+
+    def _is_pinned(self, func: Callable) -> bool:
+        return getattr(func, "__name__", None) in self.pinned or is_handoff(func)
+
+    def query(self, history: Sequence[Dict[str, Any]]) -> str:
+        recent = list(history[-self.query_messages:]) if self.query_messages else []
+        return " ".join(m["content"] for m in recent if isinstance(m.get("content"), str))
+
+    def select(self, agent, history: Sequence[Dict[str, Any]], schema: Callable[[Callable], Dict[str, Any]]) -> List[Callable]:
+        functions = agent.functions
+        pinned = {f for f in functions if self._is_pinned(f)}
+        if len(functions) - len(pinned) <= self.top_k:
+            return list(functions)
+
+        last_calls = set()
+        for message in reversed(history):
+            if message.get("role") == "assistant":
+                last_calls = {c["function"]["name"] for c in message.get("tool_calls") or []}
+                break
+
+        index = self.index(agent, schema)
+        ranked = [f for f in index.search(self.query(history), len(functions)) if f not in pinned]
+        chosen = pinned | set(ranked[:self.top_k]) | {f for f in functions if f.__name__ in last_calls}
+        return [f for f in functions if f in chosen]
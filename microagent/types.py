@@ -1,5 +1,9 @@
-from typing import List, Callable, Union, Optional, Dict, Any
-from pydantic import BaseModel
+import hashlib
+import mimetypes
+from typing import List, Callable, Union, Optional, Dict, Any, Tuple
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from .persistent import ContextVariables
 
 # Remove OpenAI-specific imports
 # from openai.types.chat import ChatCompletionMessage
@@ -31,11 +35,107 @@ class Agent(BaseModel):
     functions: List[Callable] = []
     tool_choice: Optional[Union[str, Dict[str, Any]]] = None
     parallel_tool_calls: bool = True
+    cache_instructions: bool = False
+    router: Optional[Any] = None
+    tool_selector: Optional[Any] = None
+    output_schema: Optional[Any] = None
+    handoff_filter: Optional[Callable] = None
+
+class Usage(BaseModel):
+    """Token counts; input_tokens includes the cache_read and cache_write tokens."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, other: "Usage") -> None:
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+        self.cost += other.cost
+
+class Budget(BaseModel):
+    """
+    Hard limits for a run. `prices` maps model names to USD per million
+    (input, output) tokens and is needed for cost tracking and `max_cost`.
+    """
+    max_input_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    prices: Dict[str, Tuple[float, float]] = {}
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def exceeded_by(self, used: Usage, model: str, estimated_input_tokens: int) -> Optional[str]:
+        """Returns the name of the limit the next call would break, if any."""
+        if self.max_input_tokens is not None and used.input_tokens + estimated_input_tokens > self.max_input_tokens:
+            return "max_input_tokens"
+        if self.max_output_tokens is not None and used.output_tokens >= self.max_output_tokens:
+            return "max_output_tokens"
+        if self.max_cost is not None and used.cost + self.cost(model, estimated_input_tokens, 0) > self.max_cost:
+            return "max_cost"
+        return None
 
 class Response(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     messages: List[Dict[str, Any]]
     agent: Optional[Agent]
-    context_variables: Dict[str, Any]
+    context_variables: Union[ContextVariables, Dict[str, Any]]
+    context_delta: Dict[str, Any] = {}
+    stats: Dict[str, Any] = {}
+    usage: Usage = Field(default_factory=Usage)
+    usage_by_agent: Dict[str, Usage] = {}
+    turn_usage: List[Usage] = []
+    stop_reason: Optional[str] = None
+    output: Optional[Any] = None
+
+class Attachment(BaseModel):
+    """
+    An image or file sent with a message, listed under its "attachments" key.
+
+    Give the bytes as `data`, a local `path` read when needed, or a `url` the
+    provider fetches itself. Clients turn attachments into their provider's
+    content blocks and cache the encoded block by `digest`.
+    """
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    mime_type: str
+    data: bytes = Field(default=b"", repr=False)
+    path: Optional[str] = None
+    url: Optional[str] = None
+    name: Optional[str] = None
+    _digest: Optional[str] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_path(cls, path: str, mime_type: Optional[str] = None) -> "Attachment":
+        mime_type = mime_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return cls(mime_type=mime_type, path=path, name=path.replace("\\", "/").rsplit("/", 1)[-1])
+
+    def read(self) -> bytes:
+        if self.data or self.path is None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @property
+    def remote(self) -> bool:
+        return bool(self.url) and not self.data and self.path is None
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            content = self.url.encode("utf-8") if self.remote else self.read()
+            self._digest = hashlib.sha256(content).hexdigest()
+        return self._digest
+
+    def __str__(self) -> str:
+        return f"Attachment({self.mime_type}, sha256={self.digest})"
+
 class Result(BaseModel):
     value: str = ""
     agent: Optional[Agent] = None
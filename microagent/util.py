@@ -1,7 +1,12 @@
+import importlib
 import inspect
+import json
 from datetime import datetime
 from typing import Dict, Any
 
+# Supplied by the run loop, never by the model
+INJECTED_PARAMETERS = ("cancel_token",)
+
 def debug_print(debug: bool, *args: str) -> None:
     if not debug:
         return
@@ -9,21 +14,45 @@ def debug_print(debug: bool, *args: str) -> None:
     message = " ".join(map(str, args))
     print(f"\033[97m[\033[90m{timestamp}\033[97m]\033[90m {message}\033[0m")
 
+def estimate_tokens(payload: Any) -> int:
+    """Rough token count for messages or tools, at about four characters per token."""
+    return len(json.dumps(payload, default=str)) // 4
+
+def load_object(path: str) -> Any:
+    """Imports an object from a 'package.module:attribute' path."""
+    module_name, _, attribute = path.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Expected 'module:attribute', got {path!r}")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+def response_to_json(response) -> Dict[str, Any]:
+    """JSON-friendly view of a Response, with the agent reduced to its name."""
+    return {
+        "messages": response.messages,
+        "agent": response.agent.name if response.agent else None,
+        "context_variables": response.context_variables,
+        "stats": response.stats,
+        "stop_reason": response.stop_reason,
+        "output": response.output.model_dump() if hasattr(response.output, "model_dump") else response.output,
+    }
+
 def merge_fields(target: Dict[str, Any], source: Dict[str, Any]) -> None:
     for key, value in source.items():
         if isinstance(value, str):
-            target[key] += value
+            target[key] = (target.get(key) or "") + value
         elif value is not None and isinstance(value, dict):
-            merge_fields(target[key], value)
+            merge_fields(target.setdefault(key, {}), value)
 
 def merge_chunk(final_response: Dict[str, Any], delta: Dict[str, Any]) -> None:
     delta.pop("role", None)
     merge_fields(final_response, delta)
 
-    tool_calls = delta.get("tool_calls")
-    if tool_calls and len(tool_calls) > 0:
-        index = tool_calls[0].pop("index")
-        merge_fields(final_response["tool_calls"][index], tool_calls[0])
+    for tool_call in delta.get("tool_calls") or []:
+        index = tool_call.pop("index")
+        merge_fields(final_response["tool_calls"][index], tool_call)
 
 def function_to_json(func) -> dict:
     """
@@ -56,6 +85,8 @@ def function_to_json(func) -> dict:
 
     parameters = {}
     for param in signature.parameters.values():
+        if param.name in INJECTED_PARAMETERS:
+            continue
         try:
             param_type = type_map.get(param.annotation, "string")
         except KeyError as e:
@@ -67,7 +98,7 @@ def function_to_json(func) -> dict:
     required = [
         param.name
         for param in signature.parameters.values()
-        if param.default == inspect._empty
+        if param.default == inspect._empty and param.name not in INJECTED_PARAMETERS
     ]
 
     return {
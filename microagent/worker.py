@@ -0,0 +1,291 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+from .core import Microagent
+from .util import load_object, debug_print, response_to_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    graph_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable conversation job queue stored in a local SQLite database.
+
+    A worker leases a job for `visibility_timeout` seconds; if it neither
+    completes nor extends the lease in time the job becomes visible again
+    and counts as a failed attempt. Failed jobs are retried with a linear
+    backoff until `max_attempts` is reached.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 300.0, retry_backoff: float = 5.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def enqueue(
+        self,
+        graph_id: str,
+        messages: List[Dict[str, Any]],
+        context_variables: Dict[str, Any] = {},
+        max_turns: Optional[int] = None,
+        max_attempts: int = 3,
+    ) -> int:
+        now = time.time()
+        payload = json.dumps({"messages": messages, "context_variables": context_variables, "max_turns": max_turns})
+        cursor = self._conn.execute(
+            "INSERT INTO jobs (graph_id, payload, max_attempts, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (graph_id, payload, max_attempts, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def lease(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Claims the oldest visible job for `owner`, or returns None if there is none."""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?)"
+                    " OR (status = 'leased' AND lease_expires <= ?) ORDER BY id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                if row["status"] == "leased" and row["attempts"] >= row["max_attempts"]:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, lease_owner = NULL, updated_at = ? WHERE id = ?",
+                        ("Lease expired on final attempt", now, row["id"]),
+                    )
+                    continue
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,"
+                    " lease_expires = ?, updated_at = ? WHERE id = ?",
+                    (owner, now + self.visibility_timeout, now, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+                job = dict(row)
+                job["attempts"] += 1
+                job.update(json.loads(job.pop("payload")))
+                return job
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def extend(self, job_id: int, owner: str) -> bool:
+        """Pushes back a held lease's expiry; returns False if the lease was lost."""
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + self.visibility_timeout, now, job_id, owner),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result: Dict[str, Any]) -> bool:
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, updated_at = ?"
+            " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (json.dumps(result, default=str), time.time(), job_id, owner),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str) -> bool:
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET"
+            " status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,"
+            " available_at = ? + attempts * ?, error = ?, lease_owner = NULL, updated_at = ?"
+            " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now, self.retry_backoff, error, now, job_id, owner),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job.update(json.loads(job.pop("payload")))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def wait(self, job_id: int, timeout: float = None, poll_interval: float = 0.1) -> Dict[str, Any]:
+        """Blocks until the job is done or failed and returns it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout} seconds")
+            time.sleep(poll_interval)
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class Worker:
+    """
+    Executes queued jobs with a single Microagent.
+
+    `registry` maps graph ids to their starting Agent. Workers load it from an
+    import path so Agent objects and their functions never cross processes.
+    """
+
+    def __init__(self, queue: JobQueue, registry: Dict[str, Any], client: Microagent, debug: bool = False):
+        self.queue = queue
+        self.registry = registry
+        self.client = client
+        self.debug = debug
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def run_once(self) -> bool:
+        """Processes one job; returns False when the queue had nothing visible."""
+        job = self.queue.lease(self.owner)
+        if job is None:
+            return False
+        try:
+            agent = self.registry.get(job["graph_id"])
+            if agent is None:
+                raise KeyError(f"Unknown agent graph {job['graph_id']}")
+            response = self.client.run(
+                agent=agent,
+                messages=job["messages"],
+                context_variables=job["context_variables"] or {},
+                max_turns=job["max_turns"] or float("inf"),
+                debug=self.debug,
+                on_message=lambda _: self.queue.extend(job["id"], self.owner),
+            )
+        except Exception as e:
+            debug_print(self.debug, f"Job {job['id']} failed: {str(e)}")
+            self.queue.fail(job["id"], self.owner, str(e))
+            return True
+        self.queue.complete(job["id"], self.owner, response_to_json(response))
+        return True
+
+    def run_forever(self, stop_event=None, poll_interval: float = 0.5, max_jobs: Optional[int] = None) -> int:
+        processed = 0
+        while stop_event is None or not stop_event.is_set():
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            if self.run_once():
+                processed += 1
+            else:
+                time.sleep(poll_interval)
+        return processed
+
+
+def _worker_main(db_path, registry_path, llm_type, client_factory, visibility_timeout, poll_interval, stop_event, debug):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    registry = load_object(registry_path)
+    llm_client = load_object(client_factory)() if client_factory else None
+    queue = JobQueue(db_path, visibility_timeout=visibility_timeout)
+    try:
+        Worker(queue, registry, Microagent(llm_type=llm_type, client=llm_client), debug=debug).run_forever(
+            stop_event, poll_interval=poll_interval
+        )
+    finally:
+        queue.close()
+
+
+def start_workers(
+    db_path: str,
+    registry_path: str,
+    workers: int = 2,
+    llm_type: str = 'openai',
+    client_factory: Optional[str] = None,
+    visibility_timeout: float = 300.0,
+    poll_interval: float = 0.5,
+    debug: bool = False,
+):
+    """
+    Starts `workers` processes consuming jobs from `db_path`.
+
+    Returns the processes and the event that asks them to stop after their
+    current job. `client_factory` is an optional import path to a callable
+    returning an LLMClient, used instead of `llm_type`.
+    """
+    JobQueue(db_path).close()
+    stop_event = multiprocessing.Event()
+    processes = []
+    for _ in range(workers):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(db_path, registry_path, llm_type, client_factory, visibility_timeout, poll_interval, stop_event, debug),
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes, stop_event
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run Microagent workers over a SQLite job queue.")
+    parser.add_argument("registry", help="Dict of graph id to Agent, as 'package.module:attribute'")
+    parser.add_argument("--db", default="microagent_jobs.db")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--llm-type", default="openai")
+    parser.add_argument("--client-factory", default=None)
+    parser.add_argument("--visibility-timeout", type=float, default=300.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+
+    processes, stop_event = start_workers(
+        args.db,
+        args.registry,
+        workers=args.workers,
+        llm_type=args.llm_type,
+        client_factory=args.client_factory,
+        visibility_timeout=args.visibility_timeout,
+        poll_interval=args.poll_interval,
+        debug=args.debug,
+    )
+    print(f"Started {len(processes)} workers on {args.db}")
+
+    def stop(*_):
+        print("Stopping workers after their current jobs...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
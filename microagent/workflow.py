@@ -0,0 +1,203 @@
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Callable, Optional, MutableMapping
+
+from pydantic import BaseModel
+
+from .core import Microagent
+from .types import Agent, Response
+from .util import debug_print
+
+
+def final_content(response: Response) -> str:
+    for message in reversed(response.messages):
+        if message.get("role") == "assistant" and message.get("content"):
+            return message["content"]
+    return ""
+
+
+def upstream_messages(messages: List[Dict[str, Any]], upstream: Dict[str, Response]) -> List[Dict[str, Any]]:
+    """Default node input: the workflow messages followed by one message carrying upstream outputs."""
+    if not upstream:
+        return list(messages)
+    sections = [f"Output of {name}:\n{final_content(response)}" for name, response in upstream.items()]
+    return list(messages) + [{"role": "user", "content": "\n\n".join(sections)}]
+
+
+class Node:
+    def __init__(self, name: str, agent: Agent, depends_on: List[str], build_messages: Callable):
+        self.name = name
+        self.agent = agent
+        self.depends_on = list(depends_on)
+        self.build_messages = build_messages
+
+
+class WorkflowResult(BaseModel):
+    outputs: Dict[str, Response]
+    context_variables: Dict[str, Any]
+    timings: Dict[str, Dict[str, Any]]
+    errors: Dict[str, str] = {}
+
+
+class Workflow:
+    """
+    Runs a DAG of agents, starting every node whose dependencies are done.
+
+    Each node receives the workflow messages plus its upstream outputs, and
+    the context variables of the initial call merged with those produced
+    upstream. Node results are cached by their inputs, so re-running after a
+    failure or an `invalidate()` only executes nodes whose inputs changed.
+    """
+
+    def __init__(self, client: Microagent, max_concurrency: int = 4, cache: MutableMapping[str, Response] = None):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.cache = cache if cache is not None else {}
+        self.nodes: Dict[str, Node] = {}
+
+    def add_node(
+        self,
+        name: str,
+        agent: Agent,
+        depends_on: List[str] = (),
+        build_messages: Callable[[List[Dict[str, Any]], Dict[str, Response]], List[Dict[str, Any]]] = upstream_messages,
+    ) -> "Workflow":
+        if name in self.nodes:
+            raise ValueError(f"Node {name} already exists in workflow.")
+        self.nodes[name] = Node(name, agent, depends_on, build_messages)
+        return self
+
+    def invalidate(self, *names: str) -> None:
+        """Drops cached results for the given nodes so the next run executes them again."""
+        prefixes = tuple(f"{name}:" for name in names)
+        for key in [k for k in self.cache if k.startswith(prefixes)]:
+            del self.cache[key]
+
+    def _check_graph(self) -> None:
+        for node in self.nodes.values():
+            for dep in node.depends_on:
+                if dep not in self.nodes:
+                    raise ValueError(f"Node {node.name} depends on unknown node {dep}.")
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Workflow has a cycle through node {name}.")
+            visiting.add(name)
+            for dep in self.nodes[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.nodes:
+            visit(name)
+
+    @staticmethod
+    def _cache_key(node: Node, messages: List[Dict[str, Any]], context_variables: Dict[str, Any]) -> str:
+        agent = node.agent
+        instructions = agent.instructions
+        if callable(instructions):
+            instructions = f"{instructions.__module__}.{getattr(instructions, '__qualname__', repr(instructions))}"
+        payload = json.dumps(
+            {
+                "agent": agent.name,
+                "model": agent.model,
+                "instructions": instructions,
+                "tools": [f.__name__ for f in agent.functions],
+                "messages": messages,
+                "context": context_variables,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return f"{node.name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def run(
+        self,
+        messages: List[Dict[str, Any]],
+        context_variables: Dict[str, Any] = {},
+        model_override: str = None,
+        debug: bool = False,
+        max_turns: int = float("inf"),
+    ) -> WorkflowResult:
+        self._check_graph()
+        start = time.monotonic()
+        outputs: Dict[str, Response] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        remaining = dict(self.nodes)
+
+        def node_inputs(node: Node):
+            upstream = {dep: outputs[dep] for dep in node.depends_on}
+            node_context = dict(context_variables)
+            for response in upstream.values():
+                node_context.update(response.context_variables)
+            return node.build_messages(messages, upstream), node_context
+
+        def execute(node: Node, node_messages, node_context) -> Response:
+            started = time.monotonic()
+            response = self.client.run(
+                agent=node.agent,
+                messages=node_messages,
+                context_variables=node_context,
+                model_override=model_override,
+                debug=debug,
+                max_turns=max_turns,
+            )
+            timings[node.name].update(started=started - start, latency=time.monotonic() - started)
+            return response
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            running = {}
+            while remaining or running:
+                for name, node in list(remaining.items()):
+                    if any(dep in errors for dep in node.depends_on):
+                        timings[name] = {"status": "skipped"}
+                        errors[name] = "upstream failed"
+                        del remaining[name]
+                        continue
+                    if not all(dep in outputs for dep in node.depends_on):
+                        continue
+                    del remaining[name]
+                    node_messages, node_context = node_inputs(node)
+                    key = self._cache_key(node, node_messages, node_context)
+                    if key in self.cache:
+                        outputs[name] = self.cache[key]
+                        timings[name] = {"status": "cached", "latency": 0.0}
+                        continue
+                    timings[name] = {"status": "running"}
+                    running[executor.submit(execute, node, node_messages, node_context)] = (name, key)
+
+                if not running:
+                    if remaining and not any(
+                        all(dep in outputs or dep in errors for dep in node.depends_on) for node in remaining.values()
+                    ):
+                        break
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    try:
+                        outputs[name] = self.cache[key] = future.result()
+                        timings[name]["status"] = "completed"
+                    except Exception as e:
+                        debug_print(debug, f"Workflow node {name} failed: {str(e)}")
+                        timings[name]["status"] = "failed"
+                        errors[name] = str(e)
+
+        final_context = dict(context_variables)
+        for name in self.nodes:
+            if name in outputs:
+                final_context.update(outputs[name].context_variables)
+
+        return WorkflowResult(
+            outputs=outputs,
+            context_variables=final_context,
+            timings=timings,
+            errors=errors,
+        )
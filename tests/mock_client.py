@@ -1,4 +1,5 @@
 from unittest.mock import Mock
+from microagent.llm.base import LLMClient
 import json
 
 class MockLLMClient:
@@ -34,4 +35,42 @@ def create_mock_response(llm_type, message, function_calls=None):
         response = message
         if function_calls:
             response['tool_calls'] = function_calls
-        return response
\ No newline at end of file
+        return response
+
+class ScriptedLLMClient(LLMClient):
+    """Offline LLMClient that returns pre-parsed assistant messages in order."""
+
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.requests = []
+
+    def chat_completion(self, messages=None, **kwargs):
+        self.requests.append(dict(kwargs, messages=messages))
+        if not self.responses:
+            return {"role": "assistant", "content": "done", "tool_calls": None}
+        return dict(self.responses.pop(0))
+
+    def stream_chat_completion(self, messages=None, **kwargs):
+        return self.chat_completion(messages=messages, **kwargs)
+
+    def prepare_messages(self, messages=None):
+        return messages
+
+    def prepare_tools(self, tools=None):
+        return tools
+
+    def parse_response(self, response):
+        return response
+
+    def prepare_chat_params(self, **kwargs):
+        return kwargs
+
+    def prepare_system_message(self, instructions):
+        return {"role": "system", "content": instructions}
+
+    def prepare_tool_response(self, tool_call_id, tool_name, content):
+        return {"role": "tool", "tool_call_id": tool_call_id, "tool_name": tool_name, "content": content}
+
+
+def tool_call(name, arguments="{}", call_id="call_1"):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
@@ -0,0 +1,97 @@
+import pytest
+
+from microagent.attachments import ENCODING_CACHE
+from microagent.core import Microagent
+from microagent.llm.anthropic_client import AnthropicClient
+from microagent.llm.openai_client import OpenAIClient
+from microagent.types import Agent, Attachment
+from microagent.util import estimate_tokens
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    ENCODING_CACHE.clear()
+
+
+def with_image(image):
+    return [{"role": "user", "content": "What is this?", "attachments": [image]}]
+
+
+def test_openai_and_anthropic_blocks():
+    image = Attachment(mime_type="image/png", data=PNG, name="chart.png")
+
+    openai_message = OpenAIClient().prepare_chat_params(messages=with_image(image), model="m")["messages"][0]
+    assert openai_message["content"][0] == {"type": "text", "text": "What is this?"}
+    assert openai_message["content"][1]["image_url"]["url"].startswith("data:image/png;base64,iVBORw0KGgo")
+    assert "attachments" not in openai_message
+
+    anthropic_message = AnthropicClient().prepare_chat_params(messages=with_image(image))["messages"][0]
+    assert anthropic_message["content"][1]["type"] == "image"
+    assert anthropic_message["content"][1]["source"]["media_type"] == "image/png"
+
+    note = Attachment(mime_type="text/plain", data=b"hello")
+    block = AnthropicClient().prepare_attachments(with_image(note))[0]["content"][1]
+    assert block == {"type": "document", "source": {"type": "text", "media_type": "text/plain", "data": "hello"}}
+
+
+def test_encoding_is_cached_across_turns(tmp_path):
+    path = tmp_path / "photo.png"
+    path.write_bytes(PNG)
+    image = Attachment.from_path(str(path))
+    assert image.mime_type == "image/png" and image.name == "photo.png"
+
+    client = OpenAIClient()
+    first = client.prepare_attachments(with_image(image))[0]["content"][1]
+    second = client.prepare_attachments(with_image(Attachment.from_path(str(path))))[0]["content"][1]
+    assert first is second
+    assert ENCODING_CACHE.stats == {"hits": 1, "misses": 1}
+
+
+def test_large_files_are_uploaded_once():
+    class Files:
+        uploads = 0
+
+        def create(self, file, purpose):
+            Files.uploads += 1
+            return type("Uploaded", (), {"id": "file-123"})()
+
+    client = OpenAIClient()
+    client.upload_attachments_over = 100
+    client.client.files = Files()
+    report = Attachment(mime_type="application/pdf", data=b"%PDF" * 100, name="report.pdf")
+    for _ in range(3):
+        block = client.prepare_attachments(with_image(report))[0]["content"][1]
+    assert block == {"type": "file", "file": {"file_id": "file-123"}} and Files.uploads == 1
+
+
+def test_attachments_stay_compact_in_history():
+    image = Attachment(mime_type="image/png", data=PNG * 40)
+    client = ScriptedLLMClient()
+    Microagent(client=client).run(Agent(name="A", instructions="", model="m"), with_image(image))
+    assert client.requests[0]["messages"][1]["attachments"] == [image]
+    assert estimate_tokens(with_image(image)) < 100
+    assert Attachment.model_validate_json(image.model_dump_json()).read() == image.read()
+
+
+def test_dict_attachments_are_loaded_once_per_run():
+    image = Attachment(mime_type="image/png", data=PNG)
+    messages = [{"role": "user", "content": "What is this?", "attachments": [image.model_dump(mode="json")]}]
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("look")]},
+        {"role": "assistant", "content": "A chart.", "tool_calls": None},
+    ])
+
+    def look():
+        """Looks again"""
+        return "a chart"
+
+    Microagent(client=client).run(Agent(name="A", instructions="", model="m", functions=[look]), messages)
+    first, second = (request["messages"][1]["attachments"][0] for request in client.requests)
+    assert isinstance(first, Attachment) and first is second
+    assert first.read() == PNG
+    assert isinstance(messages[0]["attachments"][0], dict)
@@ -0,0 +1,156 @@
+import threading
+import time
+
+from microagent.batching import batchable
+from microagent.core import Microagent
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+ORDERS = {"1": "shipped", "2": "pending", "3": "delivered"}
+round_trips = []
+
+
+def lookup_orders(calls):
+    round_trips.append([c["id"] for c in calls])
+    return [ORDERS.get(c["id"]) or KeyError(f"no order {c['id']}") for c in calls]
+
+
+@batchable(lookup_orders)
+def lookup_order(id: str):
+    """Looks up an order"""
+    round_trips.append([id])
+    return ORDERS[id]
+
+
+def lookup_calls(*ids):
+    return {"role": "assistant", "content": None, "tool_calls": [
+        tool_call("lookup_order", f'{{"id": "{i}"}}', call_id=f"call_{i}") for i in ids
+    ]}
+
+
+def test_same_name_calls_become_one_batch():
+    round_trips.clear()
+    client = ScriptedLLMClient([lookup_calls("3", "1", "9"), {"role": "assistant", "content": "done", "tool_calls": None}])
+    agent = Agent(name="A", instructions="", model="m", functions=[lookup_order])
+
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "orders?"}])
+
+    assert round_trips == [["3", "1", "9"]]
+    tool_messages = {m["tool_call_id"]: m["content"] for m in response.messages if m["role"] == "tool"}
+    assert tool_messages["call_3"] == "delivered" and tool_messages["call_1"] == "shipped"
+    assert "no order 9" in tool_messages["call_9"]
+    assert lookup_order.batch.stats == {"batches": 1, "calls": 3}
+
+
+def test_single_call_uses_the_plain_function():
+    round_trips.clear()
+    client = ScriptedLLMClient([lookup_calls("2"), {"role": "assistant", "content": "done", "tool_calls": None}])
+    agent = Agent(name="A", instructions="", model="m", functions=[lookup_order])
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "order 2?"}])
+    assert round_trips == [["2"]] and response.messages[1]["content"] == "pending"
+
+
+def test_window_batches_across_concurrent_runs():
+    batches = []
+
+    def fetch_many(calls):
+        batches.append(len(calls))
+        return [c["n"] * 10 for c in calls]
+
+    @batchable(fetch_many, window=0.1)
+    def fetch(n: int):
+        """Fetches n"""
+
+    agent = Agent(name="A", instructions="", model="m", functions=[fetch])
+    results = {}
+
+    def converse(n):
+        client = ScriptedLLMClient([
+            {"role": "assistant", "content": None, "tool_calls": [tool_call("fetch", f'{{"n": {n}}}')]},
+            {"role": "assistant", "content": "done", "tool_calls": None},
+        ])
+        results[n] = Microagent(client=client).run(agent, [{"role": "user", "content": "go"}]).messages[1]["content"]
+
+    threads = [threading.Thread(target=converse, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {n: str(n * 10) for n in range(4)}
+    assert batches == [4]
+
+
+def test_batches_run_in_call_order_and_stop_at_handoff():
+    calls = []
+    other = Agent(name="Other", instructions="", model="m")
+
+    def note(text: str):
+        """Notes something"""
+        calls.append(("note", text))
+        return "noted"
+
+    def transfer():
+        """Hands off"""
+        calls.append(("transfer",))
+        return other
+
+    def fetch_many(arguments, context_variables):
+        calls.append(("fetch", [a["n"] for a in arguments], [c["user"] for c in context_variables]))
+        return [a["n"] for a in arguments]
+
+    @batchable(fetch_many)
+    def fetch(n: int):
+        """Fetches n"""
+
+    def tool_calls(*calls_):
+        return {"role": "assistant", "content": None, "tool_calls": [
+            tool_call(name, args, call_id=f"c{i}") for i, (name, args) in enumerate(calls_)]}
+
+    client = ScriptedLLMClient([
+        tool_calls(("note", '{"text": "first"}'), ("fetch", '{"n": 1}'), ("fetch", '{"n": 2}')),
+        tool_calls(("transfer", "{}"), ("note", '{"text": "late"}'), ("fetch", '{"n": 3}'), ("fetch", '{"n": 4}')),
+    ])
+    agent = Agent(name="A", instructions="", model="m", functions=[note, transfer, fetch])
+    Microagent(client=client).run(agent, [{"role": "user", "content": "go"}], context_variables={"user": "ann"})
+
+    assert calls == [("note", "first"), ("fetch", [1, 2], ["ann", "ann"]), ("transfer",)]
+
+
+def test_calls_after_a_handoff_are_not_batched():
+    round_trips.clear()
+    other = Agent(name="B", instructions="", model="m")
+
+    def transfer():
+        """Hands off"""
+        return other
+
+    client = ScriptedLLMClient([{"role": "assistant", "content": None, "tool_calls": [
+        tool_call("lookup_order", '{"id": "1"}', call_id="c1"),
+        tool_call("transfer", call_id="c2"),
+        tool_call("lookup_order", '{"id": "2"}', call_id="c3"),
+    ]}])
+    agent = Agent(name="A", instructions="", model="m", functions=[lookup_order, transfer])
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "go"}])
+
+    assert round_trips == [["1"]]
+    assert [m["tool_call_id"] for m in response.messages if m["role"] == "tool"] == ["c1", "c2"]
+    assert response.agent.name == "B"
+
+
+def test_windowed_batch_respects_the_run_deadline():
+    def slow_many(arguments):
+        threading.Event().wait(1)
+        return ["late"] * len(arguments)
+
+    @batchable(slow_many, window=0.01)
+    def slow(n: int):
+        """Slow"""
+
+    client = ScriptedLLMClient([{"role": "assistant", "content": None, "tool_calls": [tool_call("slow", '{"n": 1}')]}])
+    agent = Agent(name="A", instructions="", model="m", functions=[slow])
+    start = time.monotonic()
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "go"}], timeout=0.2)
+    assert time.monotonic() - start < 0.6
+    assert "late" not in response.messages[1]["content"]
+    assert response.stop_reason == "deadline"
@@ -0,0 +1,155 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from microagent.bulk import BulkJob, BulkRunner
+from microagent.llm.anthropic_client import AnthropicClient
+from microagent.llm.batch import AnthropicBatchBackend, OpenAIBatchBackend
+from microagent.llm.openai_client import OpenAIClient
+from microagent.types import Agent
+
+
+def weather(city):
+    """Get the weather for a city"""
+    return f"sunny in {city}"
+
+
+AGENT = Agent(name="Weather", instructions="Answer using tools.", model="gpt-4o-mini", functions=[weather])
+
+
+def reply(body):
+    """Asks for the weather tool first, then answers with the last tool result."""
+    last = body["messages"][-1]
+    if last["role"] == "tool":
+        message = {"role": "assistant", "content": f"It is {last['content']}."}
+    else:
+        city = last["content"]
+        message = {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{city}", "type": "function",
+            "function": {"name": "weather", "arguments": json.dumps({"city": city})},
+        }]}
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+        "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+class FakeOpenAIBatchAPI:
+    """Stands in for the OpenAI files and batches endpoints."""
+
+    def __init__(self, fail_city=None):
+        self.fail_city = fail_city
+        self.uploads = {}
+        self.jobs = {}
+        self.files = SimpleNamespace(create=self._upload, content=self._content)
+        self.batches = SimpleNamespace(create=self._create, retrieve=self._retrieve)
+
+    def _upload(self, file, purpose):
+        file_id = f"file-{len(self.uploads)}"
+        self.uploads[file_id] = file[1].read().decode()
+        return SimpleNamespace(id=file_id)
+
+    def _content(self, file_id):
+        return SimpleNamespace(text=self.uploads[file_id])
+
+    def _create(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{len(self.jobs)}"
+        self.jobs[batch_id] = {"input": input_file_id, "polls": 0}
+        return SimpleNamespace(id=batch_id)
+
+    def _retrieve(self, batch_id):
+        job = self.jobs[batch_id]
+        job["polls"] += 1
+        if job["polls"] < 2:
+            return SimpleNamespace(status="in_progress")
+        output = []
+        for line in self.uploads[job["input"]].splitlines():
+            request = json.loads(line)
+            if self.fail_city and request["body"]["messages"][-1]["content"] == self.fail_city:
+                output.append({"custom_id": request["custom_id"], "response": None, "error": {"message": "rate limited"}})
+            else:
+                output.append({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": reply(request["body"])}})
+        output_id = f"file-{len(self.uploads)}"
+        self.uploads[output_id] = "\n".join(json.dumps(o) for o in output)
+        return SimpleNamespace(status="completed", output_file_id=output_id, error_file_id=None)
+
+
+@pytest.fixture
+def openai_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return OpenAIClient()
+
+
+def jobs(*cities):
+    return [BulkJob(agent=AGENT, messages=[{"role": "user", "content": city}]) for city in cities]
+
+
+def test_bulk_run_batches_each_round(openai_client):
+    openai_client.client = FakeOpenAIBatchAPI()
+    runner = BulkRunner(OpenAIBatchBackend(openai_client), poll_interval=0)
+
+    result = runner.run(jobs("Paris", "Oslo", "Lima"))
+
+    assert [r.messages[-1]["content"] for r in result.responses] == [
+        "It is sunny in Paris.", "It is sunny in Oslo.", "It is sunny in Lima."
+    ]
+    assert [r["requests"] for r in result.stats["rounds"]] == [3, 3]
+    assert result.responses[0].usage.input_tokens == 20
+    assert result.errors == {}
+
+
+def test_bulk_run_limits_conversations_in_progress(openai_client):
+    openai_client.client = FakeOpenAIBatchAPI()
+    runner = BulkRunner(OpenAIBatchBackend(openai_client), poll_interval=0, max_conversations=2)
+
+    result = runner.run(jobs("Paris", "Oslo", "Lima"))
+
+    assert all(r is not None for r in result.responses)
+    assert max(r["requests"] for r in result.stats["rounds"]) == 2
+    assert result.stats["requests"] == 6
+
+
+def test_failed_requests_are_reported_per_job(openai_client):
+    openai_client.client = FakeOpenAIBatchAPI(fail_city="Oslo")
+    result = BulkRunner(OpenAIBatchBackend(openai_client), poll_interval=0).run(jobs("Paris", "Oslo"))
+
+    assert result.responses[0].messages[-1]["content"] == "It is sunny in Paris."
+    assert result.responses[1] is None
+    assert "rate limited" in result.errors[1]
+
+
+class FakeAnthropicBatches:
+    def __init__(self):
+        self.requests = {}
+
+    def create(self, requests):
+        self.requests["msgbatch-1"] = requests
+        return SimpleNamespace(id="msgbatch-1")
+
+    def retrieve(self, batch_id):
+        return SimpleNamespace(processing_status="ended")
+
+    def results(self, batch_id):
+        for request in self.requests[batch_id]:
+            text = f"Hello {request['params']['messages'][-1]['content']}"
+            message = SimpleNamespace(content=[SimpleNamespace(type="text", text=text)],
+                                      usage=SimpleNamespace(input_tokens=3, output_tokens=2))
+            yield SimpleNamespace(custom_id=request["custom_id"], result=SimpleNamespace(type="succeeded", message=message))
+
+
+def test_anthropic_backend(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    client = AnthropicClient()
+    batches = FakeAnthropicBatches()
+    client.client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    agent = Agent(name="Greeter", instructions="Greet.", model="claude-3-haiku-20240307")
+
+    result = BulkRunner(AnthropicBatchBackend(client), poll_interval=0).run(
+        [BulkJob(agent=agent, messages=[{"role": "user", "content": name}]) for name in ("Ada", "Alan")]
+    )
+
+    assert [r.messages[-1]["content"] for r in result.responses] == ["Hello Ada", "Hello Alan"]
+    params = batches.requests["msgbatch-1"][0]["params"]
+    assert params["system"][0]["text"] == "Greet."
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from microagent.cancellation import CancellationToken
+from microagent.core import Microagent
+from microagent.types import Agent
+from microagent.util import function_to_json
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+MESSAGES = [{"role": "user", "content": "go"}]
+
+
+def slow_tool():
+    """Takes a while"""
+    time.sleep(0.2)
+    return "slow result"
+
+
+def patient_tool(cancel_token):
+    """Works until cancelled"""
+    cancel_token.wait(5)
+    return "stopped early"
+
+
+def calls(*names):
+    return {"role": "assistant", "content": None,
+            "tool_calls": [tool_call(name, call_id=f"call_{i}") for i, name in enumerate(names)]}
+
+
+def test_timeout_returns_partial_response():
+    client = ScriptedLLMClient([calls("slow_tool"), calls("slow_tool")])
+    agent = Agent(name="A", instructions="", model="m", functions=[slow_tool])
+
+    response = Microagent(client=client).run(agent, MESSAGES, timeout=0.1)
+
+    assert response.stop_reason == "deadline"
+    assert [m["role"] for m in response.messages] == ["assistant", "tool"]
+    assert len(client.requests) == 1
+    assert 0 < client.requests[0]["timeout"] <= 0.1
+
+
+def test_cancel_token_reaches_tools_and_skips_the_rest():
+    client = ScriptedLLMClient([calls("patient_tool", "slow_tool")])
+    agent = Agent(name="A", instructions="", model="m", functions=[patient_tool, slow_tool])
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+
+    start = time.monotonic()
+    response = Microagent(client=client).run(agent, MESSAGES, cancel_token=token)
+
+    assert time.monotonic() - start < 1
+    assert response.stop_reason == "cancelled"
+    assert response.messages[1]["content"] == "stopped early"
+    assert response.messages[2]["content"].startswith("Tool call skipped")
+    assert "cancel_token" not in function_to_json(patient_tool)["function"]["parameters"]["properties"]
+
+
+class TimingOutClient(ScriptedLLMClient):
+    def chat_completion(self, messages=None, **kwargs):
+        time.sleep(kwargs["timeout"])
+        raise TimeoutError("request timed out")
+
+
+def test_request_timeout_ends_run_cleanly():
+    agent = Agent(name="A", instructions="", model="m")
+    response = Microagent(client=TimingOutClient()).run(agent, MESSAGES, timeout=0.05)
+    assert response.stop_reason == "deadline"
+    assert response.messages == []
+
+
+class SlowStreamClient(ScriptedLLMClient):
+    def stream_chat_completion(self, messages=None, **kwargs):
+        return ["partial ", "answer ", "never sent"]
+
+    def stream_deltas(self, stream):
+        for text in stream:
+            yield {"content": text}
+            time.sleep(0.1)
+
+
+def test_streaming_stops_mid_completion():
+    agent = Agent(name="A", instructions="", model="m")
+    chunks = list(Microagent(client=SlowStreamClient()).run(agent, MESSAGES, stream=True, timeout=0.15))
+    response = chunks[-1]["response"]
+    assert response.stop_reason == "deadline"
+    assert response.messages[0]["content"] == "partial answer "
+
+
+def test_child_token_follows_parent():
+    parent = CancellationToken(timeout=10)
+    child = CancellationToken(timeout=60, parent=parent)
+    assert child.remaining() <= 10
+    parent.cancel()
+    assert child.cancelled and child.reason == "cancelled"
+    assert child.wait(1) is True
@@ -0,0 +1,61 @@
+from microagent.canonical import canonical_message, canonical_request, common_prefix_length
+from microagent.core import Microagent
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+def alpha():
+    """First tool"""
+    return "a"
+
+
+def beta(x: int):
+    """Second tool"""
+    return "b"
+
+
+def test_equivalent_requests_serialize_identically():
+    streamed = {"content": "", "sender": "A", "role": "assistant",
+                "tool_calls": [{"function": {"arguments": "{}", "name": "alpha"}, "id": "c1", "type": "function"}]}
+    parsed = {"role": "assistant", "content": None, "tool_calls": [tool_call("alpha", call_id="c1")], "sender": "A"}
+    assert canonical_message(streamed) == canonical_message(parsed)
+    assert list(canonical_message(streamed)) == ["role", "content", "tool_calls"]
+    assert canonical_message({"role": "tool", "tool_name": "alpha", "content": "a", "tool_call_id": "c1"}) == {
+        "role": "tool", "tool_call_id": "c1", "content": "a"}
+
+    client = Microagent(client=ScriptedLLMClient())
+    schemas = [client._tool_schema(f) for f in (beta, alpha)]
+    request = canonical_request({"timeout": 3.0, "messages": [parsed], "tools": schemas, "model": "m"})
+    assert list(request) == ["model", "tools", "messages", "timeout"]
+    assert [t["function"]["name"] for t in request["tools"]] == ["alpha", "beta"]
+    assert common_prefix_length("abcdef", "abcxef") == 3 and common_prefix_length("", "a") == 0
+
+
+def test_prefix_diagnostic_reports_matches_and_cached_tokens():
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("alpha")], "usage": {"input_tokens": 50}},
+        {"role": "assistant", "content": "done", "tool_calls": None, "usage": {"input_tokens": 60, "cache_read_tokens": 40}},
+    ])
+    agent = Agent(name="A", instructions="Help.", model="m", functions=[beta, alpha])
+    response = Microagent(client=client, canonical_requests=True, track_prefix=True).run(
+        agent, [{"role": "user", "content": "hi", "sender": "user"}])
+
+    first, second = response.stats["prefix_match"]
+    assert first["matched_chars"] == 0
+    assert second["matched_chars"] == first["chars"] - 2 and second["match_ratio"] > 0.6
+    assert second["cache_read_tokens"] == 40 and second["input_tokens"] == 60
+    assert [t["function"]["name"] for t in client.requests[0]["tools"]] == ["alpha", "beta"]
+    assert "sender" not in client.requests[1]["messages"][2]
+
+
+def test_schema_property_order_is_kept():
+    schema = {"type": "object", "properties": {"zeta": {"type": "string"}, "alpha": {"type": "integer"}},
+              "required": ["zeta", "alpha"]}
+    tool = {"type": "function", "function": {"parameters": schema, "name": "lookup", "description": "Find"}}
+    response_format = {"type": "json_schema", "json_schema": {"name": "out", "schema": schema}}
+    request = canonical_request({"messages": [], "tools": [tool], "response_format": response_format})
+
+    function = request["tools"][0]["function"]
+    assert list(function) == ["description", "name", "parameters"]
+    assert list(function["parameters"]["properties"]) == ["zeta", "alpha"]
+    assert list(request["response_format"]["json_schema"]["schema"]["properties"]) == ["zeta", "alpha"]
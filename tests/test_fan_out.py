@@ -0,0 +1,97 @@
+import threading
+import time
+
+from microagent.core import Microagent
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+class SlowClient(ScriptedLLMClient):
+    """Answers with the model name after a per-model delay."""
+
+    def __init__(self, delays):
+        super().__init__()
+        self.delays = delays
+        self.lock = threading.Lock()
+
+    def chat_completion(self, messages=None, **kwargs):
+        time.sleep(self.delays[kwargs["model"]])
+        with self.lock:
+            self.requests.append(dict(kwargs, messages=messages))
+        return {"role": "assistant", "content": f"answer from {kwargs['model']}", "tool_calls": None}
+
+
+def agents(*models):
+    return [Agent(name=f"Agent {m}", instructions="Answer.", model=m) for m in models]
+
+
+def test_branches_run_concurrently_and_merge():
+    client = SlowClient({"a": 0.2, "b": 0.2, "c": 0.2})
+    messages = [{"role": "user", "content": "question"}]
+    start = time.monotonic()
+    response = Microagent(client=client).fan_out(agents("a", "b", "c"), messages)
+
+    assert time.monotonic() - start < 0.5
+    assert len(response.messages) == 1
+    merged = response.messages[0]
+    assert merged["role"] == "assistant"
+    for model in "abc":
+        assert f"answer from {model}" in merged["content"]
+    assert messages == [{"role": "user", "content": "question"}]
+    assert all(b["status"] == "completed" for b in response.stats["fan_out"]["branches"].values())
+
+
+def test_first_k_and_custom_merge():
+    client = SlowClient({"fast": 0.01, "slow": 1.0})
+    response = Microagent(client=client).fan_out(
+        agents("fast", "slow"),
+        [{"role": "user", "content": "question"}],
+        merge=lambda responses: " | ".join(r.messages[-1]["content"] for r in responses.values()),
+        first_k=1,
+    )
+    assert response.messages[0]["content"] == "answer from fast"
+    assert response.stats["fan_out"]["branches"][1] == {"agent": "Agent slow", "status": "cancelled"}
+
+
+def test_deadline_drops_late_branches():
+    client = SlowClient({"fast": 0.01, "slow": 1.0})
+    start = time.monotonic()
+    response = Microagent(client=client).fan_out(
+        agents("fast", "slow"), [{"role": "user", "content": "question"}], deadline=0.3
+    )
+    assert time.monotonic() - start < 0.9
+    assert "answer from fast" in response.messages[0]["content"]
+    assert "answer from slow" not in response.messages[0]["content"]
+
+
+def test_same_agent_fans_out_into_separate_branches():
+    client = SlowClient({"a": 0.05})
+    agent = agents("a")[0]
+    response = Microagent(client=client).fan_out([agent, agent, agent], [{"role": "user", "content": "question"}])
+    branches = response.stats["fan_out"]["branches"]
+    assert sorted(branches) == [0, 1, 2] and all(b["status"] == "completed" for b in branches.values())
+    assert response.messages[0]["content"].count("answer from a") == 3
+    assert response.messages[0]["sender"] == "Agent a"
+
+
+def test_abandoned_branches_are_cancelled():
+    class StoppableClient(SlowClient):
+        def chat_completion(self, messages=None, **kwargs):
+            if kwargs["model"] == "slow":
+                time.sleep(0.2)
+                return {"role": "assistant", "content": None, "tool_calls": [tool_call("step")]}
+            return super().chat_completion(messages, **kwargs)
+
+    steps = []
+
+    def step():
+        """Takes a step"""
+        steps.append(1)
+        return "ok"
+
+    slow = Agent(name="Slow", instructions="", model="slow", functions=[step])
+    Microagent(client=StoppableClient({"fast": 0.01})).fan_out(
+        [agents("fast")[0], slow], [{"role": "user", "content": "question"}], first_k=1
+    )
+    time.sleep(0.5)
+    assert steps == []
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from microagent.core import Microagent
+from microagent.forking import ConversationTree, best_of_n
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient
+
+MESSAGES = [{"role": "user", "content": "write a haiku"}]
+
+
+class CountingClient(ScriptedLLMClient):
+    """Answers each request with its own number after a short delay."""
+
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.started = []
+
+    def chat_completion(self, messages=None, **kwargs):
+        with self.lock:
+            n = len(self.requests)
+            self.requests.append(dict(kwargs, messages=messages))
+            self.started.append(time.monotonic())
+        time.sleep(self.delay)
+        return {"role": "assistant", "content": f"draft {n}", "tool_calls": None}
+
+
+def test_branches_share_prefix_and_run_after_a_primer():
+    client = CountingClient()
+    tree = ConversationTree(Microagent(client=client), MESSAGES)
+    branches = tree.fork(4)
+
+    start = time.monotonic()
+    tree.run(Agent(name="Poet", instructions="", model="m"), branches)
+    elapsed = time.monotonic() - start
+
+    assert 0.1 <= elapsed < 0.2
+    first, *rest = sorted(client.started)
+    assert all(t - first >= 0.04 for t in rest)
+    assert sorted(b.history[-1]["content"] for b in branches) == [f"draft {i}" for i in range(4)]
+    assert all(b.history[0] is tree.root.history[0] for b in branches)
+    assert all(b.history._store.items == [b.history[-1]] for b in branches)
+    assert len(tree.root.history) == 1
+
+
+def test_keep_best_prunes_the_rest_and_forks_deeper():
+    client = CountingClient(delay=0)
+    tree = ConversationTree(Microagent(client=client), MESSAGES)
+    agent = Agent(name="Poet", instructions="", model="m")
+    tree.run(agent, tree.fork(3), prime_cache=False)
+
+    best, = tree.keep_best(lambda b: int(b.history[-1]["content"].split()[-1]))
+    assert best.history[-1]["content"] == "draft 2"
+    assert list(tree.branches) == [best.name]
+
+    children = tree.fork(2, parent=best)
+    children[0].history.append({"role": "user", "content": "shorter"})
+    tree.run(agent, children)
+    assert client.requests[-1]["messages"][1:3] == [MESSAGES[0], {"role": "assistant", "content": "draft 2", "tool_calls": None, "sender": "Poet"}]
+    assert len(tree.branches) == 3
+
+
+def test_prune_cancels_a_running_branch():
+    tree = ConversationTree(Microagent(client=CountingClient(delay=0.3)), MESSAGES)
+    branch, = tree.fork()
+    threading.Timer(0.05, tree.prune, args=(branch,)).start()
+    tree.run(Agent(name="Poet", instructions="", model="m"), [branch])
+    assert branch.pruned and branch.response is None and not tree.branches
+
+
+def test_best_of_n():
+    best = best_of_n(Microagent(client=CountingClient(delay=0)), Agent(name="Poet", instructions="", model="m"),
+                     MESSAGES, 3, score=lambda b: -len(b.history[-1]["content"]))
+    assert best.history[-1]["content"].startswith("draft")
+    assert best.score == -7
@@ -0,0 +1,93 @@
+import pytest
+
+from microagent.core import Microagent
+from microagent.handoff import drop_tool_messages, last_turns, summarize_previous
+from microagent.memory import SUMMARY_PREFIX
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+HISTORY = [
+    {"role": "user", "content": "hi"},
+    {"role": "assistant", "content": "hello", "sender": "Triage"},
+    {"role": "user", "content": "my order 7 is late"},
+]
+
+
+def build(handoff_filter):
+    specialist = Agent(name="Shipping", instructions="Handle shipping.", model="m", handoff_filter=handoff_filter)
+
+    def lookup_order():
+        """Look up the order"""
+        return "order 7: in transit"
+
+    def transfer_to_shipping():
+        """Hand off to shipping"""
+        return specialist
+
+    triage = Agent(name="Triage", instructions="Route.", model="m", functions=[lookup_order, transfer_to_shipping])
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("lookup_order", call_id="c1")]},
+        {"role": "assistant", "content": "Passing you on.", "tool_calls": [tool_call("transfer_to_shipping", call_id="c2")]},
+        {"role": "assistant", "content": "It arrives tomorrow.", "tool_calls": None},
+    ])
+    return triage, client
+
+
+def sent_to_specialist(client):
+    return [m for m in client.requests[-1]["messages"] if m.get("role") != "system"]
+
+
+def test_drop_tool_messages_trims_what_specialist_sees():
+    triage, client = build(drop_tool_messages)
+    response = Microagent(client=client).run(triage, HISTORY)
+
+    assert sent_to_specialist(client) == HISTORY + [
+        {"role": "assistant", "content": "Passing you on.", "tool_calls": None, "sender": "Triage"},
+    ]
+    assert len(response.messages) == 5
+    assert response.stats["handoff_filter"] == [{"agent": "Shipping", "messages": 7, "sent": 4}]
+
+
+def test_last_turns_keeps_recent_user_turns():
+    triage, client = build(last_turns(1))
+    Microagent(client=client).run(triage, HISTORY)
+    sent = sent_to_specialist(client)
+    assert sent[0] == HISTORY[-1]
+    assert len(sent) == 5
+    with pytest.raises(ValueError):
+        last_turns(0)
+
+
+def test_summarize_previous_replaces_history_with_summary():
+    summarizer = ScriptedLLMClient([{"role": "assistant", "content": "Order 7 is in transit.", "tool_calls": None}])
+    triage, client = build(summarize_previous(summarizer, model="small"))
+    Microagent(client=client).run(triage, HISTORY)
+
+    assert sent_to_specialist(client) == [
+        {"role": "user", "content": SUMMARY_PREFIX + "Order 7 is in transit."},
+        HISTORY[-1],
+    ]
+    assert "order 7: in transit" in summarizer.requests[0]["messages"][1]["content"]
+    assert summarizer.requests[0]["model"] == "small"
+
+
+def test_specialist_messages_after_handoff_are_sent():
+    specialist = Agent(name="Shipping", instructions="", model="m", handoff_filter=last_turns(1))
+
+    def track():
+        """Track the parcel"""
+        return "tracked"
+
+    specialist.functions = [track]
+    triage = Agent(name="Triage", instructions="", model="m", functions=[lambda: specialist])
+    triage.functions[0].__name__ = "transfer"
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("transfer", call_id="c1")]},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("track", call_id="c2")]},
+        {"role": "assistant", "content": "Done.", "tool_calls": None},
+    ])
+    Microagent(client=client).run(triage, HISTORY)
+
+    last = sent_to_specialist(client)
+    assert last[0] == HISTORY[-1]
+    assert last[-1]["content"] == "tracked"
@@ -0,0 +1,68 @@
+from microagent.core import Microagent
+from microagent.instructions import InstructionsCache, RecordingContext, depends_on
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+def system_message(instructions):
+    return {"role": "system", "content": instructions}
+
+
+def test_declared_keys_only_rerender_on_change():
+    calls = []
+
+    @depends_on("name")
+    def instructions(context_variables):
+        calls.append(1)
+        return f"Hello {context_variables['name']}"
+
+    agent = Agent(name="A", instructions=instructions, model="m")
+    cache = InstructionsCache()
+
+    assert cache.render(agent, {"name": "Ann", "other": 1}, system_message) == (system_message("Hello Ann"), False)
+    assert cache.render(agent, {"name": "Ann", "other": 2}, system_message) == (system_message("Hello Ann"), True)
+    assert cache.render(agent, {"name": "Bob", "other": 2}, system_message) == (system_message("Hello Bob"), False)
+    assert len(calls) == 2
+
+
+def test_recorded_keys_and_full_reads():
+    agent = Agent(name="A", instructions=lambda cv: f"tier={cv.get('tier')}", model="m", cache_instructions=True)
+    cache = InstructionsCache()
+    cache.render(agent, {"tier": "gold"}, system_message)
+    assert cache.render(agent, {"tier": "gold", "unrelated": 1}, system_message)[1] is True
+    assert cache.render(agent, {"tier": "silver"}, system_message)[1] is False
+
+    everything = Agent(name="B", instructions=lambda cv: str(dict(cv)), model="m", cache_instructions=True)
+    cache.render(everything, {"a": 1}, system_message)
+    assert cache.render(everything, {"a": 1, "b": 2}, system_message)[1] is False
+
+    recorder = RecordingContext({"x": 1})
+    assert "y" not in recorder
+    assert recorder.keys_read == {"y"} and not recorder.read_all
+
+
+def test_uncached_instructions_are_not_counted():
+    agent = Agent(name="A", instructions=lambda cv: "dynamic", model="m")
+    assert InstructionsCache().render(agent, {}, system_message)[1] is None
+
+
+def test_run_reports_hit_rate():
+    @depends_on("user")
+    def instructions(context_variables):
+        return f"Helping {context_variables['user']}"
+
+    def noop():
+        """No-op tool"""
+        return "ok"
+
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("noop")]},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("noop")]},
+        {"role": "assistant", "content": "done", "tool_calls": None},
+    ])
+    agent = Agent(name="A", instructions=instructions, model="m", functions=[noop])
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "hi"}], context_variables={"user": "Ann"})
+
+    assert response.stats["instructions_cache"]["hits"] == 2
+    assert response.stats["instructions_cache"]["misses"] == 1
+    assert client.requests[-1]["messages"][0] == {"role": "system", "content": "Helping Ann"}
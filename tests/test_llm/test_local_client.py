@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.fake_local_server import FakeLocalServer
+from microagent.core import Microagent
+from microagent.llm.factory import LLMFactory
+from microagent.llm.local_client import LocalClient, MicroBatcher
+from microagent.types import Agent
+
+
+@pytest.fixture
+def server():
+    with FakeLocalServer(latency=0.05, slots=2) as fake:
+        yield fake
+
+
+def ask(client, i):
+    return client.chat_completion(messages=[{"role": "user", "content": f"q{i}", "sender": "me"}])
+
+
+def test_concurrent_requests_are_batched(server):
+    client = LocalClient(base_url=server.base_url, batch_window=0.02)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: ask(client, i), range(8)))
+
+    assert [r["content"] for r in results] == [f"echo: q{i}" for i in range(8)]
+    assert server.stats["batches"] >= 1
+    assert server.stats["batched_requests"] + server.stats["requests"] == 8
+    assert client.batcher.stats["max_batch"] > 1
+    assert results[0]["usage"]["input_tokens"] > 0
+
+
+def test_falls_back_when_batch_endpoint_missing():
+    with FakeLocalServer(latency=0.01, batch_endpoint=False) as server:
+        client = LocalClient(base_url=server.base_url, batch_window=0.02)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda i: ask(client, i), range(4)))
+        assert [r["content"] for r in results] == [f"echo: q{i}" for i in range(4)]
+        assert server.stats["requests"] == 4
+        assert client._batch_supported is False
+
+
+def test_unbatched_client_runs_agent(server):
+    agent = Agent(name="Local", instructions="Be brief.", model="local-model")
+    response = Microagent(client=LocalClient(base_url=server.base_url, batching=False)).run(
+        agent, [{"role": "user", "content": "hi"}]
+    )
+    assert response.messages[-1]["content"] == "echo: hi"
+    assert server.stats["requests"] == 1
+
+
+def test_micro_batcher_propagates_errors():
+    def send(batch):
+        return [ValueError("bad") if item == "bad" else item * 2 for item in batch]
+
+    batcher = MicroBatcher(send, window=0.02)
+    good, bad = batcher.submit(2), batcher.submit("bad")
+    assert good.result() == 4
+    with pytest.raises(ValueError):
+        bad.result()
+
+
+def test_factory_creates_local_client(monkeypatch):
+    monkeypatch.setenv("MICROAGENT_LOCAL_BASE_URL", "http://127.0.0.1:9/v1")
+    client = LLMFactory.create("local")
+    assert isinstance(client, LocalClient)
+    assert client.base_url == "http://127.0.0.1:9/v1"
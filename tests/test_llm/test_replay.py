@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from microagent.core import Microagent
+from microagent.llm.replay import RecordingClient, ReplayClient, ReplayMissError
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+def lookup(order_id):
+    """Look up an order"""
+    return f"order {order_id} shipped"
+
+
+AGENT = Agent(name="Support", instructions="Help.", model="m", functions=[lookup])
+MESSAGES = [{"role": "user", "content": "where is order 7?"}]
+
+
+class SlowScriptedClient(ScriptedLLMClient):
+    def chat_completion(self, messages=None, **kwargs):
+        time.sleep(0.05)
+        return super().chat_completion(messages=messages, **kwargs)
+
+
+def record(path):
+    scripted = SlowScriptedClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("lookup", '{"order_id": "7"}')]},
+        {"role": "assistant", "content": "It shipped.", "tool_calls": None},
+    ])
+    return Microagent(client=RecordingClient(scripted, str(path))).run(AGENT, MESSAGES)
+
+
+def test_replay_by_params_reproduces_run(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorded = record(path)
+    assert len(path.read_text().splitlines()) == 2
+
+    replay = ReplayClient(str(path), latency_scale=0)
+    start = time.monotonic()
+    for _ in range(3):
+        replayed = Microagent(client=replay).run(AGENT, MESSAGES)
+        assert replayed.messages == recorded.messages
+    assert time.monotonic() - start < 0.1
+    assert replay.hits == 6
+
+    with pytest.raises(ReplayMissError):
+        Microagent(client=replay).run(AGENT, [{"role": "user", "content": "something else"}])
+
+
+def test_replay_by_position_with_scaled_latency(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    record(path)
+    replay = ReplayClient(str(path), match="position", latency_scale=2.0)
+    start = time.monotonic()
+    first = replay.chat_completion(messages=[{"role": "user", "content": "anything"}], model="x")
+    assert time.monotonic() - start >= 0.09
+    assert first["tool_calls"][0]["function"]["name"] == "lookup"
+    assert replay.chat_completion(messages=[], model="y")["content"] == "It shipped."
+    assert replay.chat_completion(messages=[], model="z")["tool_calls"]
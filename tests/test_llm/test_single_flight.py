@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from microagent.core import Microagent
+from microagent.llm.single_flight import SingleFlightClient
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient
+
+
+class SlowClient(ScriptedLLMClient):
+    def __init__(self, delay=0.1, fail=False):
+        super().__init__()
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat_completion(self, messages=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"role": "assistant", "content": messages[-1]["content"], "tool_calls": None,
+                "usage": {"input_tokens": 10, "output_tokens": 2}}
+
+
+def ask(client, content):
+    return client.chat_completion(messages=[{"role": "user", "content": content}], model="m")
+
+
+def test_identical_in_flight_requests_share_one_call():
+    upstream = SlowClient()
+    client = SingleFlightClient(upstream)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda c: ask(client, c), ["same"] * 5 + ["other"]))
+
+    assert upstream.calls == 2
+    assert client.stats == {"requests": 6, "upstream_calls": 2, "coalesced": 4, "errors": 0}
+    assert [r["content"] for r in results] == ["same"] * 5 + ["other"]
+    assert sum("usage" in r for r in results[:5]) == 1
+
+    results[0]["content"] = "mutated"
+    assert results[1]["content"] == "same"
+
+
+def test_finished_calls_are_not_cached():
+    upstream = SlowClient(delay=0)
+    client = SingleFlightClient(upstream)
+    ask(client, "q")
+    ask(client, "q")
+    assert upstream.calls == 2
+    assert client.stats["coalesced"] == 0
+
+
+def test_errors_reach_every_waiter():
+    client = SingleFlightClient(SlowClient(fail=True))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(ask, client, "q") for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    assert client.stats["errors"] == 1
+    assert client.stats["upstream_calls"] == 1
+
+
+def test_concurrent_runs_account_usage_once():
+    agent = Agent(name="A", instructions="Be brief.", model="m")
+    microagent = Microagent(client=SingleFlightClient(SlowClient()))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        responses = list(pool.map(lambda _: microagent.run(agent, [{"role": "user", "content": "hi"}]), range(3)))
+    assert [r.messages[-1]["content"] for r in responses] == ["hi"] * 3
+    assert sum(r.usage.input_tokens for r in responses) == 10
+
+
+def test_waiters_honour_their_own_timeout():
+    upstream = SlowClient(delay=0.5)
+    client = SingleFlightClient(upstream)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(ask, client, "q")
+        time.sleep(0.05)
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            client.chat_completion(messages=[{"role": "user", "content": "q"}], model="m", timeout=0.1)
+        assert time.monotonic() - start < 0.4
+        assert leader.result()["content"] == "q"
+    assert upstream.calls == 1
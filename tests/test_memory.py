@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from microagent.memory import HistoryCompactor, MEMORY_PREFIX, SUMMARY_PREFIX, VectorMemory
+from microagent.persistent import History
+from tests.mock_client import ScriptedLLMClient
+
+
+class GatedSummarizer(ScriptedLLMClient):
+    """Summarizer that blocks until released, to prove callers never wait on it."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def chat_completion(self, messages=None, **kwargs):
+        self.requests.append(dict(kwargs, messages=messages))
+        self.release.wait(5)
+        return {"role": "assistant", "content": "they talked about orders", "tool_calls": None}
+
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i}"})
+        history.append({"role": "assistant", "content": None, "tool_calls": [{"id": f"c{i}"}]})
+        history.append({"role": "tool", "tool_call_id": f"c{i}", "content": "result"})
+        history.append({"role": "assistant", "content": f"answer {i}"})
+    return history
+
+
+def test_summary_swapped_in_only_when_ready():
+    client = GatedSummarizer()
+    compactor = HistoryCompactor(client, model="cheap", max_messages=12, keep_recent=5)
+    history = History(conversation(5))
+
+    assert compactor.maybe_compact(history)
+    assert not compactor.maybe_compact(history)
+    assert compactor.apply(history) is history
+
+    history.append({"role": "user", "content": "new question"})
+    client.release.set()
+    compactor.wait(5)
+    compacted = compactor.apply(history)
+
+    assert client.requests[0]["model"] == "cheap"
+    assert compacted[0]["content"] == SUMMARY_PREFIX + "they talked about orders"
+    assert compacted[1] == {"role": "user", "content": "question 3"}
+    assert compacted[-1] == {"role": "user", "content": "new question"}
+    assert len(compacted) == 10
+    assert compactor.stats["compactions"] == 1
+
+
+def test_stale_summary_is_discarded():
+    client = ScriptedLLMClient([{"role": "assistant", "content": "summary", "tool_calls": None}])
+    compactor = HistoryCompactor(client, model="cheap", max_messages=4, keep_recent=2)
+    history = conversation(3)
+    compactor.maybe_compact(history)
+    compactor.wait(5)
+    rewritten = [{"role": "user", "content": "fresh start"}] + history[1:]
+    assert compactor.apply(rewritten) is rewritten
+    assert not compactor.maybe_compact(conversation(1))
+
+
+def test_token_trigger_keeps_short_histories_whole():
+    client = ScriptedLLMClient([{"role": "assistant", "content": "summary", "tool_calls": None}])
+    compactor = HistoryCompactor(client, model="cheap", max_tokens=1, keep_recent=10)
+    history = conversation(2)
+    assert not compactor.maybe_compact(history)
+    assert compactor.apply(history) is history
+    assert client.requests == []
+
+
+TOPICS = ["pizza", "guitar", "passport", "garden", "invoice", "marathon"]
+
+
+def bag_of_topics(texts):
+    return [[float(topic in text.lower()) + 0.01 for topic in TOPICS] for text in texts]
+
+
+def test_vector_memory_recalls_relevant_messages(tmp_path):
+    pytest.importorskip("numpy")
+    memory = VectorMemory(str(tmp_path / "mem"), bag_of_topics, chunk_size=4)
+    memory.add([
+        {"role": "user", "content": "I am learning guitar chords"},
+        {"role": "assistant", "content": "Start with G and C on the guitar."},
+        {"role": "user", "content": "My passport expires in May"},
+        {"role": "tool", "content": "ignored"},
+        {"role": "user", "content": "I ran a marathon last week"},
+    ])
+    assert len(memory) == 4
+
+    hits = memory.search(["renew my passport", "guitar practice"], k=1)
+    assert hits[0][0]["content"] == "My passport expires in May"
+    assert hits[1][0]["content"].lower().count("guitar") >= 1
+
+    reopened = VectorMemory(str(tmp_path / "mem"), bag_of_topics)
+    assert len(reopened) == 4
+    assert reopened.search(["marathon time"], k=1)[0][0]["content"] == "I ran a marathon last week"
+
+
+def test_vector_memory_grows_in_place(tmp_path):
+    pytest.importorskip("numpy")
+    memory = VectorMemory(str(tmp_path / "mem"), bag_of_topics)
+    for i in range(1100):
+        memory.add([{"role": "user", "content": f"note {i} about my garden"}])
+    memory.add([{"role": "user", "content": "the pizza invoice"}])
+    assert memory.capacity == 2048
+    assert memory.search(["pizza invoice"], k=1)[0][0]["id"] == 1100
+
+
+def test_vector_memory_context_is_bounded(tmp_path):
+    pytest.importorskip("numpy")
+    memory = VectorMemory(str(tmp_path / "mem"), bag_of_topics)
+    history = conversation(20)
+    history[0]["content"] = "what toppings go on pizza?"
+    memory.add(history[:-4])
+    history.append({"role": "user", "content": "remind me about that pizza"})
+
+    messages = memory.context(history, k=2, recent=3)
+
+    assert messages[0]["content"].startswith(MEMORY_PREFIX)
+    assert "pizza" in messages[0]["content"]
+    assert messages[1:] == history[-5:]
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from microagent.core import Microagent
+from microagent.metrics import MetricsRegistry
+from microagent.serve import AgentServer
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+from tests.test_serve import request
+
+
+class TickingStreamClient(ScriptedLLMClient):
+    """Streams a tool call first, then an answer, one word every 10ms."""
+
+    def stream_chat_completion(self, messages=None, **kwargs):
+        self.requests.append(kwargs)
+        if len(self.requests) == 1:
+            return [{"tool_calls": [dict(tool_call("lookup"), index=0)]}]
+        return [{"content": word} for word in ["one ", "two ", "three"]] + [{"usage": {"output_tokens": 3}}]
+
+    def stream_deltas(self, stream):
+        for delta in stream:
+            time.sleep(0.01)
+            yield delta
+
+
+def lookup():
+    """Looks something up"""
+    time.sleep(0.02)
+    return "found"
+
+
+def find(snapshot, name, **labels):
+    return next(s for s in snapshot[f"microagent_{name}"] if all(s["labels"][k] == v for k, v in labels.items()))
+
+
+def test_streaming_run_records_latency_metrics():
+    registry = MetricsRegistry()
+    agent = Agent(name="Finder", instructions="", model="fast-model", functions=[lookup])
+    client = Microagent(client=TickingStreamClient(), metrics=registry)
+
+    list(client.run(agent, [{"role": "user", "content": "find it"}], stream=True))
+    snapshot = registry.snapshot()
+
+    labels = {"provider": "tickingstream", "model": "fast-model", "agent": "Finder"}
+    assert find(snapshot, "time_to_first_token_seconds", **labels)["count"] == 2
+    assert find(snapshot, "inter_token_seconds", **labels)["count"] == 2
+    assert find(snapshot, "llm_request_seconds", **labels)["count"] == 2
+    assert find(snapshot, "turn_overhead_seconds", **labels)["count"] == 2
+    rate = find(snapshot, "output_tokens_per_second", **labels)
+    assert rate["count"] == 1 and 50 < rate["sum"] < 400
+    tool = find(snapshot, "tool_seconds", tool="lookup")
+    assert tool["count"] == 1 and tool["sum"] >= 0.02
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "A demo.", ("agent",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, agent='say "hi"')
+    histogram.observe(0.5, agent='say "hi"')
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE microagent_demo_seconds histogram" in text
+    assert 'microagent_demo_seconds_bucket{agent="say \\"hi\\"",le="0.1"} 1' in text
+    assert 'microagent_demo_seconds_bucket{agent="say \\"hi\\"",le="+Inf"} 2' in text
+    assert 'microagent_demo_seconds_count{agent="say \\"hi\\""} 2' in text
+
+
+def test_metrics_endpoint():
+    registry = MetricsRegistry()
+
+    async def main():
+        agent = Agent(name="helper", instructions="", model="m")
+        server = AgentServer({"helper": agent}, client=Microagent(client=ScriptedLLMClient(), metrics=registry), port=0)
+        await server.start()
+        try:
+            await request(server.port, "POST", "/agents/helper/run", {"messages": [{"role": "user", "content": "hi"}]})
+            return await request(server.port, "GET", "/metrics")
+        finally:
+            await server.shutdown()
+
+    status, body = asyncio.run(main())
+    assert status == 200
+    assert 'microagent_llm_request_seconds_count{provider="scriptedllm",model="m",agent="helper"} 1' in body
@@ -0,0 +1,81 @@
+from microagent.core import Microagent
+from microagent.persistent import ContextVariables, History
+from microagent.types import Agent, Result
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+def test_history_snapshots_share_prefix_and_branch_on_write():
+    base = [{"role": "user", "content": str(i)} for i in range(3)]
+    history = History(base)
+    left, right = history.snapshot(), history.snapshot()
+
+    left.append({"role": "assistant", "content": "left"})
+    right.append({"role": "assistant", "content": "right"})
+
+    assert base == [{"role": "user", "content": str(i)} for i in range(3)]
+    assert len(history) == 3
+    assert left[-1]["content"] == "left" and right[-1]["content"] == "right"
+    assert left._store is history._store and right._store is not history._store
+    assert [{"role": "system", "content": "s"}] + history == [{"role": "system", "content": "s"}] + base
+    assert history[1:] == base[1:]
+
+
+def test_context_variables_snapshot_and_changes():
+    base = {"profile": {"name": "Ann"}, "tier": "gold"}
+    context = ContextVariables(base)
+    fork = context.snapshot()
+
+    fork["tier"] = "silver"
+    del fork["profile"]
+    context["new"] = 1
+
+    assert base == {"profile": {"name": "Ann"}, "tier": "gold"}
+    assert dict(context) == {"profile": {"name": "Ann"}, "tier": "gold", "new": 1}
+    assert dict(fork) == {"tier": "silver"}
+    assert fork.changes() == {"tier": "silver", "profile": None}
+
+    for i in range(40):
+        context = context.snapshot()
+        context[f"k{i}"] = i
+    assert context["k0"] == 0 and context["k39"] == 39 and len(context) == 43
+
+
+def set_tier():
+    """Set the tier"""
+    return Result(value="ok", context_variables={"tier": "platinum"})
+
+
+def test_run_accepts_persistent_containers_and_reports_delta():
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("set_tier")]},
+        {"role": "assistant", "content": "done", "tool_calls": None},
+    ])
+    history = History([{"role": "user", "content": "upgrade me"}])
+    context = ContextVariables({"tier": "gold", "big": list(range(1000))})
+    agent = Agent(name="A", instructions="Help.", model="m", functions=[set_tier])
+    response = Microagent(client=client).run(agent, history, context_variables=context)
+
+    assert len(history) == 1 and context["tier"] == "gold"
+    assert response.context_variables["tier"] == "platinum"
+    assert response.context_variables["big"] is context["big"]
+    assert response.context_delta == {"tier": "platinum"}
+    assert [m["content"] for m in response.messages] == [None, "ok", "done"]
+
+
+def test_forks_share_prefix_without_copying():
+    history = History([{"role": "user", "content": str(i)} for i in range(4)])
+    left, right = history.fork(2), history.fork(2)
+    left.append({"role": "assistant", "content": "left"})
+    right.extend([{"role": "assistant", "content": "right"}, {"role": "user", "content": "more"}])
+
+    assert left == history[:2] + [{"role": "assistant", "content": "left"}]
+    assert [m["content"] for m in right] == ["0", "1", "right", "more"]
+    assert right[1] is history[1] and right[-1]["content"] == "more"
+    assert left._store.parent is history._store and left._store.items == [left[2]]
+
+    nested = right
+    for i in range(40):
+        nested = nested.fork()
+        nested.append({"role": "user", "content": f"n{i}"})
+    assert len(nested) == 44 and nested[3]["content"] == "more" and nested[-1]["content"] == "n39"
+    assert nested._store.depth <= 16
@@ -0,0 +1,41 @@
+from microagent.core import Microagent
+from microagent.results import ResultStore
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+BIG = "".join(f"line {i}\n" for i in range(2000))
+
+
+def search():
+    """Searches everything"""
+    return BIG
+
+
+def test_large_result_is_stored_and_paged(tmp_path):
+    store = ResultStore(path=str(tmp_path), threshold=1000, preview=100, page_size=500)
+    ref = ResultStore().put(BIG)
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("search", call_id="c1")]},
+        {"role": "assistant", "content": None,
+         "tool_calls": [tool_call("fetch_result", f'{{"ref": "{ref}", "offset": 100}}', call_id="c2")]},
+        {"role": "assistant", "content": "found it", "tool_calls": None},
+    ])
+    agent = Agent(name="A", instructions="", model="m", functions=[search])
+
+    response = Microagent(client=client, result_store=store).run(agent, [{"role": "user", "content": "find it"}])
+
+    preview = response.messages[1]["content"]
+    assert preview.startswith(BIG[:100]) and f'ref="{ref}"' in preview and len(preview) < 300
+    page = response.messages[3]["content"]
+    assert page.startswith(BIG[100:600]) and "offset=600" in page
+    assert [t["function"]["name"] for t in client.requests[0]["tools"]] == ["search", "fetch_result"]
+    assert store.stats == {"offloaded": 1, "chars_saved": len(BIG) - 100}
+    assert ResultStore(path=str(tmp_path)).get(ref) == BIG
+
+
+def test_small_results_and_memory_store():
+    store = ResultStore(threshold=10)
+    assert store.offload("short") == "short"
+    ref = store.put("x" * 20)
+    assert store.put("x" * 20) == ref and store.get(ref) == "x" * 20
+    assert store.fetch_result(ref, offset=15) == "xxxxx"
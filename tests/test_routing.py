@@ -0,0 +1,49 @@
+from microagent.core import Microagent
+from microagent.routing import RuleRouter, ThresholdRouter, TurnFeatures
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+def lookup():
+    """Look something up"""
+    return "found it"
+
+
+def features(**overrides):
+    values = dict(turn=0, history_length=1, last_role="user", last_is_tool_result=False,
+                  after_handoff=False, num_tools=0, estimated_tokens=100)
+    values.update(overrides)
+    return TurnFeatures(**values)
+
+
+def test_rule_router_sends_tool_summaries_to_fast_model():
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("lookup")]},
+        {"role": "assistant", "content": "Here it is.", "tool_calls": None},
+    ])
+    router = RuleRouter([(lambda f: f.last_is_tool_result, "fast-model")])
+    agent = Agent(name="A", instructions="Help.", model="big-model", functions=[lookup], router=router)
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "find it"}])
+
+    assert [r["model"] for r in client.requests] == ["big-model", "fast-model"]
+    decisions = response.stats["routing"]
+    assert [d["routed"] for d in decisions] == [False, True]
+    assert decisions[1]["features"]["last_is_tool_result"] is True
+
+
+def test_model_override_bypasses_router():
+    client = ScriptedLLMClient()
+    router = RuleRouter([(lambda f: True, "fast-model")])
+    agent = Agent(name="A", instructions="Help.", model="big-model")
+    Microagent(client=client, router=router).run(agent, [{"role": "user", "content": "hi"}], model_override="pinned")
+    assert client.requests[0]["model"] == "pinned"
+
+
+def test_threshold_router_learns_cutoff():
+    router = ThresholdRouter("fast-model", weights={"estimated_tokens": 1.0})
+    examples = [(features(estimated_tokens=n), n <= 500) for n in (100, 200, 300, 400, 500, 600, 700, 800)]
+    threshold = router.fit(examples, max_error_rate=0.0)
+
+    assert 500 <= threshold < 600
+    assert router.route(features(estimated_tokens=450)) == "fast-model"
+    assert router.route(features(estimated_tokens=650)) is None
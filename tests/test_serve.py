@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+
+from microagent.core import Microagent
+from microagent.serve import AgentServer
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+class SleepyClient(ScriptedLLMClient):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def chat_completion(self, messages=None, **kwargs):
+        time.sleep(self.delay)
+        return {"role": "assistant", "content": "hello", "tool_calls": None}
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), body.decode()
+
+
+def serve_and(client, check, **kwargs):
+    async def main():
+        agent = Agent(name="helper", instructions="Help.", model="m", functions=[lambda_tool])
+        server = AgentServer({"helper": agent}, client=Microagent(client=client), port=0, **kwargs)
+        await server.start()
+        try:
+            return await check(server)
+        finally:
+            await server.shutdown()
+    return asyncio.run(main())
+
+
+def lambda_tool():
+    """Returns a fixed value"""
+    return "tool result"
+
+
+def test_run_endpoint_returns_response_json():
+    async def check(server):
+        status, body = await request(server.port, "POST", "/agents/helper/run",
+                                     {"messages": [{"role": "user", "content": "hi"}]})
+        assert status == 200
+        data = json.loads(body)
+        assert data["agent"] == "helper"
+        assert data["messages"][-1]["content"] == "hello"
+        assert (await request(server.port, "POST", "/agents/nobody/run", {"messages": []}))[0] == 404
+        assert (await request(server.port, "POST", "/agents/helper/run", {"messages": "x"}))[0] == 400
+    serve_and(SleepyClient(0), check)
+
+
+def test_stream_endpoint_emits_each_message():
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("lambda_tool")]},
+        {"role": "assistant", "content": "final", "tool_calls": None},
+    ])
+
+    async def check(server):
+        status, body = await request(server.port, "POST", "/agents/helper/stream",
+                                     {"messages": [{"role": "user", "content": "hi"}]})
+        assert status == 200
+        events = [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+        assert events == ["message", "message", "message", "response"]
+        assert '"tool result"' in body
+    serve_and(client, check)
+
+
+def test_backpressure_and_deadline():
+    async def check(server):
+        payload = {"messages": [{"role": "user", "content": "hi"}]}
+        results = await asyncio.gather(*[request(server.port, "POST", "/agents/helper/run", payload) for _ in range(4)])
+        statuses = sorted(status for status, _ in results)
+        assert statuses.count(503) >= 1
+        assert 504 in statuses
+    serve_and(SleepyClient(0.5), check, concurrency=1, max_pending=1, timeout=0.3, shutdown_timeout=1)
+
+
+def test_bad_input_is_rejected_with_400():
+    async def check(server):
+        path = "/agents/helper/run"
+        assert (await request(server.port, "POST", path, ["not", "an", "object"]))[0] == 400
+        assert (await request(server.port, "POST", path, {"messages": [], "timeout": "soon"}))[0] == 400
+        for payload in (
+            {"messages": ["hi"]},
+            {"messages": [], "max_turns": "5"},
+            {"messages": [], "max_turns": 0},
+            {"messages": [], "context_variables": [1, 2]},
+            {"messages": [], "context_variables": "abc"},
+        ):
+            assert (await request(server.port, "POST", path, payload))[0] == 400
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: ten\r\n\r\n".encode())
+        raw = await reader.read()
+        writer.close()
+        assert raw.startswith(b"HTTP/1.1 400")
+    serve_and(SleepyClient(0), check)
+
+
+def test_stream_disconnect_cancels_the_run():
+    class LoopingClient(ScriptedLLMClient):
+        def chat_completion(self, messages=None, **kwargs):
+            self.requests.append(messages)
+            time.sleep(0.02)
+            return {"role": "assistant", "content": None, "tool_calls": [tool_call("lambda_tool")]}
+
+    client = LoopingClient()
+
+    async def check(server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        body = json.dumps({"messages": [{"role": "user", "content": "hi"}]}).encode()
+        writer.write(f"POST /agents/helper/stream HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        await reader.readuntil(b"event: message")
+        writer.close()
+        for _ in range(100):
+            if server.active == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert server.active == 0
+        calls = len(client.requests)
+        await asyncio.sleep(0.2)
+        assert len(client.requests) == calls
+    serve_and(client, check, timeout=30)
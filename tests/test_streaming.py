@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from microagent.cancellation import CancellationToken
+from microagent.core import Microagent
+from microagent.llm.anthropic_client import AnthropicClient
+from microagent.llm.openai_client import OpenAIClient
+from microagent.repl.async_repl import stream_turn
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+class DeltaClient(ScriptedLLMClient):
+    """Streams each scripted response as a list of raw deltas."""
+
+    def stream_chat_completion(self, messages=None, **kwargs):
+        self.requests.append(dict(kwargs, messages=messages))
+        return self.responses.pop(0)
+
+    def stream_deltas(self, stream):
+        for delta in stream:
+            yield dict(delta)
+
+
+def lookup(order_id):
+    """Look up an order"""
+    return f"order {order_id} shipped"
+
+
+def test_run_stream_assembles_messages_and_executes_tools():
+    client = DeltaClient([
+        [
+            {"tool_calls": [{"index": 0, "id": "call_1", "type": "function", "function": {"name": "lookup", "arguments": ""}}]},
+            {"tool_calls": [{"index": 0, "function": {"arguments": '{"order_id": '}}]},
+            {"tool_calls": [{"index": 0, "function": {"arguments": '"7"}'}}]},
+            {"usage": {"input_tokens": 50, "output_tokens": 5}},
+        ],
+        [{"content": "It "}, {"content": "shipped."}, {"usage": {"input_tokens": 60, "output_tokens": 3}}],
+    ])
+    agent = Agent(name="Support", instructions="Help.", model="m", functions=[lookup])
+    chunks = list(Microagent(client=client).run(agent, [{"role": "user", "content": "order 7?"}], stream=True))
+
+    assert [c["delim"] for c in chunks if "delim" in c] == ["start", "end", "start", "end"]
+    assert "".join(c.get("content") or "" for c in chunks if "sender" in c) == "It shipped."
+    response = chunks[-1]["response"]
+    assert response.messages[0]["tool_calls"] == [
+        {"id": "call_1", "type": "function", "function": {"name": "lookup", "arguments": '{"order_id": "7"}'}}
+    ]
+    assert response.messages[1]["content"] == "order 7 shipped"
+    assert response.messages[2]["content"] == "It shipped."
+    assert response.usage.input_tokens == 110
+
+
+def test_provider_stream_normalization(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    function = SimpleNamespace(name="lookup", arguments='{"a"')
+    openai_chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Hi", tool_calls=None))], usage=None),
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=[
+            SimpleNamespace(index=0, id="c1", type="function", function=function)]))], usage=None),
+        SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=9, completion_tokens=2, prompt_tokens_details=None)),
+    ]
+    deltas = list(OpenAIClient().stream_deltas(openai_chunks))
+    assert deltas[0] == {"content": "Hi"}
+    assert deltas[1]["tool_calls"][0]["function"] == {"name": "lookup", "arguments": '{"a"'}
+    assert deltas[2]["usage"]["input_tokens"] == 9
+
+    anthropic_events = [
+        SimpleNamespace(type="content_block_start", index=0, content_block=SimpleNamespace(type="text")),
+        SimpleNamespace(type="content_block_delta", index=0, delta=SimpleNamespace(type="text_delta", text="Hello")),
+        SimpleNamespace(type="content_block_start", index=1,
+                        content_block=SimpleNamespace(type="tool_use", id="tu_1", name="lookup")),
+        SimpleNamespace(type="content_block_delta", index=1,
+                        delta=SimpleNamespace(type="input_json_delta", partial_json='{"order_id": "7"}')),
+        SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=12)),
+    ]
+    deltas = list(AnthropicClient().stream_deltas(anthropic_events))
+    assert deltas[0] == {"content": "Hello"}
+    assert deltas[1]["tool_calls"][0]["index"] == 0 and deltas[1]["tool_calls"][0]["id"] == "tu_1"
+    assert deltas[2]["tool_calls"][0]["function"]["arguments"] == '{"order_id": "7"}'
+    assert deltas[3]["usage"]["output_tokens"] == 12
+
+
+def test_concurrent_tool_calls_run_in_parallel():
+    def slow(n):
+        """Slow tool"""
+        time.sleep(0.2)
+        return f"done {n}"
+
+    calls = [tool_call("slow", f'{{"n": {i}}}', f"call_{i}") for i in range(4)]
+    client = ScriptedLLMClient()
+    start = time.monotonic()
+    partial = Microagent(client=client).handle_tool_calls(calls, [slow], {}, debug=False, concurrent=True)
+    assert time.monotonic() - start < 0.6
+    assert [m["content"] for m in partial.messages] == [f"done {i}" for i in range(4)]
+
+
+def test_stream_turn_returns_response():
+    client = ScriptedLLMClient([{"role": "assistant", "content": "hello there", "tool_calls": None}])
+    agent = Agent(name="A", instructions="Help.", model="m")
+
+    async def main():
+        return await stream_turn(Microagent(client=client), agent, [{"role": "user", "content": "hi"}], {}, False)
+
+    response, printer = asyncio.run(main())
+    assert response.messages[-1]["content"] == "hello there"
+    assert printer.first_token is not None
+
+
+def test_stream_turn_cancel_stops_running_tools():
+    def wait_for_it(cancel_token):
+        """Waits a long time"""
+        cancel_token.wait(5)
+        return "stopped early" if cancel_token.cancelled else "finished"
+
+    client = ScriptedLLMClient([{"role": "assistant", "content": None, "tool_calls": [tool_call("wait_for_it")]}])
+    agent = Agent(name="A", instructions="Help.", model="m", functions=[wait_for_it])
+    cancel_token = CancellationToken()
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.1, cancel_token.cancel)
+        return await stream_turn(Microagent(client=client), agent, [{"role": "user", "content": "hi"}], {}, False,
+                                 cancel_token=cancel_token)
+
+    start = time.monotonic()
+    response, _ = asyncio.run(main())
+    assert response is None
+    assert time.monotonic() - start < 2
+    assert len(client.requests) == 1
+
+
+def test_openai_streaming_request_without_tools(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    sent = {}
+
+    def create(**params):
+        sent.update(params)
+        return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Hi", tool_calls=None))], usage=None)]
+
+    client = OpenAIClient()
+    monkeypatch.setattr(client.client.chat.completions, "create", create)
+    history = [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hey", "tool_calls": None, "sender": "A"}]
+    chunks = list(Microagent(client=client).run(Agent(name="A", instructions="", model="m"), history, stream=True))
+
+    assert chunks[-1]["response"].messages[0]["content"] == "Hi"
+    assert "tools" not in sent and "tool_choice" not in sent
+    assert sent["stream"] is True and sent["stream_options"] == {"include_usage": True}
+    assert sent["messages"][2] == {"role": "assistant", "content": "hey"}
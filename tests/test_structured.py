@@ -0,0 +1,125 @@
+import json
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import BaseModel
+
+from microagent.core import Microagent
+from microagent.llm.anthropic_client import AnthropicClient
+from microagent.structured import OUTPUT_TOOL_NAME, PartialJSONParser, response_format
+from microagent.types import Agent
+from tests.mock_client import ScriptedLLMClient
+
+
+class Ticket(BaseModel):
+    title: str
+    priority: int
+    tags: List[str]
+
+
+DOCUMENT = '{"title": "Printer \\"jam\\" \\u00e9", "priority": 2, "tags": ["hw", "urgent"], "meta": {"a": [1, {"b": null}]}}'
+
+
+def test_parser_matches_json_loads_for_any_chunking():
+    for size in (1, 3, 7, len(DOCUMENT)):
+        parser = PartialJSONParser()
+        for i in range(0, len(DOCUMENT), size):
+            parser.feed(DOCUMENT[i:i + size])
+        assert parser.done
+        assert parser.value == json.loads(DOCUMENT)
+
+
+def test_parser_reports_fields_as_they_complete():
+    parser = PartialJSONParser()
+    assert parser.feed('```json\n{"title": "Print') == []
+    assert parser.value == {"title": "Print"}
+    assert parser.feed('er", "priority": 1') == ["title"]
+    assert parser.feed(', "tags": ["a"') == ["priority"]
+    assert parser.value == {"title": "Printer", "priority": 1, "tags": ["a"]}
+    assert parser.feed(']}\n```') == ["tags"]
+    assert parser.done
+
+
+def ticket_agent():
+    return Agent(name="Triage", instructions="File a ticket.", model="m", output_schema=Ticket)
+
+
+def test_run_validates_structured_output():
+    client = ScriptedLLMClient([{"role": "assistant", "content": '{"title": "Jam", "priority": 1, "tags": []}', "tool_calls": None}])
+    response = Microagent(client=client).run(ticket_agent(), [{"role": "user", "content": "printer jammed"}])
+
+    assert response.output == Ticket(title="Jam", priority=1, tags=[])
+    assert client.requests[0]["response_format"] == response_format(Ticket)
+    assert client.requests[0]["response_format"]["json_schema"]["name"] == "Ticket"
+
+
+def test_invalid_output_is_reported():
+    client = ScriptedLLMClient([{"role": "assistant", "content": '{"title": "Jam"}', "tool_calls": None}])
+    response = Microagent(client=client).run(ticket_agent(), [{"role": "user", "content": "printer jammed"}])
+
+    assert response.output is None
+    assert "priority" in response.stats["structured_output"]["error"]
+
+
+class StreamingClient(ScriptedLLMClient):
+    def stream_chat_completion(self, messages=None, **kwargs):
+        return ['{"title": "Ja', 'm", "prio', 'rity": 3, "ta', 'gs": ["x"]}']
+
+    def stream_deltas(self, stream):
+        for text in stream:
+            yield {"content": text}
+
+
+def test_streaming_yields_completed_fields_before_the_end():
+    chunks = list(Microagent(client=StreamingClient()).run(
+        ticket_agent(), [{"role": "user", "content": "printer jammed"}], stream=True
+    ))
+
+    fields = [c["output_fields"] for c in chunks if "output_fields" in c]
+    assert fields == [{"title": "Jam"}, {"priority": 3}, {"tags": ["x"]}]
+    assert chunks.index({"output_fields": {"title": "Jam"}, "sender": "Triage"}) < chunks.index({"delim": "end"})
+    assert chunks[-1]["response"].output == Ticket(title="Jam", priority=3, tags=["x"])
+
+
+def test_answers_that_are_not_json_still_return_a_response():
+    for content in ('[Note] {"a": 1}', '{"a": tru}'):
+        client = ScriptedLLMClient([{"role": "assistant", "content": content, "tool_calls": None}])
+        response = Microagent(client=client).run(ticket_agent(), [{"role": "user", "content": "printer jammed"}])
+        assert response.output is None
+        assert response.messages[-1]["content"] == content
+        assert response.stats["structured_output"]["error"]
+
+    class BrokenStream(StreamingClient):
+        def stream_chat_completion(self, messages=None, **kwargs):
+            return ['{"title": "Jam", ', '"priority": tru', 'e}']
+
+    chunks = list(Microagent(client=BrokenStream()).run(
+        ticket_agent(), [{"role": "user", "content": "printer jammed"}], stream=True
+    ))
+    response = chunks[-1]["response"]
+    assert response.output is None and response.stats["structured_output"]["error"]
+
+
+def test_anthropic_forces_output_tool(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    client = AnthropicClient()
+    params = client.prepare_chat_params(
+        messages=[{"role": "user", "content": "hi"}], model="claude", response_format=response_format(Ticket)
+    )
+    assert params["tool_choice"] == {"type": "tool", "name": OUTPUT_TOOL_NAME}
+    assert params["tools"][0]["input_schema"]["required"] == ["title", "priority", "tags"]
+
+    block = SimpleNamespace(type="tool_use", name=OUTPUT_TOOL_NAME, id="t1", input={"title": "Jam", "priority": 1, "tags": []})
+    parsed = client.parse_response(SimpleNamespace(content=[block]))
+    assert parsed["tool_calls"] is None
+    assert json.loads(parsed["content"])["title"] == "Jam"
+
+
+def test_parser_decodes_surrogate_pairs_split_across_chunks():
+    text = json.dumps({"a": "x😀y", "b": "\ud83d"})
+    parser = PartialJSONParser()
+    for i in range(0, len(text), 3):
+        parser.feed(text[i:i + 3])
+    assert parser.value["a"] == "x😀y"
+    assert parser.value["a"].encode("utf-8") == "x😀y".encode("utf-8")
+    assert parser.value["b"] == "\ud83d"
@@ -0,0 +1,101 @@
+import pytest
+
+from microagent.core import Microagent
+from microagent.tool_index import ToolIndex, ToolSelector, tokenize
+from microagent.types import Agent
+from microagent.util import function_to_json
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+def make_tool(name, doc):
+    def tool(order_id: str = ""):
+        return f"{name} done"
+    tool.__name__ = name
+    tool.__doc__ = doc
+    return tool
+
+
+CATALOG = [
+    make_tool("refund_order", "Issue a refund for an order back to the original payment method"),
+    make_tool("track_shipment", "Track where a shipment or package is right now"),
+    make_tool("cancel_subscription", "Cancel a recurring subscription plan"),
+    make_tool("update_address", "Change the shipping address on the account"),
+    make_tool("reset_password", "Send a password reset email"),
+    make_tool("list_invoices", "List invoices and billing history"),
+    make_tool("apply_coupon", "Apply a discount coupon code to the cart"),
+    make_tool("check_stock", "Check inventory stock levels for a product"),
+]
+
+
+def transfer_to_human():
+    """Hand the conversation to a human"""
+    return Agent(name="Human", instructions="", model="m")
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("refundOrder track_shipment v2") == ["refund", "order", "track", "shipment", "v", "2"]
+
+
+def test_bm25_ranks_relevant_tool_first():
+    index = ToolIndex()
+    index.sync(CATALOG, function_to_json)
+    assert index.search("I want my money back, please refund order 42", 1)[0].__name__ == "refund_order"
+    assert index.search("where is my package", 1)[0].__name__ == "track_shipment"
+
+
+def test_sync_only_indexes_new_tools():
+    calls = []
+
+    def schema(func):
+        calls.append(func.__name__)
+        return function_to_json(func)
+
+    index = ToolIndex()
+    index.sync(CATALOG, schema)
+    index.sync(CATALOG, schema)
+    extra = make_tool("gift_wrap", "Add gift wrapping to an order")
+    index.sync(CATALOG[1:] + [extra], schema)
+
+    assert calls == [f.__name__ for f in CATALOG] + ["gift_wrap"]
+    assert len(index) == len(CATALOG)
+    assert index.search("refund", 1)[0] is not CATALOG[0]
+
+
+def test_run_sends_top_k_plus_pinned_tools():
+    agent = Agent(
+        name="Support", instructions="Help.", model="m",
+        functions=CATALOG + [transfer_to_human],
+        tool_selector=ToolSelector(top_k=2, pinned=["reset_password"]),
+    )
+    client = ScriptedLLMClient([
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("check_stock")]},
+        {"role": "assistant", "content": "done", "tool_calls": None},
+    ])
+
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "Please refund my order"}])
+
+    first = [t["function"]["name"] for t in client.requests[0]["tools"]]
+    assert "refund_order" in first
+    assert {"reset_password", "transfer_to_human"} <= set(first)
+    assert len(first) == 4
+    second = [t["function"]["name"] for t in client.requests[1]["tools"]]
+    assert "check_stock" in second
+    assert response.stats["tool_selection"][0]["total"] == 9
+
+
+def test_small_catalogs_are_sent_whole():
+    selector = ToolSelector(top_k=10)
+    agent = Agent(name="A", instructions="", model="m", functions=CATALOG)
+    assert selector.select(agent, [{"role": "user", "content": "hi"}], function_to_json) == CATALOG
+
+
+def test_embedding_search():
+    np = pytest.importorskip("numpy")
+    vocabulary = ["refund", "track", "password"]
+
+    def embed(texts):
+        return np.array([[float(word in text.lower()) for word in vocabulary] for text in texts])
+
+    index = ToolIndex(embed=embed)
+    index.sync(CATALOG, function_to_json)
+    assert index.search("how do I reset my password", 1)[0].__name__ == "reset_password"
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from microagent.core import Microagent
+from microagent.llm.anthropic_client import AnthropicClient
+from microagent.llm.groq_client import GroqClient
+from microagent.llm.openai_client import OpenAIClient
+from microagent.types import Agent, Budget
+from tests.mock_client import ScriptedLLMClient, tool_call
+
+
+@pytest.fixture(autouse=True)
+def api_keys(monkeypatch):
+    for name in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GROQ_API_KEY"):
+        monkeypatch.setenv(name, "test")
+
+
+def openai_style_response(usage):
+    message = SimpleNamespace(role="assistant", content="hi", tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_openai_and_groq_usage():
+    usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=100))
+    expected = {"input_tokens": 120, "output_tokens": 30, "cache_read_tokens": 100, "cache_write_tokens": 0}
+    assert OpenAIClient().parse_response(openai_style_response(usage))["usage"] == expected
+    assert GroqClient().parse_response(openai_style_response(usage))["usage"] == expected
+
+    stream_chunk = SimpleNamespace(x_groq=SimpleNamespace(usage=SimpleNamespace(prompt_tokens=5, completion_tokens=7)))
+    assert GroqClient().parse_usage(stream_chunk)["output_tokens"] == 7
+
+
+def test_anthropic_usage_counts_cache_tokens():
+    usage = SimpleNamespace(input_tokens=10, output_tokens=20, cache_read_input_tokens=1000, cache_creation_input_tokens=5)
+    response = SimpleNamespace(content=[SimpleNamespace(type="text", text="hi")], usage=usage)
+    assert AnthropicClient().parse_response(response)["usage"] == {
+        "input_tokens": 1015, "output_tokens": 20, "cache_read_tokens": 1000, "cache_write_tokens": 5,
+    }
+    message_start = SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage))
+    assert AnthropicClient().parse_usage(message_start)["cache_read_tokens"] == 1000
+
+
+def looping_client(turns):
+    responses = [
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("step")],
+         "usage": {"input_tokens": 100, "output_tokens": 10}}
+        for _ in range(turns)
+    ]
+    return ScriptedLLMClient(responses)
+
+
+def step():
+    """Take a step"""
+    return "stepped"
+
+
+def test_usage_summed_per_turn_agent_and_run():
+    agent = Agent(name="Looper", instructions="Loop.", model="m", functions=[step])
+    response = Microagent(client=looping_client(3)).run(agent, [{"role": "user", "content": "go"}], max_turns=3)
+    assert [u.input_tokens for u in response.turn_usage] == [100, 100, 100]
+    assert response.usage.output_tokens == 30
+    assert response.usage_by_agent["Looper"].input_tokens == 300
+    assert response.stop_reason == "max_turns"
+    assert all("usage" not in m for m in response.messages)
+
+
+def test_budget_stops_before_over_budget_call():
+    agent = Agent(name="Looper", instructions="Loop.", model="m", functions=[step])
+    client = looping_client(10)
+    budget = Budget(max_cost=0.0025, prices={"m": (10.0, 50.0)})
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "go"}], budget=budget)
+    assert response.stop_reason == "budget:max_cost"
+    assert len(client.requests) == 1
+    assert response.usage.cost == pytest.approx(0.0015)
+
+    client = looping_client(10)
+    response = Microagent(client=client).run(agent, [{"role": "user", "content": "go"}],
+                                             budget=Budget(max_output_tokens=20))
+    assert response.stop_reason == "budget:max_output_tokens"
+    assert response.usage.output_tokens == 20
@@ -0,0 +1,65 @@
+import time
+
+from microagent.core import Microagent
+from microagent.types import Agent
+from microagent.worker import JobQueue, Worker, start_workers
+from tests.mock_client import ScriptedLLMClient
+
+GRAPHS = {"echo": Agent(name="Echo", instructions="Echo.", model="m")}
+
+
+class EchoClient(ScriptedLLMClient):
+    def chat_completion(self, messages=None, **kwargs):
+        if messages[-1]["content"] == "explode":
+            raise RuntimeError("provider error")
+        return {"role": "assistant", "content": f"echo: {messages[-1]['content']}", "tool_calls": None}
+
+
+def make_client():
+    return EchoClient()
+
+
+def test_worker_completes_and_retries(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), retry_backoff=0)
+    ok = queue.enqueue("echo", [{"role": "user", "content": "hi"}], {"user": "ann"})
+    bad = queue.enqueue("echo", [{"role": "user", "content": "explode"}], max_attempts=2)
+    worker = Worker(queue, GRAPHS, Microagent(client=make_client()))
+
+    while worker.run_once():
+        pass
+
+    job = queue.get(ok)
+    assert job["status"] == "done"
+    assert job["result"]["messages"][-1]["content"] == "echo: hi"
+    assert job["result"]["context_variables"] == {"user": "ann"}
+    job = queue.get(bad)
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert "provider error" in job["error"]
+
+
+def test_expired_lease_becomes_visible_again(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), visibility_timeout=0.05)
+    job_id = queue.enqueue("echo", [{"role": "user", "content": "hi"}])
+    assert queue.lease("crashed-worker")["id"] == job_id
+    assert queue.lease("other") is None
+    time.sleep(0.1)
+    job = queue.lease("other")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not queue.complete(job_id, "crashed-worker", {})
+    assert queue.complete(job_id, "other", {"ok": True})
+
+
+def test_worker_processes_drain_queue(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    queue = JobQueue(db)
+    ids = [queue.enqueue("echo", [{"role": "user", "content": str(i)}]) for i in range(6)]
+    processes, stop_event = start_workers(
+        db, "tests.test_worker:GRAPHS", workers=2, client_factory="tests.test_worker:make_client", poll_interval=0.05
+    )
+    try:
+        results = [queue.wait(job_id, timeout=20) for job_id in ids]
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=5)
+    assert [r["result"]["messages"][-1]["content"] for r in results] == [f"echo: {i}" for i in range(6)]
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from microagent.core import Microagent
+from microagent.types import Agent
+from microagent.workflow import Workflow
+from tests.mock_client import ScriptedLLMClient
+
+
+class EchoClient(ScriptedLLMClient):
+    """Replies with the model name and the last message it was sent."""
+
+    def __init__(self, delay=0.0, fail=()):
+        super().__init__()
+        self.delay = delay
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+
+    def chat_completion(self, messages=None, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.requests.append(dict(kwargs, messages=messages))
+        if kwargs["model"] in self.fail:
+            raise RuntimeError(f"{kwargs['model']} is down")
+        return {"role": "assistant", "content": f"{kwargs['model']}({messages[-1]['content']})", "tool_calls": None}
+
+
+def agent(model):
+    return Agent(name=model, instructions="Do your step.", model=model)
+
+
+def pipeline(client, **kwargs):
+    workflow = Workflow(Microagent(client=client), **kwargs)
+    workflow.add_node("extract", agent("extract"))
+    for name in ("classify", "summarize", "translate"):
+        workflow.add_node(name, agent(name), depends_on=["extract"])
+    workflow.add_node("report", agent("report"), depends_on=["classify", "summarize", "translate"])
+    return workflow
+
+
+def test_parallel_branches_and_outputs_flow_downstream():
+    client = EchoClient(delay=0.2)
+    start = time.monotonic()
+    result = pipeline(client).run([{"role": "user", "content": "doc"}])
+
+    assert time.monotonic() - start < 0.8
+    report = result.outputs["report"].messages[-1]["content"]
+    assert report.startswith("report(Output of classify:\nclassify(Output of extract:\nextract(doc))")
+    assert "Output of translate" in report
+    assert set(result.timings) == {"extract", "classify", "summarize", "translate", "report"}
+    assert all(t["status"] == "completed" for t in result.timings.values())
+
+
+def test_rerun_skips_cached_upstream_nodes():
+    client = EchoClient()
+    workflow = pipeline(client)
+    messages = [{"role": "user", "content": "doc"}]
+    workflow.run(messages)
+    calls = len(client.requests)
+
+    workflow.invalidate("report")
+    result = workflow.run(messages)
+    assert len(client.requests) == calls + 1
+    assert result.timings["extract"]["status"] == "cached"
+    assert result.timings["report"]["status"] == "completed"
+
+
+def lookup():
+    """Looks something up"""
+    return "found"
+
+
+def test_changed_instructions_or_tools_miss_the_cache():
+    client = EchoClient()
+    workflow = pipeline(client)
+    messages = [{"role": "user", "content": "doc"}]
+    workflow.run(messages)
+
+    workflow.nodes["extract"].agent.instructions = "Extract only dates."
+    result = workflow.run(messages)
+    assert result.timings["extract"]["status"] == "completed"
+    assert result.timings["classify"]["status"] == "cached"
+
+    workflow.nodes["classify"].agent.functions = [lookup]
+    result = workflow.run(messages)
+    assert result.timings["extract"]["status"] == "cached"
+    assert result.timings["classify"]["status"] == "completed"
+
+
+def test_failed_node_skips_downstream_and_recovers():
+    client = EchoClient(fail={"summarize"})
+    workflow = pipeline(client, max_concurrency=2)
+    messages = [{"role": "user", "content": "doc"}]
+    result = workflow.run(messages)
+    assert result.timings["summarize"]["status"] == "failed"
+    assert result.timings["report"]["status"] == "skipped"
+    assert "classify" in result.outputs
+
+    client.fail.clear()
+    result = workflow.run(messages)
+    assert result.timings["classify"]["status"] == "cached"
+    assert result.timings["summarize"]["status"] == "completed"
+    assert "report" in result.outputs
+
+
+def test_cycles_are_rejected():
+    workflow = Workflow(Microagent(client=EchoClient()))
+    workflow.add_node("a", agent("a"), depends_on=["b"])
+    workflow.add_node("b", agent("b"), depends_on=["a"])
+    with pytest.raises(ValueError):
+        workflow.run([])